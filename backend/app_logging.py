@@ -0,0 +1,106 @@
+"""
+Structured, non-blocking logging for the API.
+
+Modules log through get_logger("<area>"), i.e. the "nexus.<area>" loggers. Once the app
+lifespan calls configure_logging(), a record that passes settings.log_level is put on an
+in-memory queue by the calling thread; one listener thread formats it (JSON lines by
+default, see settings.log_format) and writes it to stderr, which systemd hands to journald.
+Records below the level are dropped at the isEnabledFor() check, before any formatting,
+so production can run at WARNING at next to no cost.
+
+Messages emitted once per uploaded row go through log_sampled(), which passes one call in
+settings.log_sample_every per message template.
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+
+from config import settings
+
+ROOT_LOGGER = "nexus"
+
+# Attributes every LogRecord has - anything else on a record came in through `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener = None
+_sample_lock = threading.Lock()
+_sample_counts = {}
+
+
+def get_logger(area: str) -> logging.Logger:
+    return logging.getLogger(f"{ROOT_LOGGER}.{area}")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message, any `extra` fields, exception"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message now (its arguments may change once we return) but leave the
+        # formatting to the listener thread. Tracebacks are rendered here, while they exist.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging():
+    """Route the nexus.* loggers through the queue - called first thing in the app lifespan"""
+    global _listener
+    if _listener is not None:
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    if settings.log_format == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(settings.log_level.upper())
+    root.handlers = [_QueueHandler(records)]
+    root.propagate = False
+    _listener = logging.handlers.QueueListener(records, handler)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush what is still queued - called last in the app lifespan"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        logging.getLogger(ROOT_LOGGER).handlers = []
+
+
+def log_sampled(logger: logging.Logger, level: int, msg: str, *args):
+    """Log one in settings.log_sample_every calls with this message template (the 1st, N+1th, ...)"""
+    if not logger.isEnabledFor(level):
+        return
+    with _sample_lock:
+        count = _sample_counts.get(msg, 0)
+        _sample_counts[msg] = count + 1
+    if count % max(settings.log_sample_every, 1) == 0:
+        logger.log(level, msg, *args, extra={"sample_rate": settings.log_sample_every})
@@ -1,4 +1,6 @@
 from datetime import datetime, timedelta
+import hashlib
+import time
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -7,7 +9,13 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
 from config import settings
 from models import TokenData
-from database import db_helper
+from database import db_helper, set_request_user
+from query_cache import QueryCache, query_cache
+from token_revocation import revocations
+from password_hashing import run_hash
+from app_logging import get_logger
+
+logger = get_logger("auth")
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -15,25 +23,44 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # Token handling
 security = HTTPBearer(auto_error=False)
 
+# Authenticated-user rows by user id. Tagged "users", so a write to the users table through
+# DatabaseHelper (e.g. logout) drops them; otherwise they expire after user_cache_ttl_seconds.
+USER_CACHE_TAGS = frozenset({"users"})
+user_cache = QueryCache(settings.user_cache_max_entries)
+query_cache.on_invalidate(lambda tags: user_cache.invalidate(USER_CACHE_TAGS) if "users" in tags else None)
+
+# Decoded claims of recently verified tokens, keyed by the token's SHA-256 digest. An entry
+# lives until the token's own exp, so expiry is honoured; revocation and role changes are
+# checked on the claims afterwards (user_from_claims / load_user) exactly as for a fresh decode.
+token_cache = QueryCache(max(settings.auth_token_cache_size, 1))
+NO_TAGS = frozenset()
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
     # Handle both hashed and plain passwords (for backwards compatibility)
-    print(f"Password verification - plain password length: {len(plain_password)}, hashed password length: {len(hashed_password)}")
+    logger.debug("Password verification - plain password length: %d, hashed password length: %d", len(plain_password), len(hashed_password))
     if len(hashed_password) >= 60:  # bcrypt hash length
-        print("Using bcrypt verification")
+        logger.debug("Using bcrypt verification")
         result = pwd_context.verify(plain_password, hashed_password)
-        print(f"Bcrypt verification result: {result}")
+        logger.debug("Bcrypt verification result: %s", result)
         return result
     else:
-        print("Using plain password comparison")
+        logger.debug("Using plain password comparison")
         result = plain_password == hashed_password
-        print(f"Plain password comparison result: {result}")
+        logger.debug("Plain password comparison result: %s", result)
         return result
 
 def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the password pool - keeps bcrypt's CPU time off the event loop"""
+    return await run_hash("verify", verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await run_hash("hash", get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
     to_encode = data.copy()
@@ -42,7 +69,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
     
-    to_encode.update({"exp": expire})
+    # iat keeps its fraction so a logout in the same second can tell older tokens from newer ones
+    to_encode.update({"exp": expire, "iat": time.time()})
     encoded_jwt = jwt.encode(to_encode, settings.super_secret, algorithm=settings.algorithm)
     return encoded_jwt
 
@@ -50,38 +78,100 @@ async def get_user_by_email(email: str):
     """Get user by email from database"""
     query = "SELECT * FROM users WHERE email = %s"
     try:
-        print(f"Executing query for email: {email}")
+        logger.debug("Executing query for email: %s", email)
         result = await db_helper.execute_main_query(query, (email,))
         
         if result["error"]:
-            print(f"Database error when looking up email {email}: {result['error']}")
+            logger.error("Database error when looking up email %s: %s", email, result["error"])
             return None
         
-        print(f"Query result for {email}: Found {len(result['data'])} users")
+        logger.debug("Query result for %s: Found %d users", email, len(result["data"]))
         
         if result["data"]:
-            print(f"User found: {result['data'][0]['id']}, {result['data'][0]['email']}, role: {result['data'][0]['role']}")
+            logger.debug("User found: %s, %s, role: %s", result["data"][0]["id"], result["data"][0]["email"], result["data"][0]["role"])
             return result["data"][0]
-        print(f"No user found with email: {email}")
+        logger.debug("No user found with email: %s", email)
         return None
     except Exception as e:
-        print(f"Exception in get_user_by_email: {str(e)}")
+        logger.exception("Exception in get_user_by_email: %s", e)
         return None
 
 async def authenticate_user(email: str, password: str):
     """Authenticate user with email and password"""
-    print(f"Authenticating user: {email} with password length: {len(password)}")
+    logger.debug("Authenticating user: %s", email)
     user = await get_user_by_email(email)
     if not user:
-        print(f"Auth failed: User with email {email} not found")
+        logger.info("Auth failed: User with email %s not found", email)
         return False
-    print(f"User found, verifying password for {email}")
-    if not verify_password(password, user["password"]):
-        print(f"Auth failed: Password verification failed for {email}")
+    logger.debug("User found, verifying password for %s", email)
+    if not await verify_password_async(password, user["password"]):
+        logger.info("Auth failed: Password verification failed for %s", email)
         return False
-    print(f"Auth success: User {email} authenticated successfully with role: {user.get('role', 'unknown')}")
+    logger.info("Auth success: User %s authenticated successfully with role: %s", email, user.get("role", "unknown"))
     return user
 
+def cache_user(user: dict, generation: tuple = None):
+    """Remember the id/name/email/role/country of a user - called on login and after a lookup"""
+    if settings.user_cache_ttl_seconds <= 0:
+        return
+    if generation is None:
+        generation = user_cache.generation(USER_CACHE_TAGS)
+    entry = {field: user.get(field) for field in ("id", "name", "email", "role", "country")}
+    user_cache.put(entry["id"], entry, settings.user_cache_ttl_seconds, USER_CACHE_TAGS, generation)
+
+async def load_user(user_id: int) -> Optional[dict]:
+    """The user behind a token, from the user cache or the database (None if unknown)"""
+    cached = user_cache.get(user_id) if settings.user_cache_ttl_seconds > 0 else None
+    if cached is None:
+        generation = user_cache.generation(USER_CACHE_TAGS)
+        query = "SELECT id, name, email, role, country FROM users WHERE id = %s"
+        result = await db_helper.execute_main_query(query, (user_id,))
+        if result["error"] or not result["data"]:
+            return None
+        cached = result["data"][0]
+        cache_user(cached, generation)
+    # Callers add and change keys on the user dict - never hand out the cached one
+    user = dict(cached)
+    user["user_id"] = user["id"]
+    user["user_role"] = user["role"]
+    return user
+
+def user_from_claims(payload: dict) -> Optional[dict]:
+    """
+    Stateless mode: the user described by the token itself, or None to look them up.
+    Raises JWTError if the revocation snapshot says the claims no longer hold.
+    """
+    if not settings.auth_stateless_tokens or not revocations.ready:
+        return None
+    # Tokens issued before stateless mode lack these claims - they still go to the database
+    if not all(claim in payload for claim in ("iat", "name", "email")):
+        return None
+    reason = revocations.check(payload)
+    if reason:
+        raise JWTError(reason)
+    return {
+        "id": payload["user_id"],
+        "name": payload["name"],
+        "email": payload["email"],
+        "role": payload.get("user_role"),
+        "country": payload.get("country"),
+        "user_id": payload["user_id"],
+        "user_role": payload.get("user_role"),
+    }
+
+def decode_token(token: str) -> dict:
+    """jwt.decode with the signature check skipped for tokens verified recently - raises JWTError"""
+    if settings.auth_token_cache_size <= 0:
+        return jwt.decode(token, settings.super_secret, algorithms=[settings.algorithm])
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(digest)
+    if payload is None:
+        payload = jwt.decode(token, settings.super_secret, algorithms=[settings.algorithm])
+        ttl = payload.get("exp", 0) - time.time()
+        if ttl > 0:
+            token_cache.put(digest, payload, ttl, NO_TAGS, ())
+    return dict(payload)
+
 async def get_current_user(request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)):
     """Get current user from JWT token - supports both Bearer and x-access-token"""
     credentials_exception = HTTPException(
@@ -104,7 +194,7 @@ async def get_current_user(request: Request, credentials: Optional[HTTPAuthoriza
         raise credentials_exception
     
     try:
-        payload = jwt.decode(token, settings.super_secret, algorithms=[settings.algorithm])
+        payload = decode_token(token)
         user_id: int = payload.get("user_id")
         user_role: str = payload.get("user_role")
         country: str = payload.get("country")
@@ -113,20 +203,18 @@ async def get_current_user(request: Request, credentials: Optional[HTTPAuthoriza
             raise credentials_exception
             
         token_data = TokenData(user_id=user_id, user_role=user_role, country=country)
+        # Route this request's reads with the user's read-your-writes window
+        set_request_user(user_id)
+        user = user_from_claims(payload)
     except JWTError:
         raise credentials_exception
     
-    # Get user from database
-    query = "SELECT id, name, email, role, country FROM users WHERE id = %s"
-    result = await db_helper.execute_main_query(query, (user_id,))
-    
-    if result["error"] or not result["data"]:
+    # Get user from the user cache or database
+    if user is None:
+        user = await load_user(user_id)
+    if user is None:
         raise credentials_exception
     
-    user = result["data"][0]
-    user["user_id"] = user["id"]
-    user["user_role"] = user["role"]
-    
     return user
 
 async def get_current_user_optional(request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)):
@@ -145,7 +233,7 @@ async def get_current_user_optional(request: Request, credentials: Optional[HTTP
         return None
     
     try:
-        payload = jwt.decode(token, settings.super_secret, algorithms=[settings.algorithm])
+        payload = decode_token(token)
         user_id: int = payload.get("user_id")
         user_role: str = payload.get("user_role")
         country: str = payload.get("country")
@@ -154,21 +242,21 @@ async def get_current_user_optional(request: Request, credentials: Optional[HTTP
             return None
             
         token_data = TokenData(user_id=user_id, user_role=user_role, country=country)
+        # Route this request's reads with the user's read-your-writes window
+        set_request_user(user_id)
+        user = user_from_claims(payload)
     except JWTError:
         return None
     
-    # Get user from database
-    query = "SELECT id, name, email, role, country FROM users WHERE id = %s"
-    result = await db_helper.execute_main_query(query, (user_id,))
-    
-    if result["error"] or not result["data"]:
-        return None
-    
-    user = result["data"][0]
-    user["user_id"] = user["id"]
-    user["user_role"] = user["role"]
-    
-    return user
+    # Get user from the user cache or database
+    return user if user is not None else await load_user(user_id)
+
+def client_ip(request: Request) -> str:
+    """Client address - nginx's X-Real-IP is only trusted on connections from the local proxy"""
+    host = request.client.host if request.client else "unknown"
+    if host in ("127.0.0.1", "::1"):
+        return request.headers.get("x-real-ip", host)
+    return host
 
 def require_auth(func):
     """Decorator to require authentication"""
@@ -12,11 +12,82 @@ class Settings(BaseSettings):
     db4_name: Optional[str] = None
     db5_name: Optional[str] = None  # Thrace database
     
+    # Optional read replicas (same credentials/database names) - SELECTs are routed here when set
+    db_replica_host: Optional[str] = None  # Main database
+    db2_replica_host: Optional[str] = None  # PCP database
+    db4_replica_host: Optional[str] = None  # Training database
+    db5_replica_host: Optional[str] = None  # Thrace database
+    db_read_your_writes_seconds: float = 5.0  # After a write, that user's reads stay on the primary
+    
+    # Connection pool / executor sizing (one executor per engine, sized to its pool)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_pre_ping: bool = False  # Ping on every checkout - off, the background health check covers idle connections
+    db_pool_health_interval: float = 30.0  # Seconds between idle-connection health checks (0 disables)
+    db_executor_max_queue: int = 50  # Queries allowed to wait for a worker before backpressure
+    db_executor_queue_timeout: float = 30.0  # Seconds to wait for a queue slot before failing
+    
+    # Native asyncio database mode - DatabaseHelper awaits an async engine instead of using executors
+    db_async_mode: bool = False
+    db_async_driver: str = "aiomysql"
+    
+    # Number of distinct SQL strings whose %s -> :paramN translation is cached
+    db_statement_cache_size: int = 512
+    
+    # Rows fetched per round trip by DatabaseHelper.stream_*_query
+    db_stream_chunk_size: int = 500
+    
+    # Rows per multi-row INSERT in DatabaseHelper.execute_*_many
+    db_bulk_chunk_size: int = 100
+    
+    # Deadlines - statements past their deadline (or whose client disconnected) are killed server-side
+    db_report_timeout: float = 120.0  # THRACE freedom calculation, cycle report, competency framework
+    db_disconnect_poll_interval: float = 1.0  # Seconds between client-disconnect checks
+    
+    # SELECT result cache (per-call opt-in via cache_ttl) - invalidated by writes through DatabaseHelper
+    query_cache_max_entries: int = 1000
+    reference_data_cache_ttl: float = 300.0  # Seconds - countries, PCP_DB, LOAs, stock, training calendar
+    
+    # Authenticated-user lookups in get_current_user - 0 disables the cache
+    user_cache_ttl_seconds: float = 60.0
+    user_cache_max_entries: int = 5000
+    
+    # Query instrumentation - statements slower than this go to the slow-query log
+    slow_query_threshold_ms: float = 500.0
+    query_metrics_max_fingerprints: int = 1000
+    
+    # Startup warm-up (see warmup.py) - pools and reference caches are loaded before traffic
+    warmup_timeout: float = 30.0  # Seconds the lifespan waits before serving anyway (/ready stays 503)
+    warmup_retry_interval: float = 5.0
+    
+    # Background THRACE upload jobs (see upload_jobs.py) - not bound by the 400-row request cap
+    upload_job_workers: int = 2
+    upload_job_max_queued: int = 10
+    upload_job_max_rows: int = 100000  # Data rows read per workbook - 0 for no limit
+    upload_job_retention_seconds: float = 3600.0  # Finished jobs stay readable this long
+    upload_request_workers: int = 2  # Threads for POST /upload-data, kept apart from the job threads
+    
+    # Logging (see app_logging.py) - production runs at WARNING
+    log_level: str = "INFO"
+    log_format: str = "json"  # "json" or "text"
+    log_sample_every: int = 100  # Per-row messages: log one in this many
+    
     # Security
     secret_key: str
     super_secret: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 43200  # 30 days
+    # Trust the signed token claims instead of reading users per request (see token_revocation.py)
+    auth_stateless_tokens: bool = False
+    auth_revocation_refresh_seconds: float = 60.0
+    auth_token_cache_size: int = 2048  # Verified tokens remembered by digest - 0 disables
+    # bcrypt runs on its own small thread pool (see password_hashing.py)
+    auth_hash_workers: int = 2
+    auth_hash_max_queue: int = 20
+    auth_hash_queue_timeout: float = 10.0  # Seconds a login may wait for the pool before a 503
+    # Per-client-IP login throttle - a burst of attempts, then a steady refill
+    login_attempts_per_minute: float = 10.0
+    login_attempt_burst: int = 5
     
     # Environment
     node_env: str = "development"
@@ -0,0 +1,93 @@
+"""
+Shared setup for the backend test scripts
+pytest loads it before collecting them; the scripts import from it as well, so running one
+directly (python test_<module>.py) gets the same dummy settings and SQLite stand-ins.
+"""
+
+import os
+from contextlib import contextmanager
+
+# Dummy settings so config.Settings() loads without a .env file
+DUMMY_SETTINGS = ("DB_HOST", "DB_USER", "DB_PASS", "DB_NAME", "DB2_NAME", "DB5_NAME", "SECRET_KEY", "SUPER_SECRET")
+for key in DUMMY_SETTINGS:
+    os.environ.setdefault(key, "test")
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+import database
+from database import DatabaseHelper
+
+
+def use_sqlite_engines():
+    """Point every helper at one shared in-memory SQLite database"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    for name in database.DATABASE_URLS:
+        database.ENGINES[name] = engine
+    return engine
+
+
+async def seed_countries():
+    await DatabaseHelper.execute_main_query("DROP TABLE IF EXISTS countries")
+    await DatabaseHelper.execute_main_query(
+        "CREATE TABLE countries (id INTEGER PRIMARY KEY, iso3 TEXT, name_un TEXT, subregion TEXT)"
+    )
+    for row in [(1, "GRC", "Greece", "Southern Europe"), (2, "BGR", "Bulgaria", "Eastern Europe"),
+                (3, "TUR", "Türkiye", "Western Asia")]:
+        await DatabaseHelper.execute_main_query(
+            "INSERT INTO countries (id, iso3, name_un, subregion) VALUES (%s, %s, %s, %s)", row
+        )
+
+
+@contextmanager
+def use_thrace_staging_tables():
+    """
+    SQLite engines with thrace.factivities / thrace.factivities_tmp and a loaded epiunits cache,
+    e.g. `with use_thrace_staging_tables() as engine:` - the cache is put back afterwards
+    """
+    from routers import thrace
+    from routers.thrace_validation import COUNT_FIELDS
+
+    engine = use_sqlite_engines()
+    columns = ", ".join(["epiunitID", "inspectorID", "dt_insp", *COUNT_FIELDS, "dt_inival", "userID"])
+    with engine.begin() as connection:
+        # The THRACE queries name thrace.<table> explicitly
+        connection.exec_driver_sql("ATTACH DATABASE ':memory:' AS thrace")
+        connection.exec_driver_sql(
+            f"CREATE TABLE thrace.factivities_tmp (factivity_tmpID INTEGER PRIMARY KEY, {columns}, "
+            "errore, epiunitcountrycode, villagename)"
+        )
+        connection.exec_driver_sql(f"CREATE TABLE thrace.factivities (factivityID INTEGER PRIMARY KEY, {columns})")
+    saved_cache, saved_loaded = dict(thrace._epiunits_cache), thrace._cache_loaded
+    thrace._epiunits_cache.update({"GR001": 5})
+    thrace._cache_loaded = True
+    try:
+        yield engine
+    finally:
+        thrace._epiunits_cache.clear()
+        thrace._epiunits_cache.update(saved_cache)
+        thrace._cache_loaded = saved_loaded
+
+
+def thrace_workbook(rows) -> bytes:
+    """An upload workbook with the full header and the given {header: value} rows"""
+    from io import BytesIO
+    import openpyxl
+    from routers.thrace_workbook import HEADER_TO_FIELD
+
+    workbook = openpyxl.Workbook()
+    headers = ["InspectorID", "Name", *[header for header in HEADER_TO_FIELD if header != "InspectorID"]]
+    workbook.active.append(headers)
+    for values in rows:
+        values = {"InspectorID": 3, "Village/Epiunit code": "GR001", "Year": 2024, "Month": 3, "Day": 9,
+                  "Cattle clin exam": 4, **values}
+        workbook.active.append([values.get(header) for header in headers])
+    contents = BytesIO()
+    workbook.save(contents)
+    return contents.getvalue()
+
+
+def upload_file(contents: bytes):
+    from io import BytesIO
+    from fastapi import UploadFile
+    return UploadFile(file=BytesIO(contents), filename="thrace.xlsx")
@@ -1,10 +1,24 @@
 from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import settings
-import pymysql
 from concurrent.futures import ThreadPoolExecutor
 import asyncio
+import contextvars
+import re
+import threading
+import time
+from collections import namedtuple
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from query_metrics import instrument_engine, PENDING_WAIT_KEY
+from query_cache import query_cache, referenced_tables
+from pool_health import watch_pool, check_idle_connections, get_pool_stats
+from query_cancel import QueryCancelScope, QueryCancelled, run_cancellable
+from app_logging import get_logger
+
+logger = get_logger("database")
 
 # MySQL connection strings
 MAIN_DATABASE_URL = f"mysql+pymysql://{settings.db_user}:{settings.db_pass}@{settings.db_host}/{settings.db_name}"
@@ -12,32 +26,940 @@ PCP_DATABASE_URL = f"mysql+pymysql://{settings.db_user}:{settings.db_pass}@{sett
 THRACE_DATABASE_URL = f"mysql+pymysql://{settings.db_user}:{settings.db_pass}@{settings.db_host}/{settings.db5_name}"
 TRAINING_DATABASE_URL = f"mysql+pymysql://{settings.db_user}:{settings.db_pass}@{settings.db_host}/{settings.db4_name if settings.db4_name else 'db_training'}"
 
-# Debug: Print database names on startup
-print("Database configuration:")
-print(f"  Main DB: {settings.db_name}")
-print(f"  PCP DB: {settings.db2_name}")
-print(f"  THRACE DB: {settings.db5_name}")
-print(f"  THRACE URL: {THRACE_DATABASE_URL.replace(settings.db_pass, '****')}")
-
-# Create engines
-main_engine = create_engine(MAIN_DATABASE_URL, pool_pre_ping=True, pool_recycle=300)
-pcp_engine = create_engine(PCP_DATABASE_URL, pool_pre_ping=True, pool_recycle=300)
-thrace_engine = create_engine(THRACE_DATABASE_URL, pool_pre_ping=True, pool_recycle=300)
-training_engine = create_engine(TRAINING_DATABASE_URL, pool_pre_ping=True, pool_recycle=300)
-
-# Create session makers
-MainSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=main_engine)
-PCPSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=pcp_engine)
-ThraceSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=thrace_engine)
-TrainingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=training_engine)
+# Engine options
+POOL_OPTIONS = {
+    "pool_pre_ping": settings.db_pool_pre_ping,
+    "pool_recycle": 300,
+    "pool_size": settings.db_pool_size,
+    "max_overflow": settings.db_max_overflow,
+}
+
+DATABASE_URLS = {
+    "main": MAIN_DATABASE_URL,
+    "pcp": PCP_DATABASE_URL,
+    "thrace": THRACE_DATABASE_URL,
+    "training": TRAINING_DATABASE_URL,
+}
+
+# Read replicas - registered as "<db>_replica" engines (each with its own executor) when configured
+REPLICA_HOSTS = {
+    "main": settings.db_replica_host,
+    "pcp": settings.db2_replica_host,
+    "thrace": settings.db5_replica_host,
+    "training": settings.db4_replica_host,
+}
+for _name, _host in REPLICA_HOSTS.items():
+    if _host:
+        DATABASE_URLS[f"{_name}_replica"] = DATABASE_URLS[_name].replace(f"@{settings.db_host}/", f"@{_host}/", 1)
+
+# Engines are built on first use (or by init_engines() in the app lifespan) so importing
+# this module stays cheap and side-effect free
+ENGINES = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(name: str):
+    """Get the SQLAlchemy Engine for a database, creating it on first use"""
+    engine = ENGINES.get(name)
+    if engine is None:
+        with _engines_lock:
+            engine = ENGINES.get(name)
+            if engine is None:
+                engine = create_engine(DATABASE_URLS[name], **POOL_OPTIONS)
+                # Per-statement latency/row metrics for everything that runs through the engine
+                instrument_engine(engine, name)
+                watch_pool(engine, name)
+                ENGINES[name] = engine
+    return engine
+
+
+def init_engines():
+    """Build every configured engine - called from the app lifespan"""
+    for name in DATABASE_URLS:
+        get_engine(name)
+
+
+def dispose_engines():
+    """Close every pooled connection - called when the app shuts down"""
+    for engine in list(ENGINES.values()):
+        engine.dispose()
+
+
+# Pre-lazy module attributes (main_engine, ThraceSessionLocal, ...) still work for
+# existing callers and scripts - they resolve to the lazily built objects
+_LEGACY_ENGINE_NAMES = {
+    "main_engine": "main",
+    "pcp_engine": "pcp",
+    "thrace_engine": "thrace",
+    "training_engine": "training",
+}
+_LEGACY_SESSION_NAMES = {
+    "MainSessionLocal": "main",
+    "PCPSessionLocal": "pcp",
+    "ThraceSessionLocal": "thrace",
+    "TrainingSessionLocal": "training",
+}
+_session_factories = {}
+
+
+def get_sessionmaker(name: str):
+    factory = _session_factories.get(name)
+    if factory is None:
+        factory = _session_factories[name] = sessionmaker(autocommit=False, autoflush=False, bind=get_engine(name))
+    return factory
+
+
+def __getattr__(attribute: str):
+    if attribute in _LEGACY_ENGINE_NAMES:
+        return get_engine(_LEGACY_ENGINE_NAMES[attribute])
+    if attribute in _LEGACY_SESSION_NAMES:
+        return get_sessionmaker(_LEGACY_SESSION_NAMES[attribute])
+    raise AttributeError(f"module 'database' has no attribute '{attribute}'")
+
+# Async engines (settings.db_async_mode) - created on first use so the async driver
+# is only imported when the mode is switched on
+_async_engines = {}
+
+
+def get_async_engine(name: str):
+    """Get the SQLAlchemy AsyncEngine for a database, creating it on first use"""
+    engine = _async_engines.get(name)
+    if engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        url = DATABASE_URLS[name].replace("mysql+pymysql://", f"mysql+{settings.db_async_driver}://", 1)
+        # The health checker only covers the thread-mode engines, so async pools keep pre-ping
+        engine = create_async_engine(url, **{**POOL_OPTIONS, "pool_pre_ping": True})
+        instrument_engine(engine.sync_engine, name)
+        _async_engines[name] = engine
+    return engine
+
+
+def set_async_engine(name: str, engine):
+    """Register an AsyncEngine for a database (e.g. an aiosqlite stand-in for tests)"""
+    instrument_engine(engine.sync_engine, name)
+    _async_engines[name] = engine
+
+
+async def dispose_async_engines():
+    for engine in _async_engines.values():
+        await engine.dispose()
+    _async_engines.clear()
+
+# Read/write routing
+# SELECTs go to the replica unless the requesting user wrote to that database within the
+# last db_read_your_writes_seconds, so users always see their own changes.
+_request_user = contextvars.ContextVar("nexus_request_user", default=None)
+_recent_writes = {}
+_recent_writes_lock = threading.Lock()
+
+
+def set_request_user(user_id):
+    """Tag the current request with the authenticated user (called from auth)"""
+    _request_user.set(user_id)
+
+
+def mark_write(db: str):
+    """Pin the current user's reads on `db` to the primary for the read-your-writes window"""
+    user_id = _request_user.get()
+    if user_id is None or f"{db}_replica" not in DATABASE_URLS:
+        return
+    now = time.monotonic()
+    with _recent_writes_lock:
+        _recent_writes[(user_id, db)] = now + settings.db_read_your_writes_seconds
+        if len(_recent_writes) > 1000:
+            for key in [key for key, until in _recent_writes.items() if until <= now]:
+                del _recent_writes[key]
+
+
+def read_target(db: str) -> str:
+    """Engine name SELECTs on `db` should use - the replica when there is one and it is safe"""
+    replica = f"{db}_replica"
+    if replica not in DATABASE_URLS:
+        return db
+    user_id = _request_user.get()
+    if user_id is not None:
+        with _recent_writes_lock:
+            until = _recent_writes.get((user_id, db))
+        if until is not None and until > time.monotonic():
+            return db
+    return replica
+
+
+def get_read_engine(db: str):
+    """Engine for read-only work such as analytics - see read_target()"""
+    return get_engine(read_target(db))
 
 Base = declarative_base()
 
+
+# Per-thread state of executor workers - how long the current call queued before it started
+_worker_state = threading.local()
+
+
+def current_executor_wait() -> float:
+    return getattr(_worker_state, "wait", 0.0)
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a database executor queue stays full past the queue timeout"""
+
+
+class DatabaseExecutor:
+    """
+    Long-lived thread pool bound to one engine.
+    Workers match the engine's pool size (pool_size + max_overflow). That does not
+    rule out waiting on a checkout: DatabaseSession/DatabaseTransaction connections and
+    stream_*_query cursors stay checked out between the calls they make here, so a
+    worker can still block in the pool while they hold connections. At most `max_queue`
+    further calls may wait behind the workers; beyond that callers are held back until
+    a slot frees up, and fail with ExecutorSaturated after `queue_timeout`.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"db-{name}")
+        self._slots = asyncio.Semaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._active = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    async def run(self, fn, *args):
+        """Run a blocking callable on this executor, applying backpressure when full"""
+        enqueued_at = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._rejected += 1
+            raise ExecutorSaturated(
+                f"{self.name} database queue is full ({self.max_workers} running, {self.max_queue} waiting)"
+            )
+
+        def _call():
+            wait = time.perf_counter() - enqueued_at
+            with self._lock:
+                self._active += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+            _worker_state.wait = wait
+            try:
+                return fn(*args)
+            finally:
+                _worker_state.wait = 0.0
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._executor.submit(_call)
+        except BaseException:
+            self._slots.release()
+            raise
+        self._in_flight += 1
+
+        def _done(_):
+            # The slot is held until the worker finishes, even if the caller stopped waiting
+            self._in_flight -= 1
+            self._slots.release()
+
+        def _release(f):
+            try:
+                loop.call_soon_threadsafe(_done, f)
+            except RuntimeError:
+                pass  # The loop is already closed - so is its semaphore
+
+        future.add_done_callback(_release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "active": self._active,
+                "queue_depth": max(self._in_flight - self._active, 0),
+                "max_queue": self.max_queue,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._total_wait / self._completed * 1000, 3) if self._completed else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 3),
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+_executors = {}
+
+
+def get_executor(name: str) -> DatabaseExecutor:
+    """Get the shared executor for an engine, creating it if the lifespan has not"""
+    executor = _executors.get(name)
+    if executor is None:
+        executor = DatabaseExecutor(
+            name,
+            max_workers=settings.db_pool_size + settings.db_max_overflow,
+            max_queue=settings.db_executor_max_queue,
+            queue_timeout=settings.db_executor_queue_timeout,
+        )
+        _executors[name] = executor
+    return executor
+
+
+def start_executors():
+    """Create one executor per engine - called from the app lifespan"""
+    for name in DATABASE_URLS:
+        get_executor(name)
+
+
+def shutdown_executors():
+    """Drain and stop all executors - called when the app shuts down"""
+    for executor in _executors.values():
+        executor.shutdown()
+    _executors.clear()
+
+
+def get_executor_stats() -> dict:
+    return {name: executor.stats() for name, executor in _executors.items()}
+
+
+# Background pool health checks (replace per-checkout pre-ping) - see pool_health.py
+_pool_health_task = None
+
+
+async def _pool_health_loop(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        for name, engine in list(ENGINES.items()):
+            try:
+                dead = await get_executor(name).run(check_idle_connections, engine, name)
+                if dead:
+                    logger.warning("Pool health check: invalidated %d dead %s connection(s)", dead, name)
+            except ExecutorSaturated:
+                # The engine is busy serving requests - its connections are evidently alive
+                continue
+            except Exception as e:
+                logger.error("Pool health check failed for %s: %s", name, e)
+
+
+def start_pool_health_checker():
+    """Start the idle-connection health check task - called from the app lifespan"""
+    global _pool_health_task
+    if settings.db_pool_health_interval > 0 and _pool_health_task is None:
+        _pool_health_task = asyncio.create_task(_pool_health_loop(settings.db_pool_health_interval))
+
+
+async def stop_pool_health_checker():
+    global _pool_health_task
+    if _pool_health_task is not None:
+        _pool_health_task.cancel()
+        try:
+            await _pool_health_task
+        except asyncio.CancelledError:
+            pass
+        _pool_health_task = None
+
+
+async def prefill_pool(name: str):
+    """
+    Open db_pool_size connections on one engine and hand them back to its pool, so the
+    first requests after a start find warm connections - run by the startup warm-up.
+    """
+    if settings.db_async_mode:
+        engine = get_async_engine(name)
+        connections = []
+        try:
+            for _ in range(settings.db_pool_size):
+                connections.append(await engine.connect())
+        finally:
+            for connection in connections:
+                await connection.close()
+        return
+
+    def _fill():
+        engine = get_engine(name)
+        connections = []
+        try:
+            for _ in range(settings.db_pool_size):
+                connections.append(engine.connect())
+        finally:
+            for connection in connections:
+                connection.close()
+    await get_executor(name).run(_fill)
+
+
+def get_engine_pool_stats() -> dict:
+    return get_pool_stats(dict(ENGINES))
+
+
+async def run_with_connection(db: str, fn, begin: bool = False, retry_on_disconnect: bool = False,
+                              timeout: float = None):
+    """
+    Run `fn(connection)` against database `db` with a synchronous Connection.
+    Thread mode checks the connection out on the shared executor; async mode
+    uses the async engine and AsyncConnection.run_sync, so the I/O is awaited
+    on the event loop without a thread hop. `begin=True` wraps the call in a
+    transaction that commits when `fn` returns. `retry_on_disconnect=True` runs
+    `fn` once more on a fresh connection if the first one turns out to be dead
+    (checkouts are not pre-pinged) - only for idempotent work such as SELECTs.
+    If `timeout` passes, or the calling request is cancelled, the running statement
+    is killed server-side (see query_cancel.py) - a timeout raises QueryTimeout.
+    """
+    scope = QueryCancelScope(db, timeout)
+
+    def _tracked(connection):
+        with scope.track(connection):
+            return fn(connection)
+
+    async def _async_call():
+        engine = get_async_engine(db)
+        checkout_started = time.perf_counter()
+        async with (engine.begin() if begin else engine.connect()) as connection:
+            connection.info[PENDING_WAIT_KEY] = time.perf_counter() - checkout_started
+            try:
+                return await connection.run_sync(_tracked)
+            finally:
+                connection.info.pop(PENDING_WAIT_KEY, None)
+
+    def _call():
+        engine = get_engine(db)
+        checkout_started = time.perf_counter()
+        with (engine.begin() if begin else engine.connect()) as connection:
+            # Executor queueing + pool checkout are reported as wait time on the first statement
+            connection.info[PENDING_WAIT_KEY] = current_executor_wait() + time.perf_counter() - checkout_started
+            try:
+                return _tracked(connection)
+            finally:
+                connection.info.pop(PENDING_WAIT_KEY, None)
+
+    async def _run():
+        try:
+            if settings.db_async_mode:
+                return await _async_call()
+            return await get_executor(db).run(_call)
+        except DBAPIError as e:
+            if not (retry_on_disconnect and e.connection_invalidated):
+                raise
+        # The pool has invalidated the dead connection - one retry on a new one
+        if settings.db_async_mode:
+            return await _async_call()
+        return await get_executor(db).run(_call)
+
+    return await run_cancellable(scope, _run())
+
+
+# Compiled-statement cache
+# Routers write pyformat "%s" placeholders; SQLAlchemy text() needs named binds.
+# Every helper uses the same convention (:param0, :param1, ...) and the translated
+# TextClause is cached per raw SQL string, so a statement executed 400 times in an
+# upload is rewritten and parsed once.
+CompiledStatement = namedtuple("CompiledStatement", ["clause", "param_names", "is_select", "tables"])
+
+# Quoted literals/identifiers are matched first so "%s" inside e.g. DATE_FORMAT(date, '%H:%i:%s') is left alone
+_PLACEHOLDER_RE = re.compile(r"""('(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.)*"|`[^`]*`)|%s""")
+
+
+def translate_placeholders(query: str):
+    """Rewrite %s placeholders to :param0..N - returns (sql, param_names)"""
+    param_names = []
+
+    def _replace(match):
+        if match.group(1) is not None:
+            return match.group(1)
+        name = f"param{len(param_names)}"
+        param_names.append(name)
+        return f":{name}"
+
+    return _PLACEHOLDER_RE.sub(_replace, query), tuple(param_names)
+
+
+@lru_cache(maxsize=settings.db_statement_cache_size)
+def compile_statement(query: str) -> CompiledStatement:
+    """Translate and build the TextClause for a raw SQL string (LRU cached)"""
+    translated, param_names = translate_placeholders(query)
+    return CompiledStatement(
+        text(translated), param_names, query.strip().upper().startswith('SELECT'), referenced_tables(query)
+    )
+
+
+def get_statement_cache_stats() -> dict:
+    info = compile_statement.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": round(info.hits / lookups, 4) if lookups else 0.0,
+        "size": info.currsize,
+        "max_size": info.maxsize,
+    }
+
+
+def bind_params(statement: CompiledStatement, params):
+    """Map positional params (tuple/list) onto the statement's names; dicts pass through"""
+    if not params:
+        return None
+    if isinstance(params, (tuple, list)):
+        return dict(zip(statement.param_names, params))
+    return params
+
+
+RESULT_FORMATS = ("rows", "columns")
+
+
+def rows_to_columns(keys, rows) -> dict:
+    """Column-oriented result (column name -> list of values) without a dict per row"""
+    if not rows:
+        return {key: [] for key in keys}
+    return dict(zip(keys, map(list, zip(*rows))))
+
+
+def _execute_statement(connection, query: str, params, result_format: str = "rows", commit: bool = True):
+    statement = compile_statement(query)
+    result = connection.execute(statement.clause, bind_params(statement, params))
+    if statement.is_select:
+        if result_format == "columns":
+            return {"data": rows_to_columns(list(result.keys()), result.fetchall()), "error": None}
+        return {"data": [dict(row._mapping) for row in result], "error": None}
+    if commit:
+        connection.commit()
+    return {"data": result.rowcount, "error": None}
+
+
+# Single-flight coalescing (opt-in via coalesce=True)
+# Concurrent callers of the same SELECT share one in-flight execution; every caller gets
+# its own copy of the rows so endpoints can still post-process them freely.
+# Result caching (opt-in via cache_ttl=seconds) - see query_cache.py. Writes through these
+# helpers invalidate every cached result that read one of the tables they touch.
+_inflight = {}
+_coalescing_stats = {"executions": 0, "coalesced": 0}
+
+
+def _result_key(db: str, query: str, params, result_format: str):
+    if params is None or isinstance(params, (tuple, list)):
+        frozen = tuple(params or ())
+    elif isinstance(params, dict):
+        frozen = tuple(sorted(params.items()))
+    else:
+        return None
+    key = (db, query, frozen, result_format)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def _copy_result(result: dict) -> dict:
+    data = result["data"]
+    if isinstance(data, list):
+        data = [dict(row) if isinstance(row, dict) else row for row in data]
+    elif isinstance(data, dict):
+        data = {column: list(values) for column, values in data.items()}
+    return {"data": data, "error": result["error"]}
+
+
+def get_coalescing_stats() -> dict:
+    executions = _coalescing_stats["executions"]
+    coalesced = _coalescing_stats["coalesced"]
+    return {
+        "executions": executions,
+        "coalesced": coalesced,
+        "saved_ratio": round(coalesced / (executions + coalesced), 4) if executions + coalesced else 0.0,
+        "in_flight": len(_inflight),
+    }
+
+
+async def _execute_query(db: str, query: str, params=None, result_format: str = "rows",
+                         coalesce: bool = False, cache_ttl: float = None, timeout: float = None):
+    """Shared body of the execute_*_query helpers - a QueryTimeout/QueryCancelled is raised, not returned"""
+    try:
+        if result_format not in RESULT_FORMATS:
+            raise ValueError(f"Unknown result_format '{result_format}' - expected one of {RESULT_FORMATS}")
+        statement = compile_statement(query)
+        if not statement.is_select:
+            mark_write(db)
+            try:
+                return await run_with_connection(
+                    db, lambda connection: _execute_statement(connection, query, params, result_format),
+                    timeout=timeout
+                )
+            finally:
+                query_cache.invalidate(statement.tables)
+        target = read_target(db)
+
+        cache_key = _result_key(db, query, params, result_format) if cache_ttl else None
+        if cache_key is not None:
+            cached = query_cache.get(cache_key)
+            if cached is not None:
+                return _copy_result(cached)
+            generation = query_cache.generation(statement.tables)
+
+        async def _select():
+            return await run_with_connection(
+                target, lambda connection: _execute_statement(connection, query, params, result_format),
+                retry_on_disconnect=True, timeout=timeout
+            )
+
+        key = _result_key(target, query, params, result_format) if coalesce else None
+        if key is None:
+            result = await _select()
+        else:
+            task = _inflight.get(key)
+            if task is None:
+                _coalescing_stats["executions"] += 1
+                task = asyncio.ensure_future(_select())
+                _inflight[key] = task
+                task.add_done_callback(lambda _: _inflight.pop(key, None))
+            else:
+                _coalescing_stats["coalesced"] += 1
+            # Shielded so one caller going away does not cancel the execution the others wait on
+            result = _copy_result(await asyncio.shield(task))
+
+        if cache_key is not None and not result["error"]:
+            # Replica results are not cached right after a write - the replica may not have it yet
+            quiet_period = settings.db_read_your_writes_seconds if target != db else 0.0
+            query_cache.put(cache_key, _copy_result(result), cache_ttl, statement.tables, generation, quiet_period)
+        return result
+    except QueryCancelled:
+        # Deadlines and disconnects are not query errors - let the endpoint answer 504
+        raise
+    except Exception as e:
+        return {"data": [], "error": str(e)}
+
+
+# Bulk writes
+# "INSERT ... VALUES (%s, ...)" statements are expanded into multi-row VALUES lists of
+# up to `chunk_size` rows; anything else falls back to a DBAPI executemany. Either way
+# the whole batch runs in one transaction on one pooled connection.
+_VALUES_RE = re.compile(r"\bVALUES\s*\(", re.IGNORECASE)
+
+
+def _split_values_clause(query: str):
+    """Split an INSERT into (head, row template, tail) around its VALUES tuple, or None"""
+    if not query.lstrip().upper().startswith(("INSERT", "REPLACE")):
+        return None
+    match = _VALUES_RE.search(query)
+    if match is None:
+        return None
+    start = match.end() - 1
+    depth = 0
+    quote = None
+    for index in range(start, len(query)):
+        char = query[index]
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"`":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return query[:start], query[start:index + 1], query[index + 1:]
+    return None
+
+
+@lru_cache(maxsize=settings.db_statement_cache_size)
+def compile_multirow_statement(query: str, row_count: int):
+    """Build (and cache) the statement inserting `row_count` rows at once, or None if not expandable"""
+    parts = _split_values_clause(query)
+    if parts is None:
+        return None
+    head, row_template, tail = parts
+    return compile_statement(head + ", ".join([row_template] * row_count) + tail)
+
+
+def execute_many_statement(connection, query: str, params_list, chunk_size: int = None) -> int:
+    """Run `query` once per params tuple on an open connection - returns the total rowcount"""
+    chunk_size = chunk_size or settings.db_bulk_chunk_size
+    statement = compile_statement(query)
+    rowcount = 0
+    for offset in range(0, len(params_list), chunk_size):
+        chunk = params_list[offset:offset + chunk_size]
+        multirow = compile_multirow_statement(query, len(chunk))
+        if multirow is not None and all(isinstance(params, (tuple, list)) for params in chunk):
+            flat = [value for params in chunk for value in params]
+            result = connection.execute(multirow.clause, bind_params(multirow, flat))
+        else:
+            result = connection.execute(statement.clause, [bind_params(statement, params) for params in chunk])
+        rowcount += max(result.rowcount, 0)
+    return rowcount
+
+
+async def _execute_many(db: str, query: str, params_list, chunk_size: int = None, timeout: float = None):
+    """Shared body of the execute_*_many helpers"""
+    try:
+        params_list = list(params_list)
+        if not params_list:
+            return {"data": 0, "error": None}
+        mark_write(db)
+        try:
+            rowcount = await run_with_connection(
+                db, lambda connection: execute_many_statement(connection, query, params_list, chunk_size),
+                begin=True, timeout=timeout
+            )
+        finally:
+            query_cache.invalidate(compile_statement(query).tables)
+        return {"data": rowcount, "error": None}
+    except QueryCancelled:
+        raise
+    except Exception as e:
+        return {"data": 0, "error": str(e)}
+
+
+async def _stream_query(db: str, query: str, params=None, chunk_size: int = None):
+    """
+    Async iterator over a server-side cursor, yielding lists of row dicts of up to
+    `chunk_size` rows. Unlike the execute_* helpers, errors are raised to the caller.
+    """
+    chunk_size = chunk_size or settings.db_stream_chunk_size
+    statement = compile_statement(query)
+    bound = bind_params(statement, params)
+    db = read_target(db)
+
+    if settings.db_async_mode:
+        async with get_async_engine(db).connect() as connection:
+            result = await connection.stream(statement.clause, bound)
+            async for partition in result.partitions(chunk_size):
+                yield [dict(row._mapping) for row in partition]
+        return
+
+    # Thread mode: the connection stays checked out between chunks, each fetch runs on the executor
+    executor = get_executor(db)
+    connection = await executor.run(get_engine(db).connect)
+    try:
+        result = await executor.run(
+            lambda: connection.execution_options(stream_results=True, max_row_buffer=chunk_size)
+            .execute(statement.clause, bound)
+        )
+        while True:
+            rows = await executor.run(result.fetchmany, chunk_size)
+            if not rows:
+                break
+            yield [dict(row._mapping) for row in rows]
+    finally:
+        await executor.run(connection.close)
+
+
+class DatabaseSession:
+    """
+    Request-scoped unit of work. Statements issued through one session reuse the same
+    checked-out connection(s) instead of taking one from the pool per statement.
+
+    With max_connections > 1 the session lazily opens up to that many connections, so
+    independent statements can run concurrently via asyncio.gather(); with the default
+    of 1 concurrent callers simply queue for the shared connection. Connections go back
+    to the pool on close() - get_db_session() does that once the response is sent.
+    A read_only session uses the read replica when one is configured (see read_target()).
+    """
+
+    def __init__(self, db: str, max_connections: int = 1, read_only: bool = False):
+        self.db = read_target(db) if read_only else db
+        self.read_only = read_only
+        self.max_connections = max(1, max_connections)
+        self._slots = asyncio.Semaphore(self.max_connections)
+        self._idle = []
+        self._connections = []
+        self._unwinding = []
+        self._closed = False
+
+    # Roll back after a failing statement so the shared connection stays usable
+    rollback_failed_statements = True
+
+    async def _open(self):
+        checkout_started = time.perf_counter()
+        if settings.db_async_mode:
+            connection = await get_async_engine(self.db).connect()
+            connection.info[PENDING_WAIT_KEY] = time.perf_counter() - checkout_started
+        else:
+            def _connect():
+                connection = get_engine(self.db).connect()
+                connection.info[PENDING_WAIT_KEY] = current_executor_wait() + time.perf_counter() - checkout_started
+                return connection
+            connection = await get_executor(self.db).run(_connect)
+        self._connections.append(connection)
+        return connection
+
+    async def run(self, fn, timeout: float = None):
+        """Run fn(connection) on one of the session's connections, killing it past `timeout`"""
+        if self._closed:
+            raise RuntimeError("Database session is closed")
+        await self._slots.acquire()
+        connection = None
+        scope = QueryCancelScope(self.db, timeout)
+        try:
+            connection = self._idle.pop() if self._idle else await self._open()
+
+            def _call(sync_connection):
+                with scope.track(sync_connection):
+                    try:
+                        return fn(sync_connection)
+                    except Exception:
+                        if self.rollback_failed_statements:
+                            sync_connection.rollback()
+                        raise
+
+            if settings.db_async_mode:
+                work = asyncio.ensure_future(connection.run_sync(_call))
+            else:
+                work = asyncio.ensure_future(get_executor(self.db).run(_call, connection))
+            try:
+                return await run_cancellable(scope, asyncio.shield(work))
+            except (asyncio.CancelledError, QueryCancelled):
+                # The killed statement may still be unwinding on the connection - keep it out of
+                # the idle list and let close() wait for it before releasing the connection
+                self._unwinding.append(work)
+                connection = None
+                raise
+        finally:
+            if connection is not None:
+                self._idle.append(connection)
+            self._slots.release()
+
+    async def execute(self, query: str, params=None, result_format: str = "rows", timeout: float = None):
+        """Same contract as the execute_*_query helpers: {"data": ..., "error": ...}"""
+        try:
+            if result_format not in RESULT_FORMATS:
+                raise ValueError(f"Unknown result_format '{result_format}' - expected one of {RESULT_FORMATS}")
+            statement = compile_statement(query)
+            if statement.is_select:
+                return await self.run(
+                    lambda connection: _execute_statement(connection, query, params, result_format), timeout
+                )
+            if self.read_only:
+                raise ValueError("Read-only database session cannot execute writes")
+            mark_write(self.db)
+            try:
+                return await self.run(
+                    lambda connection: _execute_statement(connection, query, params, result_format), timeout
+                )
+            finally:
+                query_cache.invalidate(statement.tables)
+        except QueryCancelled:
+            raise
+        except Exception as e:
+            return {"data": [], "error": str(e)}
+
+    async def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._unwinding:
+            await asyncio.gather(*self._unwinding, return_exceptions=True)
+        connections, self._connections, self._idle, self._unwinding = self._connections, [], [], []
+        for connection in connections:
+            connection.info.pop(PENDING_WAIT_KEY, None)
+            try:
+                if settings.db_async_mode:
+                    await connection.close()
+                else:
+                    await get_executor(self.db).run(connection.close)
+            except Exception as e:
+                logger.error("Error releasing %s session connection: %s", self.db, e)
+
+
+class DatabaseTransaction(DatabaseSession):
+    """
+    Unit of work for multi-statement writes: every statement runs on one connection and
+    the lot is committed once, when the DatabaseHelper.transaction() block exits cleanly.
+    Unlike the execute_* helpers, a failing statement raises - the block is left and the
+    whole transaction is rolled back, so callers never see half of a write. A failure the
+    block catches still marks the transaction failed, and commit() then refuses.
+    """
+
+    # The earlier statements must not be discarded behind the caller's back
+    rollback_failed_statements = False
+
+    def __init__(self, db: str):
+        super().__init__(db)
+        self.tables = set()
+        self.failed = False
+
+    async def run(self, fn, timeout: float = None):
+        try:
+            return await super().run(fn, timeout)
+        except BaseException:
+            self.failed = True
+            raise
+
+    async def execute(self, query: str, params=None, result_format: str = "rows", timeout: float = None,
+                      lock_rows: bool = False):
+        """
+        Returns {"data": rows-or-rowcount, "error": None}; errors are raised.
+        lock_rows runs a SELECT as SELECT ... FOR UPDATE, holding its rows until the transaction
+        ends (SQLite has no row locks - its writers lock the whole database anyway).
+        """
+        if result_format not in RESULT_FORMATS:
+            raise ValueError(f"Unknown result_format '{result_format}' - expected one of {RESULT_FORMATS}")
+        statement = compile_statement(query)
+        if not statement.is_select:
+            self.tables |= statement.tables
+        elif lock_rows:
+            locking_query = query.rstrip().rstrip(";") + " FOR UPDATE"
+            return await self.run(
+                lambda connection: _execute_statement(
+                    connection, query if connection.dialect.name == "sqlite" else locking_query,
+                    params, result_format, commit=False
+                ), timeout
+            )
+        return await self.run(
+            lambda connection: _execute_statement(connection, query, params, result_format, commit=False), timeout
+        )
+
+    async def execute_many(self, query: str, params_list, chunk_size: int = None, timeout: float = None) -> int:
+        """Multi-row insert/update inside the transaction - returns the total rowcount"""
+        params_list = list(params_list)
+        if not params_list:
+            return 0
+        self.tables |= compile_statement(query).tables
+        return await self.run(
+            lambda connection: execute_many_statement(connection, query, params_list, chunk_size), timeout
+        )
+
+    async def _finish(self, method: str):
+        # A connection still unwinding a cancelled statement is not idle; close() rolls it back
+        for connection in self._idle:
+            if settings.db_async_mode:
+                await getattr(connection, method)()
+            else:
+                await get_executor(self.db).run(getattr(connection, method))
+
+    async def commit(self):
+        if self.failed:
+            raise RuntimeError("Transaction had a failing statement - it can only be rolled back")
+        await self._finish("commit")
+
+    async def rollback(self):
+        await self._finish("rollback")
+
+
+def get_db_session(db: str, max_connections: int = 1, read_only: bool = False):
+    """
+    FastAPI dependency factory for a request-scoped DatabaseSession, e.g.
+    `session: DatabaseSession = Depends(get_db_session("thrace"))`
+    """
+    async def _session_dependency():
+        session = DatabaseSession(db, max_connections, read_only)
+        try:
+            yield session
+        finally:
+            await session.close()
+    return _session_dependency
+
+
 # Database helpers similar to the Node.js helper functions
 class DatabaseHelper:
     @staticmethod
     def get_main_db():
-        db = MainSessionLocal()
+        db = get_sessionmaker("main")()
         try:
             yield db
         finally:
@@ -45,7 +967,7 @@ class DatabaseHelper:
     
     @staticmethod
     def get_pcp_db():
-        db = PCPSessionLocal()
+        db = get_sessionmaker("pcp")()
         try:
             yield db
         finally:
@@ -55,123 +977,96 @@ class DatabaseHelper:
 
 
     @staticmethod
-    async def execute_main_query(query: str, params=None):
-        """Execute raw SQL query on main database - runs in thread pool to avoid blocking event loop"""
+    @asynccontextmanager
+    async def transaction(db: str):
+        """
+        Run several statements on one connection with a single commit, e.g.
+            async with DatabaseHelper.transaction("main") as tx:
+                await tx.execute("INSERT ...", params)
+                await tx.execute("UPDATE ...", params)
+        Leaving the block with an exception rolls everything back.
+        """
+        tx = DatabaseTransaction(db)
+        mark_write(db)
         try:
-            loop = asyncio.get_event_loop()
-            executor = ThreadPoolExecutor(max_workers=5)
-            
-            def _execute():
-                with main_engine.connect() as connection:
-                    if params is None:
-                        result = connection.execute(text(query))
-                    else:
-                        # Convert params to a dictionary for SQLAlchemy text() binding
-                        if isinstance(params, tuple) and len(params) == 1:
-                            # Handle the common case of a single parameter
-                            result = connection.execute(text(query.replace("%s", ":param1")), {"param1": params[0]})
-                        elif isinstance(params, tuple):
-                            # Convert tuple params to a dictionary
-                            param_dict = {f"param{i+1}": val for i, val in enumerate(params)}
-                            # Replace %s placeholders with named parameters
-                            modified_query = query
-                            for i in range(len(params)):
-                                modified_query = modified_query.replace("%s", f":param{i+1}", 1)
-                            result = connection.execute(text(modified_query), param_dict)
-                        else:
-                            # Assume it's already a dict or other compatible format
-                            result = connection.execute(text(query), params)
-                            
-                    if query.strip().upper().startswith('SELECT'):
-                        rows = [dict(row._mapping) for row in result]
-                        return {"data": rows, "error": None}
-                    else:
-                        connection.commit()
-                        return {"data": result.rowcount, "error": None}
-            
-            return await loop.run_in_executor(executor, _execute)
-        except Exception as e:
-            return {"data": [], "error": str(e)}
+            yield tx
+            await tx.commit()
+        except BaseException:
+            await tx.rollback()
+            raise
+        finally:
+            await tx.close()
+            query_cache.invalidate(tx.tables)
+
+    @staticmethod
+    async def run_sync(db: str, fn, scope: QueryCancelScope = None):
+        """
+        Run a blocking callable (e.g. direct engine work) on the shared executor for `db`.
+        Pass a QueryCancelScope (and register connections with scope.track) to give the
+        work a deadline and have its statements killed if the request goes away.
+        """
+        if scope is None:
+            return await get_executor(db).run(fn)
+        return await run_cancellable(scope, get_executor(db).run(fn))
+
+    @staticmethod
+    async def execute_main_query(query: str, params=None, result_format: str = "rows", coalesce: bool = False,
+                                 cache_ttl: float = None, timeout: float = None):
+        """Execute raw SQL query on main database - runs on the shared main executor (or awaits the async engine in async mode) to avoid blocking event loop"""
+        return await _execute_query("main", query, params, result_format, coalesce, cache_ttl, timeout)
     
     @staticmethod
-    async def execute_pcp_query(query: str, params: tuple = ()):
-        """Execute raw SQL query on PCP database - runs in thread pool to avoid blocking event loop"""
-        try:
-            loop = asyncio.get_event_loop()
-            executor = ThreadPoolExecutor(max_workers=5)
-            
-            def _execute():
-                with pcp_engine.connect() as connection:
-                    if params:
-                        # Convert tuple to dictionary for SQLAlchemy text queries
-                        # Count the number of %s placeholders and create numbered parameters
-                        param_count = query.count('%s')
-                        if param_count > 0:
-                            # Replace %s with numbered parameters for SQLAlchemy
-                            numbered_query = query
-                            for i in range(param_count):
-                                numbered_query = numbered_query.replace('%s', f':param{i}', 1)
-                            
-                            # Create parameter dictionary
-                            param_dict = {f'param{i}': params[i] for i in range(len(params))}
-                            result = connection.execute(text(numbered_query), param_dict)
-                        else:
-                            result = connection.execute(text(query))
-                    else:
-                        result = connection.execute(text(query))
-                        
-                    if query.strip().upper().startswith('SELECT'):
-                        return {"data": [dict(row._mapping) for row in result], "error": None}
-                    else:
-                        connection.commit()
-                        return {"data": result.rowcount, "error": None}
-            
-            return await loop.run_in_executor(executor, _execute)
-        except Exception as e:
-            return {"data": [], "error": str(e)}
+    async def execute_pcp_query(query: str, params: tuple = (), result_format: str = "rows", coalesce: bool = False,
+                                cache_ttl: float = None, timeout: float = None):
+        """Execute raw SQL query on PCP database - runs on the shared pcp executor (or awaits the async engine in async mode) to avoid blocking event loop"""
+        return await _execute_query("pcp", query, params, result_format, coalesce, cache_ttl, timeout)
     
     @staticmethod
-    async def execute_thrace_query(query: str, params=None):
-        """Execute raw SQL query on Thrace database - runs in thread pool to avoid blocking event loop"""
-        try:
-            loop = asyncio.get_event_loop()
-            executor = ThreadPoolExecutor(max_workers=5)
-            
-            def _execute():
-                with thrace_engine.begin() as connection:  # Use begin() for auto-commit on context exit
-                    if params is None:
-                        result = connection.execute(text(query))
-                    else:
-                        # Convert tuple params to dict for SQLAlchemy
-                        if isinstance(params, tuple):
-                            # Count %s placeholders and create numbered parameters
-                            param_count = query.count('%s')
-                            if param_count > 0:
-                                param_dict = {f'param{i}': params[i] for i in range(len(params))}
-                                # Replace %s with :param0, :param1, etc.
-                                modified_query = query
-                                for i in range(param_count):
-                                    modified_query = modified_query.replace('%s', f':param{i}', 1)
-                                result = connection.execute(text(modified_query), param_dict)
-                            else:
-                                result = connection.execute(text(query))
-                        else:
-                            result = connection.execute(text(query), params)
-                            
-                    if query.strip().upper().startswith('SELECT'):
-                        rows = [dict(row._mapping) for row in result]
-                        return {"data": rows, "error": None}
-                    else:
-                        # Transaction will be committed automatically when context exits
-                        return {"data": result.rowcount, "error": None}
-            
-            return await loop.run_in_executor(executor, _execute)
-        except Exception as e:
-            return {"data": [], "error": str(e)}
+    async def execute_thrace_query(query: str, params=None, result_format: str = "rows", coalesce: bool = False,
+                                   cache_ttl: float = None, timeout: float = None):
+        """Execute raw SQL query on Thrace database - runs on the shared thrace executor (or awaits the async engine in async mode) to avoid blocking event loop"""
+        return await _execute_query("thrace", query, params, result_format, coalesce, cache_ttl, timeout)
 
-    
+    @staticmethod
+    async def execute_training_query(query: str, params=None, result_format: str = "rows", coalesce: bool = False,
+                                     cache_ttl: float = None, timeout: float = None):
+        """Execute raw SQL query on training database - runs on the shared training executor (or awaits the async engine in async mode) to avoid blocking event loop"""
+        return await _execute_query("training", query, params, result_format, coalesce, cache_ttl, timeout)
+
+    @staticmethod
+    async def execute_main_many(query: str, params_list, chunk_size: int = None, timeout: float = None):
+        """Execute a write once per params tuple on main database - one connection, one transaction"""
+        return await _execute_many("main", query, params_list, chunk_size, timeout)
+
+    @staticmethod
+    async def execute_pcp_many(query: str, params_list, chunk_size: int = None, timeout: float = None):
+        """Execute a write once per params tuple on PCP database - one connection, one transaction"""
+        return await _execute_many("pcp", query, params_list, chunk_size, timeout)
+
+    @staticmethod
+    async def execute_thrace_many(query: str, params_list, chunk_size: int = None, timeout: float = None):
+        """Execute a write once per params tuple on Thrace database - one connection, one transaction"""
+        return await _execute_many("thrace", query, params_list, chunk_size, timeout)
+
+    # Opt-in result modes for large SELECTs:
+    # - result_format="columns" on execute_*_query returns {"data": {column: [values...]}, "error": None}
+    # - stream_*_query yields chunks of rows from a server-side cursor, e.g.
+    #       async for chunk in DatabaseHelper.stream_main_query("SELECT * FROM FAST_Report"): ...
+
+    @staticmethod
+    def stream_main_query(query: str, params=None, chunk_size: int = None):
+        """Stream a SELECT on main database in chunks from a server-side cursor"""
+        return _stream_query("main", query, params, chunk_size)
 
+    @staticmethod
+    def stream_pcp_query(query: str, params=None, chunk_size: int = None):
+        """Stream a SELECT on PCP database in chunks from a server-side cursor"""
+        return _stream_query("pcp", query, params, chunk_size)
 
+    @staticmethod
+    def stream_thrace_query(query: str, params=None, chunk_size: int = None):
+        """Stream a SELECT on Thrace database in chunks from a server-side cursor"""
+        return _stream_query("thrace", query, params, chunk_size)
 
 
 # Initialize the helper
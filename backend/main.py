@@ -1,9 +1,19 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
+from contextlib import asynccontextmanager
 import os
 from config import settings
+from database import (
+    init_engines, dispose_engines, start_executors, shutdown_executors, dispose_async_engines,
+    start_pool_health_checker, stop_pool_health_checker
+)
+from token_revocation import start_revocation_refresher, stop_revocation_refresher
+from password_hashing import shutdown_hash_executor
+from app_logging import configure_logging, shutdown_logging
+from warmup import warm_up, stop_warm_up, state as warmup_state
+from upload_jobs import upload_jobs
 
 # Import routers
 from routers import (
@@ -21,14 +31,36 @@ from routers import (
     risp,
     thrace,
     training_calendar,
-    training_credits
+    training_credits,
+    admin
 )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the engines and shared per-database executors on startup, drain them on shutdown"""
+    configure_logging()
+    init_engines()
+    start_executors()
+    start_pool_health_checker()
+    start_revocation_refresher()
+    await warm_up()
+    yield
+    await stop_warm_up()
+    await upload_jobs.shutdown()
+    await stop_revocation_refresher()
+    await stop_pool_health_checker()
+    shutdown_executors()
+    shutdown_hash_executor()
+    dispose_engines()
+    await dispose_async_engines()
+    shutdown_logging()
+
 # Create FastAPI application
 app = FastAPI(
     title="EuFMD Nexus API",
     description="FastAPI backend for EuFMD Nexus application",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -56,6 +88,7 @@ app.include_router(risp.router)
 app.include_router(thrace.router)
 app.include_router(training_calendar.router)
 app.include_router(training_credits.router)
+app.include_router(admin.router)
 
 # Root endpoint
 @app.get("/")
@@ -67,6 +100,11 @@ async def root():
 async def health_check():
     return {"status": "healthy", "message": "API is operational"}
 
+# Readiness endpoint - 503 until the startup warm-up has filled the pools and caches
+@app.get("/ready")
+async def readiness_check():
+    return JSONResponse(status_code=200 if warmup_state.ready else 503, content=warmup_state.to_dict())
+
 # Handle production static files (similar to Vue backend)
 if settings.node_env in ["production", "staging"]:
     # Mount static files if they exist
@@ -0,0 +1,113 @@
+"""
+Password hashing off the event loop, and the login throttle that protects it.
+
+bcrypt verification costs tens of milliseconds of CPU per login. run_hash() moves it to
+a small dedicated thread pool (bcrypt releases the GIL while hashing, so the event loop
+keeps serving other requests) with a bounded queue, and records how long each hash took.
+LoginThrottle is a per-client-IP token bucket applied before any of that work is done.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from config import settings
+from database import DatabaseExecutor
+from query_metrics import Histogram
+
+_executor = None
+_lock = threading.Lock()
+_timings = {"verify": Histogram(), "hash": Histogram()}
+
+
+def get_hash_executor() -> DatabaseExecutor:
+    """The password pool - built on first use so importing auth stays cheap"""
+    global _executor
+    if _executor is None:
+        _executor = DatabaseExecutor(
+            "password",
+            max_workers=settings.auth_hash_workers,
+            max_queue=settings.auth_hash_max_queue,
+            queue_timeout=settings.auth_hash_queue_timeout,
+        )
+    return _executor
+
+
+async def run_hash(kind: str, fn, *args):
+    """
+    Run a hash/verify callable on the password pool, timing it under `kind`.
+    Raises database.ExecutorSaturated when the queue stays full past auth_hash_queue_timeout.
+    """
+    def _timed():
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with _lock:
+                _timings[kind].observe(elapsed_ms)
+
+    return await get_hash_executor().run(_timed)
+
+
+def shutdown_hash_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+class LoginThrottle:
+    """Token bucket per client IP: `burst` attempts at once, refilled at `per_minute`"""
+
+    def __init__(self, per_minute: float, burst: int, max_clients: int = 10000):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.throttled = 0
+
+    def acquire(self, client: str) -> Optional[float]:
+        """Take a token for `client` - returns None if allowed, else seconds until the next token"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+            if tokens >= 1.0:
+                tokens -= 1.0
+                retry_after = None
+                self.allowed += 1
+            else:
+                retry_after = (1.0 - tokens) / self.rate if self.rate > 0 else 60.0
+                self.throttled += 1
+            self._buckets[client] = (tokens, now)
+            # Least recently seen clients go first - a full bucket is what they would refill to anyway
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "per_minute": round(self.rate * 60, 3),
+                "burst": self.burst,
+                "clients": len(self._buckets),
+                "allowed": self.allowed,
+                "throttled": self.throttled,
+            }
+
+
+login_throttle = LoginThrottle(settings.login_attempts_per_minute, settings.login_attempt_burst)
+
+
+def get_password_stats() -> dict:
+    with _lock:
+        timings = {kind: histogram.to_dict() for kind, histogram in _timings.items()}
+    return {
+        "timings": timings,
+        "executor": get_hash_executor().stats() if _executor is not None else None,
+        "login_throttle": login_throttle.stats(),
+    }
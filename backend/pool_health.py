@@ -0,0 +1,102 @@
+"""
+Connection pool health checks.
+
+The engines run without pool_pre_ping (see settings.db_pool_pre_ping), so checkouts on
+the request path do not pay an extra round trip. Instead a background task in database.py
+calls check_idle_connections() every settings.db_pool_health_interval seconds: it pings
+each idle pooled connection and invalidates the dead ones before a request picks them up.
+"""
+
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy import event
+
+
+class PoolStats:
+    def __init__(self):
+        self.invalidations = 0
+        self.checks = 0
+        self.connections_checked = 0
+        self.dead_connections = 0
+        self.last_check_ms = 0.0
+        self.last_check_at = None
+
+
+_lock = threading.Lock()
+_stats: Dict[str, PoolStats] = {}
+
+
+def watch_pool(engine, database: str):
+    """Count invalidations on an engine's pool - from health checks and from failed queries alike"""
+    if getattr(engine.pool, "_nexus_watched", False):
+        return engine
+    with _lock:
+        _stats.setdefault(database, PoolStats())
+
+    @event.listens_for(engine.pool, "invalidate")
+    def _invalidated(dbapi_connection, connection_record, exception):
+        with _lock:
+            _stats[database].invalidations += 1
+
+    engine.pool._nexus_watched = True
+    return engine
+
+
+def check_idle_connections(engine, database: str) -> int:
+    """
+    Ping every idle connection in the pool once, invalidating those that fail.
+    Runs on the database's executor. Connections are taken one at a time, so at most one
+    idle connection is held back from requests at any moment. Returns the dead count.
+    """
+    pool = engine.pool
+    checkedin = getattr(pool, "checkedin", None)
+    if checkedin is None:
+        return 0
+    started = time.perf_counter()
+    dead = 0
+    idle = checkedin()
+    for _ in range(idle):
+        if pool.checkedin() == 0:
+            break
+        connection = engine.raw_connection()
+        try:
+            alive = engine.dialect.do_ping(connection.dbapi_connection)
+        except Exception:
+            alive = False
+        if not alive:
+            dead += 1
+            connection.invalidate()
+        connection.close()
+
+    with _lock:
+        stats = _stats.setdefault(database, PoolStats())
+        stats.checks += 1
+        stats.connections_checked += idle
+        stats.dead_connections += dead
+        stats.last_check_ms = round((time.perf_counter() - started) * 1000, 3)
+        stats.last_check_at = time.time()
+    return dead
+
+
+def get_pool_stats(engines: dict) -> dict:
+    """Size, checked-out, overflow and invalidation counters for each engine's pool"""
+    result = {}
+    for name, engine in engines.items():
+        pool = engine.pool
+        with _lock:
+            stats = _stats.get(name) or PoolStats()
+            entry = {
+                "invalidations": stats.invalidations,
+                "health_checks": stats.checks,
+                "connections_checked": stats.connections_checked,
+                "dead_connections": stats.dead_connections,
+                "last_check_ms": stats.last_check_ms,
+                "last_check_at": stats.last_check_at,
+            }
+        for counter in ("size", "checkedin", "checkedout", "overflow"):
+            method = getattr(pool, counter, None)
+            entry[counter] = method() if callable(method) else None
+        result[name] = entry
+    return result
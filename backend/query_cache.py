@@ -0,0 +1,165 @@
+"""
+Tag-based result cache for DatabaseHelper SELECTs.
+
+Entries are keyed on (database, SQL, params, result format) and tagged with every table
+the statement reads. Writes that go through DatabaseHelper invalidate the tags of the
+tables they touch, so a cached result never outlives a change made by this process.
+Writes made elsewhere (other workers, raw engine code, the MySQL console) are only
+picked up when the entry's TTL runs out - only opt in for data where that is acceptable.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Set
+
+from config import settings
+
+_COMMENT_RE = re.compile(r"/\*.*?\*/|--[^\n]*|#[^\n]*", re.DOTALL)
+_QUOTED_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_TABLE_RE = re.compile(
+    r"\b(?:FROM|JOIN|INTO|UPDATE|TABLE(?:\s+IF\s+(?:NOT\s+)?EXISTS)?)\s+((?:`[^`]+`|\w+)(?:\s*\.\s*(?:`[^`]+`|\w+))?)",
+    re.IGNORECASE
+)
+# Comma-separated FROM lists ("FROM a, b x") - rare here but cheap to cover
+_FROM_LIST_RE = re.compile(
+    r"\bFROM\s+[^\s,()]+(?:\s+(?:AS\s+)?\w+)?((?:\s*,\s*[^\s,()]+(?:\s+(?:AS\s+)?\w+)?)+)", re.IGNORECASE
+)
+
+
+def _normalise_table(name: str) -> str:
+    # Schema prefixes are dropped (PCP.PCP_DB and PCP_DB are the same tag) - over-invalidating is safe
+    return name.split(".")[-1].strip().strip("`").lower()
+
+
+def referenced_tables(sql: str) -> FrozenSet[str]:
+    """Lower-case names of the tables a statement reads or writes"""
+    sql = _QUOTED_RE.sub("''", _COMMENT_RE.sub(" ", sql))
+    tables = set()
+    for match in _TABLE_RE.finditer(sql):
+        tables.add(_normalise_table(match.group(1)))
+    for match in _FROM_LIST_RE.finditer(sql):
+        for item in match.group(1).split(","):
+            item = item.split()
+            if item:
+                tables.add(_normalise_table(item[0]))
+    tables.discard("")
+    tables.discard("dual")
+    return frozenset(tables)
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "tags")
+
+    def __init__(self, value, expires_at: float, tags: FrozenSet[str]):
+        self.value = value
+        self.expires_at = expires_at
+        self.tags = tags
+
+
+class QueryCache:
+    """Size-bounded LRU of SELECT results with per-entry TTL and table tags"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self._by_tag: Dict[str, Set[tuple]] = {}
+        # Bumped on every invalidation so a SELECT that raced a write does not cache its stale result
+        self._generations: Dict[str, int] = {}
+        self._invalidated_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def generation(self, tags: FrozenSet[str]) -> tuple:
+        with self._lock:
+            return tuple(self._generations.get(tag, 0) for tag in sorted(tags))
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= now:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def put(self, key, value, ttl: float, tags: FrozenSet[str], generation: tuple, quiet_period: float = 0.0):
+        """
+        Store a result unless one of its tables was invalidated since `generation` was taken,
+        or within the last `quiet_period` seconds (results read from a lagging replica).
+        """
+        now = time.monotonic()
+        with self._lock:
+            if tuple(self._generations.get(tag, 0) for tag in sorted(tags)) != generation:
+                return
+            if quiet_period and any(now - self._invalidated_at.get(tag, float("-inf")) < quiet_period for tag in tags):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value, now + ttl, tags)
+            for tag in tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, tags):
+        now = time.monotonic()
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+                self._invalidated_at[tag] = now
+                for key in self._by_tag.pop(tag, ()):
+                    if key in self._entries:
+                        self._remove(key)
+                        self.invalidations += 1
+        for listener in self._listeners:
+            listener(tags)
+
+    def on_invalidate(self, listener):
+        """Call listener(tags) after every invalidation - lets caches kept elsewhere follow the same writes"""
+        self._listeners.append(listener)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_tag.clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        for tag in entry.tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+
+query_cache = QueryCache(settings.query_cache_max_entries)
+
+
+def invalidate_tables(*tables: str):
+    """Drop cached results for tables changed outside DatabaseHelper (e.g. direct engine writes)"""
+    query_cache.invalidate({_normalise_table(table) for table in tables})
@@ -0,0 +1,157 @@
+"""
+Query deadlines and server-side cancellation.
+
+A QueryCancelScope tracks the MySQL connections a unit of work is running statements on.
+run_cancellable() awaits the work with the scope's deadline; if the deadline passes or the
+awaiting request is cancelled (see cancel_on_disconnect), the running statements are
+stopped with KILL QUERY from a side connection. The blocked executor thread then gets an
+"interrupted" error, its connection goes back to the pool, and a cancellation is recorded
+in the query metrics.
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from fastapi import Request
+
+from config import settings
+from query_metrics import record_cancellation
+from app_logging import get_logger
+
+logger = get_logger("query_cancel")
+
+
+class QueryCancelled(Exception):
+    """The statement was stopped because its request went away"""
+
+
+class QueryTimeout(QueryCancelled):
+    """The statement was stopped because it ran past its deadline"""
+
+
+def _mysql_thread_id(connection) -> Optional[int]:
+    """Server thread id of a SQLAlchemy Connection (None for non-MySQL engines)"""
+    if connection.engine.url.get_backend_name() != "mysql":
+        return None
+    raw = connection.connection.dbapi_connection
+    raw = getattr(raw, "_connection", raw)  # aiomysql connections are wrapped in an adapter
+    thread_id = getattr(raw, "thread_id", None)
+    return thread_id() if callable(thread_id) else None
+
+
+def _kill_query(url, thread_id: int):
+    """KILL QUERY from a fresh connection - the pool may be exhausted by the very query being killed"""
+    import pymysql
+    connection = pymysql.connect(
+        host=url.host, port=url.port or 3306, user=url.username, password=url.password, connect_timeout=5
+    )
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"KILL QUERY {int(thread_id)}")
+    finally:
+        connection.close()
+
+
+class QueryCancelScope:
+    """Deadline plus the set of connections currently running statements for one unit of work"""
+
+    def __init__(self, database: str, timeout: Optional[float] = None):
+        self.database = database
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.cancelled_reason = None
+        self._lock = threading.Lock()
+        self._running = {}
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def check(self):
+        """Raise if the work has been cancelled or is past its deadline - call between statements"""
+        if self.cancelled_reason == "timeout" or (self.deadline is not None and time.monotonic() >= self.deadline):
+            raise QueryTimeout(f"{self.database} query exceeded its {self.timeout:g}s deadline")
+        if self.cancelled_reason:
+            raise QueryCancelled(f"{self.database} query cancelled ({self.cancelled_reason})")
+
+    @contextmanager
+    def track(self, connection):
+        """Register a checked-out Connection for the duration of the block"""
+        key = id(connection)
+        with self._lock:
+            self.check()
+            self._running[key] = (_mysql_thread_id(connection), connection.engine.url)
+        try:
+            yield connection
+        finally:
+            # Untracked before the connection can go back to the pool, and never while a KILL
+            # for it is in flight - so a late KILL cannot hit the next request's statement
+            with self._lock:
+                self._running.pop(key, None)
+
+    def kill(self, reason: str) -> int:
+        """Mark the scope cancelled and KILL QUERY every tracked statement (blocking)"""
+        with self._lock:
+            if self.cancelled_reason:
+                return 0
+            self.cancelled_reason = reason
+            keys = list(self._running)
+        killed = 0
+        for key in keys:
+            with self._lock:
+                target = self._running.get(key)
+                if target is None or target[0] is None:
+                    continue
+                thread_id, url = target
+                try:
+                    _kill_query(url, thread_id)
+                    killed += 1
+                except Exception as e:
+                    logger.error("Failed to kill %s query %s: %s", self.database, thread_id, e)
+        record_cancellation(self.database, reason, killed)
+        return killed
+
+
+def _kill_in_background(scope: QueryCancelScope, reason: str):
+    # A plain thread rather than the executor: the executor may be full of the work being cancelled
+    threading.Thread(target=scope.kill, args=(reason,), name=f"db-kill-{scope.database}", daemon=True).start()
+
+
+async def run_cancellable(scope: QueryCancelScope, awaitable):
+    """Await database work, killing its statements on deadline or cancellation"""
+    try:
+        if scope.deadline is None:
+            return await awaitable
+        return await asyncio.wait_for(awaitable, timeout=scope.remaining())
+    except asyncio.TimeoutError:
+        _kill_in_background(scope, "timeout")
+        raise QueryTimeout(f"{scope.database} query exceeded its {scope.timeout:g}s deadline")
+    except asyncio.CancelledError:
+        _kill_in_background(scope, "disconnect")
+        raise
+
+
+async def cancel_on_disconnect(request: Request):
+    """
+    Dependency for long-running GET endpoints: cancels the request's work (and with it any
+    statements running under run_cancellable) once the client disconnects.
+    """
+    task = asyncio.current_task()
+
+    async def _watch():
+        while True:
+            await asyncio.sleep(settings.db_disconnect_poll_interval)
+            if await request.is_disconnected():
+                logger.info("Client disconnected from %s - cancelling its work", request.url.path)
+                task.cancel()
+                return
+
+    watcher = asyncio.create_task(_watch())
+    try:
+        yield
+    finally:
+        watcher.cancel()
@@ -0,0 +1,243 @@
+"""
+In-process query instrumentation.
+
+Every statement that reaches MySQL through the SQLAlchemy engines (DatabaseHelper,
+ThraceCalculator, the training routers) or the raw pymysql connections in risp.py
+is recorded here under a SQL fingerprint: rows returned, time spent waiting for an
+executor/pool connection, and execution time. Statements slower than
+settings.slow_query_threshold_ms are written to the structured slow-query log.
+"""
+
+import re
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import pymysql
+from sqlalchemy import event
+
+from config import settings
+from app_logging import get_logger
+
+slow_query_logger = get_logger("slow_query")
+
+# Histogram bucket upper bounds in milliseconds (the last bucket catches everything above)
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_RE = re.compile(r"(?<![\w`])-?\d+(?:\.\d+)?\b")
+_PARAM_RE = re.compile(r"%s|%\(\w+\)s|(?<!:):\w+")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROW_LIST_RE = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(sql: str) -> str:
+    """Normalise a statement so executions that differ only in values aggregate together"""
+    sql = _STRING_RE.sub("?", sql)
+    sql = _PARAM_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("(...)", sql)
+    sql = _ROW_LIST_RE.sub("(...)", sql)
+    return _WHITESPACE_RE.sub(" ", sql).strip()[:500]
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (milliseconds)"""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms: float):
+        for index, bound in enumerate(BUCKETS_MS):
+            if value_ms <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.total += value_ms
+        self.max = max(self.max, value_ms)
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of observations"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= target:
+                return self.max if bound == float("inf") else min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.5), 3),
+            "p95_ms": round(self.percentile(0.95), 3),
+            "max_ms": round(self.max, 3),
+            "buckets": {
+                ("+Inf" if bound == float("inf") else str(bound)): count
+                for bound, count in zip(BUCKETS_MS, self.counts)
+            },
+        }
+
+
+class QueryStats:
+    def __init__(self, database: str, sql_fingerprint: str):
+        self.database = database
+        self.fingerprint = sql_fingerprint
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.execution = Histogram()
+        self.wait = Histogram()
+
+    def to_dict(self) -> dict:
+        return {
+            "database": self.database,
+            "fingerprint": self.fingerprint,
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": self.rows,
+            "total_ms": round(self.execution.total, 3),
+            "execution": self.execution.to_dict(),
+            "wait": self.wait.to_dict(),
+        }
+
+
+_lock = threading.Lock()
+_stats: Dict[Tuple[str, str], QueryStats] = {}
+_OVERFLOW_FINGERPRINT = "<other statements>"
+
+
+def record_query(database: str, sql: str, rows: Optional[int], wait_s: float, exec_s: float, error: Optional[str] = None):
+    """Record one statement execution and write it to the slow-query log if it crossed the threshold"""
+    sql_fingerprint = fingerprint(sql)
+    exec_ms = exec_s * 1000
+    wait_ms = wait_s * 1000
+    with _lock:
+        key = (database, sql_fingerprint)
+        stats = _stats.get(key)
+        if stats is None:
+            if len(_stats) >= settings.query_metrics_max_fingerprints:
+                key = (database, _OVERFLOW_FINGERPRINT)
+                stats = _stats.get(key)
+            if stats is None:
+                stats = _stats[key] = QueryStats(*key)
+        stats.calls += 1
+        stats.rows += rows if rows and rows > 0 else 0
+        stats.execution.observe(exec_ms)
+        stats.wait.observe(wait_ms)
+        if error:
+            stats.errors += 1
+
+    if exec_ms >= settings.slow_query_threshold_ms:
+        slow_query_logger.warning("slow_query", extra={
+            "database": database,
+            "fingerprint": sql_fingerprint,
+            "rows": rows,
+            "wait_ms": round(wait_ms, 3),
+            "execution_ms": round(exec_ms, 3),
+            "error": error,
+        })
+
+
+_cancellations: Dict[Tuple[str, str], Dict[str, int]] = {}
+
+
+def record_cancellation(database: str, reason: str, killed: int):
+    """Count work stopped by a deadline ("timeout") or a departed client ("disconnect")"""
+    with _lock:
+        entry = _cancellations.setdefault((database, reason), {"count": 0, "statements_killed": 0})
+        entry["count"] += 1
+        entry["statements_killed"] += killed
+
+
+def get_query_stats(limit: int = 50, order_by: str = "total_ms") -> dict:
+    """Snapshot of the aggregated statistics, heaviest statements first"""
+    with _lock:
+        entries = [stats.to_dict() for stats in _stats.values()]
+        cancellations = [
+            {"database": database, "reason": reason, **counts}
+            for (database, reason), counts in _cancellations.items()
+        ]
+    sort_keys = {
+        "total_ms": lambda entry: entry["total_ms"],
+        "calls": lambda entry: entry["calls"],
+        "p95_ms": lambda entry: entry["execution"]["p95_ms"],
+        "max_ms": lambda entry: entry["execution"]["max_ms"],
+    }
+    entries.sort(key=sort_keys.get(order_by, sort_keys["total_ms"]), reverse=True)
+    return {
+        "slow_query_threshold_ms": settings.slow_query_threshold_ms,
+        "fingerprints": len(entries),
+        "statements": entries[:limit],
+        "cancellations": cancellations,
+    }
+
+
+def reset_query_stats():
+    with _lock:
+        _stats.clear()
+        _cancellations.clear()
+
+
+# Pending wait time (executor queue + pool checkout) for the next statement on a connection.
+# DatabaseHelper sets it via connection.info before running its statement.
+PENDING_WAIT_KEY = "nexus_pending_wait"
+_START_KEY = "nexus_query_start"
+
+
+def instrument_engine(engine, database: str):
+    """Attach timing listeners to a (sync) SQLAlchemy engine"""
+    if getattr(engine, "_nexus_instrumented", False):
+        return engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info[_START_KEY].pop()
+        record_query(
+            database, statement, getattr(cursor, "rowcount", None),
+            conn.info.pop(PENDING_WAIT_KEY, 0.0), time.perf_counter() - started
+        )
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        conn = context.connection
+        if conn is None or not conn.info.get(_START_KEY):
+            return
+        started = conn.info[_START_KEY].pop()
+        record_query(
+            database, context.statement or "", None,
+            conn.info.pop(PENDING_WAIT_KEY, 0.0), time.perf_counter() - started,
+            error=str(context.original_exception)
+        )
+
+    engine._nexus_instrumented = True
+    return engine
+
+
+class InstrumentedDictCursor(pymysql.cursors.DictCursor):
+    """DictCursor for raw pymysql connections (risp.py) that records each statement"""
+
+    database = "main"
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        wait = getattr(self.connection, "nexus_connect_wait", 0.0)
+        self.connection.nexus_connect_wait = 0.0
+        try:
+            result = super().execute(query, args)
+        except Exception as e:
+            record_query(self.database, query, None, wait, time.perf_counter() - started, error=str(e))
+            raise
+        record_query(self.database, query, self.rowcount, wait, time.perf_counter() - started)
+        return result
@@ -0,0 +1,51 @@
+from fastapi import APIRouter, HTTPException, Depends, status
+from typing import Dict, Any
+from auth import get_current_user, user_cache, token_cache
+from database import get_executor_stats, get_statement_cache_stats, get_coalescing_stats, get_engine_pool_stats
+from query_metrics import get_query_stats, reset_query_stats
+from query_cache import query_cache
+from token_revocation import revocations
+from password_hashing import get_password_stats
+from upload_jobs import upload_jobs
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+def require_admin(current_user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
+    """Only admins can read operational metrics"""
+    if current_user.get('role') != 'admin':
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
+
+@router.get("/db-stats")
+async def get_db_stats(
+    limit: int = 50,
+    order_by: str = "total_ms",
+    current_user: dict = Depends(require_admin)
+):
+    """Per-statement latency/row statistics plus executor, pool, statement-cache, coalescing, result-cache, user-cache, token-cache, token-revocation, password-hashing and upload-job state"""
+    return {
+        "queries": get_query_stats(limit=limit, order_by=order_by),
+        "executors": get_executor_stats(),
+        "pools": get_engine_pool_stats(),
+        "statement_cache": get_statement_cache_stats(),
+        "coalescing": get_coalescing_stats(),
+        "result_cache": query_cache.stats(),
+        "user_cache": user_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "token_revocations": revocations.stats(),
+        "passwords": get_password_stats(),
+        "upload_jobs": upload_jobs.stats(),
+    }
+
+@router.delete("/db-stats")
+async def clear_db_stats(current_user: dict = Depends(require_admin)):
+    """Reset the aggregated query statistics"""
+    reset_query_stats()
+    return {"message": "Query statistics reset"}
+
+@router.delete("/query-cache")
+async def clear_query_cache(current_user: dict = Depends(require_admin)):
+    """Drop every cached SELECT result and user lookup (e.g. after editing data directly in MySQL)"""
+    query_cache.clear()
+    user_cache.clear()
+    return {"message": "Query result and user caches cleared"}
@@ -1,33 +1,59 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, status
 from models import UserLogin, Token, User, ResponseModel
-from auth import authenticate_user, create_access_token, get_current_user
-from database import db_helper
+from auth import authenticate_user, create_access_token, get_current_user, cache_user, client_ip
+from database import db_helper, ExecutorSaturated
+from token_revocation import revocations
+from password_hashing import login_throttle
+from app_logging import get_logger
 from datetime import timedelta
+import math
 from config import settings
 
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
+logger = get_logger("auth")
 
 @router.post("/login", response_model=Token)
-async def login(user_credentials: UserLogin):
+async def login(user_credentials: UserLogin, request: Request):
     """Login endpoint - authenticates user and returns JWT token"""
-    print(f"Login attempt for email: {user_credentials.email}")
-    user = await authenticate_user(user_credentials.email, user_credentials.password)
+    logger.debug("Login attempt for email: %s", user_credentials.email)
+    # Throttle per client before spending any bcrypt time on the attempt
+    retry_after = login_throttle.acquire(client_ip(request))
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, please try again later",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+    try:
+        user = await authenticate_user(user_credentials.email, user_credentials.password)
+    except ExecutorSaturated:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Login is busy, please try again shortly",
+            headers={"Retry-After": "5"},
+        )
     
     if not user:
-        print(f"Login failed for email: {user_credentials.email}")
+        logger.info("Login failed for email: %s", user_credentials.email)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # The first authenticated request after login is served from the user cache
+    cache_user(user)
+    
     # Create access token
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
         data={
             "user_id": user["id"],
             "user_role": user.get("role"),
-            "country": user.get("country")
+            "country": user.get("country"),
+            # Lets stateless mode (settings.auth_stateless_tokens) build the user without a lookup
+            "name": user.get("name"),
+            "email": user.get("email")
         },
         expires_delta=access_token_expires
     )
@@ -64,6 +90,7 @@ async def logout(current_user: dict = Depends(get_current_user)):
             "UPDATE users SET last_logout=NOW() WHERE id=%s", 
             (current_user["id"],)
         )
+        revocations.record_logout(current_user["id"])
         return {"message": "Logout time stored.", "status": "success"}
     except Exception as e:
         raise HTTPException(
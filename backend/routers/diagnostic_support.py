@@ -3,6 +3,7 @@ from typing import List, Optional
 from models import ResponseModel
 from auth import get_current_user
 from database import db_helper
+from config import settings
 from datetime import datetime
 
 router = APIRouter(prefix="/api/diagnostic-support", tags=["diagnostic-support"])
@@ -63,7 +64,7 @@ async def get_countries(current_user: dict = Depends(get_current_user)):
     """Get list of countries"""
     try:
         query = "SELECT * FROM countries ORDER BY name_un ASC"
-        result = await db_helper.execute_main_query(query)
+        result = await db_helper.execute_main_query(query, coalesce=True, cache_ttl=settings.reference_data_cache_ttl)
         if result["error"]:
             raise HTTPException(status_code=500, detail=result["error"])
         return result["data"]
@@ -112,16 +113,17 @@ async def add_diagnostic_support_entry(
             report_usage, notes
         )
         
-        result = await db_helper.execute_main_query(insert_query, insert_params)
-        if result["error"]:
-            raise HTTPException(status_code=400, detail=result["error"])
+        # Insert and stock decrement commit together - a failed update leaves no orphan entry
+        async with db_helper.transaction("main") as tx:
+            await tx.execute(insert_query, insert_params)
 
-        # Update stock_entry table
-        if stock_id and quantity:
-            update_query = "UPDATE stock_entry SET quantity = quantity - %s WHERE id = %s"
-            update_result = await db_helper.execute_main_query(update_query, (quantity, stock_id))
-            if update_result["error"]:
-                raise HTTPException(status_code=400, detail=f"Failed to update stock: {update_result['error']}")
+            # Update stock_entry table
+            if stock_id and quantity:
+                update_query = "UPDATE stock_entry SET quantity = quantity - %s WHERE id = %s"
+                try:
+                    await tx.execute(update_query, (quantity, stock_id))
+                except Exception as e:
+                    raise HTTPException(status_code=400, detail=f"Failed to update stock: {e}")
 
         return {"message": "Diagnostic support entry created", "status": "success"}
         
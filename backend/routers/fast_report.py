@@ -1,12 +1,17 @@
 from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from typing import List, Dict, Any
-import httpx
+import json
+import asyncio
 from datetime import datetime
 from models import FastReportEntry, ResponseModel
 from auth import get_current_user
-from database import db_helper
+from database import db_helper, DatabaseSession, get_db_session
+from app_logging import get_logger
 
 router = APIRouter(prefix="/api/fast-report", tags=["fast-report"])
+logger = get_logger("fast_report")
 
 async def fetch_iso3_coordinates(iso3_codes: List[str]) -> Dict[str, Any]:
     """Fetch country GeoJSON data from UN service"""
@@ -16,23 +21,47 @@ async def fetch_iso3_coordinates(iso3_codes: List[str]) -> Dict[str, Any]:
     iso3_codes_str = "','".join(iso3_codes)
     url = f"https://geoservices.un.org/arcgis/rest/services/ClearMap_WebTopo/MapServer/109/query?where=ISO3CD%20IN%20('{iso3_codes_str}')&outFields=ISO3CD&returnGeometry=true&f=geojson"
     
+    # Deferred import - httpx is only needed when the dashboard fetches geometries
+    import httpx
     try:
         async with httpx.AsyncClient() as client:
             response = await client.get(url)
             response.raise_for_status()
             return response.json()
     except Exception as error:
-        print(f"Error fetching ISO3 coordinates: {error}")
+        logger.error("Error fetching ISO3 coordinates: %s", error)
         return {}
 
+async def stream_json_array(first_chunk: List[dict], chunks):
+    """
+    Encode streamed row chunks as a JSON array without holding the whole table.
+    The status line is already sent when a later chunk fails, so the error is logged and the
+    body ends without its closing "]" - clients see invalid JSON rather than a short list.
+    """
+    try:
+        yield b"["
+        if first_chunk:
+            yield ",".join(json.dumps(jsonable_encoder(row)) for row in first_chunk).encode()
+        written = bool(first_chunk)
+        async for chunk in chunks:
+            if chunk:
+                encoded = ",".join(json.dumps(jsonable_encoder(row)) for row in chunk).encode()
+                yield (b"," if written else b"") + encoded
+                written = True
+        yield b"]"
+    except Exception as e:
+        logger.error("FAST report stream failed midway, ending the response unterminated: %s", e)
+    finally:
+        await chunks.aclose()
+
 @router.get("/")
 async def get_fast_reports(current_user: dict = Depends(get_current_user)):
-    """Get all fast report entries"""
+    """Get all fast report entries - streamed in chunks from a server-side cursor"""
     try:
-        result = await db_helper.execute_main_query("SELECT * FROM FAST_Report ORDER BY Year DESC, Quarter DESC")
-        if result["error"]:
-            raise HTTPException(status_code=500, detail=result["error"])
-        return result["data"]
+        chunks = db_helper.stream_main_query("SELECT * FROM FAST_Report ORDER BY Year DESC, Quarter DESC")
+        # Pull the first chunk here so query errors still surface as a 500 before streaming starts
+        first_chunk = await anext(chunks, [])
+        return StreamingResponse(stream_json_array(first_chunk, chunks), media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -193,22 +222,20 @@ async def delete_fast_report(
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/summary")
-async def get_fast_report_summary(current_user: dict = Depends(get_current_user)):
+async def get_fast_report_summary(
+    current_user: dict = Depends(get_current_user),
+    session: DatabaseSession = Depends(get_db_session("main", read_only=True))
+):
     """Get summary statistics for fast reports"""
     try:
-        # Get counts by year
-        year_counts = await db_helper.execute_main_query(
-            "SELECT Year, COUNT(*) as count FROM FAST_Report GROUP BY Year ORDER BY Year DESC"
-        )
-        
-        # Get counts by region
-        region_counts = await db_helper.execute_main_query(
-            "SELECT Region, COUNT(*) as count FROM FAST_Report GROUP BY Region ORDER BY count DESC"
-        )
-        
-        # Get counts by disease
-        disease_counts = await db_helper.execute_main_query(
-            "SELECT Disease, COUNT(*) as count FROM FAST_Report GROUP BY Disease ORDER BY count DESC"
+        # The three GROUP BYs share one request-scoped connection
+        year_counts, region_counts, disease_counts = await asyncio.gather(
+            # Counts by year
+            session.execute("SELECT Year, COUNT(*) as count FROM FAST_Report GROUP BY Year ORDER BY Year DESC"),
+            # Counts by region
+            session.execute("SELECT Region, COUNT(*) as count FROM FAST_Report GROUP BY Region ORDER BY count DESC"),
+            # Counts by disease
+            session.execute("SELECT Disease, COUNT(*) as count FROM FAST_Report GROUP BY Disease ORDER BY count DESC")
         )
         
         return {
@@ -225,7 +252,9 @@ async def create_dashboard():
     """Create dashboard data matching Vue implementation"""
     try:
         # Fetch fast report data
-        result = await db_helper.execute_main_query("SELECT * FROM FAST_Report ORDER BY Report_Date DESC")
+        result = await db_helper.execute_main_query(
+            "SELECT * FROM FAST_Report ORDER BY Report_Date DESC", coalesce=True
+        )
         if result["error"]:
             raise HTTPException(status_code=500, detail=result["error"])
         
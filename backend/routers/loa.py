@@ -3,32 +3,47 @@ from typing import List, Optional
 from models import ResponseModel
 from auth import get_current_user
 from database import db_helper
+from config import settings
 
 router = APIRouter(prefix="/api/LOA", tags=["LOA"])
 
+LOA_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS LOAs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    `group` VARCHAR(255),
+    responsible VARCHAR(255),
+    supplier VARCHAR(255),
+    start_date DATE,
+    end_date DATE,
+    description TEXT,
+    PO VARCHAR(255),
+    FO VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+_loa_table_ready = False
+
+async def ensure_loa_table():
+    """Create the LOAs table once per process (matching Vue structure) - running the DDL on
+    every request would also invalidate the cached LOA list each time"""
+    global _loa_table_ready
+    if _loa_table_ready:
+        return
+    result = await db_helper.execute_main_query(LOA_TABLE_QUERY)
+    if not result["error"]:
+        _loa_table_ready = True
+
 @router.get("/")
 async def get_loas(current_user: dict = Depends(get_current_user)):
     """Get all LOAs"""
     try:
-        # First, try to create the table if it doesn't exist (matching Vue structure)
-        create_table_query = """
-        CREATE TABLE IF NOT EXISTS LOAs (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            `group` VARCHAR(255),
-            responsible VARCHAR(255),
-            supplier VARCHAR(255),
-            start_date DATE,
-            end_date DATE,
-            description TEXT,
-            PO VARCHAR(255),
-            FO VARCHAR(255),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """
-        await db_helper.execute_main_query(create_table_query)
+        # First, make sure the table exists
+        await ensure_loa_table()
         
         # Then get all LOAs
-        result = await db_helper.execute_main_query("SELECT * FROM LOAs ORDER BY id DESC")
+        result = await db_helper.execute_main_query(
+            "SELECT * FROM LOAs ORDER BY id DESC", cache_ttl=settings.reference_data_cache_ttl
+        )
         if result["error"]:
             raise HTTPException(status_code=500, detail=result["error"])
         
@@ -52,21 +67,7 @@ async def add_loa(
     """Add new LOA"""
     try:
         # Ensure the table exists
-        create_table_query = """
-        CREATE TABLE IF NOT EXISTS LOAs (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            `group` VARCHAR(255),
-            responsible VARCHAR(255),
-            supplier VARCHAR(255),
-            start_date DATE,
-            end_date DATE,
-            description TEXT,
-            PO VARCHAR(255),
-            FO VARCHAR(255),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """
-        await db_helper.execute_main_query(create_table_query)
+        await ensure_loa_table()
         
         required_fields = ['group', 'responsible', 'supplier', 'start_date', 'end_date', 'description', 'PO', 'FO']
         
@@ -2,15 +2,19 @@ from fastapi import APIRouter, HTTPException, Depends, status
 from typing import List
 from models import PCPEntry, PCPEntryCreate, PCPUniqueValues, ResponseModel
 from auth import get_current_user
-from database import db_helper
+from database import db_helper, DatabaseSession, get_db_session
+from config import settings
+import asyncio
+from app_logging import get_logger
 
 router = APIRouter(prefix="/api/pcp", tags=["pcp"])
+logger = get_logger("pcp")
 
 @router.get("/", response_model=List[PCPEntry])
 async def get_pcp_data(current_user: dict = Depends(get_current_user)):
     """Get all PCP data"""
     try:
-        result = await db_helper.execute_pcp_query("SELECT * FROM PCP.PCP_DB")
+        result = await db_helper.execute_pcp_query("SELECT * FROM PCP.PCP_DB", cache_ttl=settings.reference_data_cache_ttl)
         if result["error"]:
             raise HTTPException(status_code=500, detail=result["error"])
         
@@ -38,98 +42,94 @@ async def add_pcp_entry(
 ):
     """Add or update PCP entry"""
     try:
-        print(f"Received PCP entry data: {pcp_entry}")
-        
-        # Check if record exists
-        check_query = "SELECT * FROM PCP.PCP_DB WHERE Country = %s AND Year = %s"
-        existing_result = await db_helper.execute_pcp_query(
-            check_query, 
-            (str(pcp_entry.Country), str(pcp_entry.Year))
-        )
-        
-        if existing_result["error"]:
-            print(f"Error checking existing record: {existing_result['error']}")
-            raise HTTPException(status_code=500, detail=existing_result["error"])
+        logger.debug("Received PCP entry data: %s", pcp_entry)
         
         last_meeting_value = pcp_entry.Last_RMM_held
-        print(f"Last meeting value: {last_meeting_value}")
-        print(f"PSO Support value: {pcp_entry.psoSupport}")
-        
-        if existing_result["data"]:
-            print("Updating existing record")
-            # Update existing record
-            update_query = """
-                UPDATE PCP.PCP_DB 
-                SET PCP_Stage = %s, `Last meeting attended` = %s, `PSO support` = %s
-                WHERE Country = %s AND Year = %s
-            """
-            result = await db_helper.execute_pcp_query(
-                update_query,
-                (str(pcp_entry.PCP_Stage), str(last_meeting_value), str(pcp_entry.psoSupport), 
-                 str(pcp_entry.Country), str(pcp_entry.Year))
-            )
+        logger.debug("Last meeting value: %s", last_meeting_value)
+        logger.debug("PSO Support value: %s", pcp_entry.psoSupport)
+        
+        # Existence check and write share one transaction; lock_rows locks the (Country, Year)
+        # row - or the gap where it would go - so two concurrent adds cannot both insert
+        async with db_helper.transaction("pcp") as tx:
+            check_query = "SELECT 1 FROM PCP.PCP_DB WHERE Country = %s AND Year = %s LIMIT 1"
+            try:
+                existing_result = await tx.execute(
+                    check_query, (str(pcp_entry.Country), str(pcp_entry.Year)), lock_rows=True
+                )
+            except Exception as e:
+                logger.error("Error checking existing record: %s", e)
+                raise HTTPException(status_code=500, detail=str(e))
             
-            if result["error"]:
-                print(f"Error updating record: {result['error']}")
-                raise HTTPException(status_code=400, detail=result["error"])
+            if existing_result["data"]:
+                logger.debug("Updating existing record")
+                # Update existing record
+                update_query = """
+                    UPDATE PCP.PCP_DB 
+                    SET PCP_Stage = %s, `Last meeting attended` = %s, `PSO support` = %s
+                    WHERE Country = %s AND Year = %s
+                """
+                params = (str(pcp_entry.PCP_Stage), str(last_meeting_value), str(pcp_entry.psoSupport),
+                          str(pcp_entry.Country), str(pcp_entry.Year))
+                current_status, message = "updated", "PCP entry updated successfully"
+            else:
+                logger.debug("Inserting new record")
+                # Insert new record
+                update_query = """
+                    INSERT INTO PCP.PCP_DB (Country, Year, PCP_Stage, `Last meeting attended`, `PSO support`)
+                    VALUES (%s, %s, %s, %s, %s)
+                """
+                params = (str(pcp_entry.Country), str(pcp_entry.Year), str(pcp_entry.PCP_Stage),
+                          str(last_meeting_value), str(pcp_entry.psoSupport))
+                current_status, message = "created", "PCP entry created successfully"
+                logger.debug("Insert values: %s", params)
             
-            return {
-                "status": "updated",
-                "message": "PCP entry updated successfully"
-            }
-        else:
-            print("Inserting new record")
-            # Insert new record
-            insert_query = """
-                INSERT INTO PCP.PCP_DB (Country, Year, PCP_Stage, `Last meeting attended`, `PSO support`)
-                VALUES (%s, %s, %s, %s, %s)
-            """
-            print(f"Insert query: {insert_query}")
-            print(f"Insert values: {(pcp_entry.Country, pcp_entry.Year, pcp_entry.PCP_Stage, last_meeting_value, pcp_entry.psoSupport)}")
-            
-            result = await db_helper.execute_pcp_query(
-                insert_query,
-                (str(pcp_entry.Country), str(pcp_entry.Year), str(pcp_entry.PCP_Stage), 
-                 str(last_meeting_value), str(pcp_entry.psoSupport))
-            )
-            
-            if result["error"]:
-                print(f"Error inserting record: {result['error']}")
-                raise HTTPException(status_code=400, detail=result["error"])
-            
-            return {
-                "status": "created",
-                "message": "PCP entry created successfully"
-            }
+            try:
+                await tx.execute(update_query, params)
+            except Exception as e:
+                logger.error("Error writing record: %s", e)
+                raise HTTPException(status_code=400, detail=str(e))
+        
+        return {
+            "status": current_status,
+            "message": message
+        }
             
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Exception in add_pcp_entry: {str(e)}")
+        logger.error("Exception in add_pcp_entry: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/unique-values", response_model=PCPUniqueValues)
-async def get_unique_values(current_user: dict = Depends(get_current_user)):
+async def get_unique_values(
+    current_user: dict = Depends(get_current_user),
+    session: DatabaseSession = Depends(get_db_session("pcp", read_only=True))
+):
     """Get unique countries, regions, and stages from PCP database"""
     try:
-        # Get unique countries
-        countries_result = await db_helper.execute_pcp_query(
-            "SELECT DISTINCT Country FROM PCP.PCP_DB WHERE Country IS NOT NULL ORDER BY Country"
-        )
-        
-        # Get unique regions (RMM)
-        regions_result = await db_helper.execute_pcp_query(
-            "SELECT DISTINCT RMM FROM PCP.PCP_DB WHERE RMM IS NOT NULL ORDER BY RMM"
-        )
-        
-        # Get unique stages
-        stages_result = await db_helper.execute_pcp_query(
-            "SELECT DISTINCT PCP_Stage FROM PCP.PCP_DB WHERE PCP_Stage IS NOT NULL ORDER BY PCP_Stage"
-        )
-        
-        # Get unique PSO support values
-        pso_result = await db_helper.execute_pcp_query(
-            "SELECT DISTINCT `PSO support` FROM PCP.PCP_DB WHERE `PSO support` IS NOT NULL ORDER BY `PSO support`"
+        # Column-oriented results - each query only needs its one column as a list.
+        # All four share one request-scoped connection.
+        countries_result, regions_result, stages_result, pso_result = await asyncio.gather(
+            # Unique countries
+            session.execute(
+                "SELECT DISTINCT Country FROM PCP.PCP_DB WHERE Country IS NOT NULL ORDER BY Country",
+                result_format="columns"
+            ),
+            # Unique regions (RMM)
+            session.execute(
+                "SELECT DISTINCT RMM FROM PCP.PCP_DB WHERE RMM IS NOT NULL ORDER BY RMM",
+                result_format="columns"
+            ),
+            # Unique stages
+            session.execute(
+                "SELECT DISTINCT PCP_Stage FROM PCP.PCP_DB WHERE PCP_Stage IS NOT NULL ORDER BY PCP_Stage",
+                result_format="columns"
+            ),
+            # Unique PSO support values
+            session.execute(
+                "SELECT DISTINCT `PSO support` FROM PCP.PCP_DB WHERE `PSO support` IS NOT NULL ORDER BY `PSO support`",
+                result_format="columns"
+            )
         )
         
         if (countries_result["error"] or regions_result["error"] or 
@@ -138,10 +138,10 @@ async def get_unique_values(current_user: dict = Depends(get_current_user)):
                         stages_result["error"] or pso_result["error"])
             raise HTTPException(status_code=500, detail=error_msg)
         
-        countries = [row["Country"] for row in countries_result["data"] if row["Country"]]
-        regions = [row["RMM"] for row in regions_result["data"] if row["RMM"]]
-        stages = [row["PCP_Stage"] for row in stages_result["data"] if row["PCP_Stage"]]
-        pso_support = [row["PSO support"] for row in pso_result["data"] if row["PSO support"]]
+        countries = [value for value in countries_result["data"]["Country"] if value]
+        regions = [value for value in regions_result["data"]["RMM"] if value]
+        stages = [value for value in stages_result["data"]["PCP_Stage"] if value]
+        pso_support = [value for value in pso_result["data"]["PSO support"] if value]
         
         return {
             "countries": countries,
@@ -5,22 +5,29 @@ import json
 from datetime import datetime
 from auth import get_current_user
 import pymysql
+import time
 from config import settings
+from query_metrics import InstrumentedDictCursor
+from app_logging import get_logger
 
 router = APIRouter(prefix="/api/risp", tags=["risp"])
+logger = get_logger("risp")
 
 # Database connection function
 def get_db_connection():
     """Get database connection for RISP data"""
     try:
+        connect_started = time.perf_counter()
         connection = pymysql.connect(
             host=settings.db_host,
             user=settings.db_user,
             password=settings.db_pass,
             database=settings.db_name,  # Use main database for RISP
             charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor
+            cursorclass=InstrumentedDictCursor  # DictCursor that records per-query metrics
         )
+        # Connect time is reported as wait time on the first statement
+        connection.nexus_connect_wait = time.perf_counter() - connect_started
         return connection
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database connection failed: {str(e)}")
@@ -168,9 +175,9 @@ async def save_outbreak_data(
         return {"message": "Outbreak data saved successfully"}
         
     except Exception as e:
-        print(f"Error saving outbreak data: {str(e)}")
-        print(f"Data received: {data}")
-        print(f"Values prepared: {values}")
+        logger.error("Error saving outbreak data: %s", e)
+        logger.debug("Data received: %s", data)
+        logger.debug("Values prepared: %s", values)
         raise HTTPException(status_code=500, detail=f"Error saving outbreak data: {str(e)}")
 
 # Surveillance endpoints
@@ -4,9 +4,20 @@ from typing import List
 from models import Country, DiseaseStatus, MitigationMeasure
 from auth import get_current_user, get_current_user_optional
 from database import db_helper
+from config import settings
 
 router = APIRouter(prefix="/api/rmt", tags=["rmt"])
 
+EU_NEIGHBOURS_QUERY = "SELECT id, iso3, name_un, subregion, eufmd_nc FROM countries WHERE eufmd_nc = 1 ORDER BY name_un ASC"
+COUNTRIES_QUERY = "SELECT id, iso3, name_un, subregion FROM countries ORDER BY name_un ASC"
+
+async def warm_country_lists():
+    """Prime the result cache with the country lists - run by the startup warm-up"""
+    for query in (EU_NEIGHBOURS_QUERY, COUNTRIES_QUERY):
+        result = await db_helper.execute_main_query(query, coalesce=True, cache_ttl=settings.reference_data_cache_ttl)
+        if result["error"]:
+            raise RuntimeError(result["error"])
+
 @router.get("/")
 async def rmt_root():
     """RMT root endpoint"""
@@ -19,7 +30,8 @@ async def get_eu_neighbour_countries():
         # Query matches the Vue app: eufmd_nc = 1 for EU neighbouring countries
         # Use main database since countries table is in main DB
         result = await db_helper.execute_main_query(
-            "SELECT id, iso3, name_un, subregion, eufmd_nc FROM countries WHERE eufmd_nc = 1 ORDER BY name_un ASC"
+            EU_NEIGHBOURS_QUERY,
+            coalesce=True, cache_ttl=settings.reference_data_cache_ttl
         )
         if result["error"]:
             raise HTTPException(status_code=500, detail=result["error"])
@@ -33,7 +45,9 @@ async def get_countries():
     """Get all countries"""
     try:
         result = await db_helper.execute_main_query(
-            "SELECT id, iso3, name_un, subregion FROM countries ORDER BY name_un ASC"
+            COUNTRIES_QUERY,
+            # Dashboards load this on every page open - share concurrent executions and cache the result
+            coalesce=True, cache_ttl=settings.reference_data_cache_ttl
         )
         if result["error"]:
             raise HTTPException(status_code=500, detail=result["error"])
@@ -7,8 +7,10 @@ from models import (
 )
 from database import db_helper
 from auth import get_current_user, get_current_user_optional
+from app_logging import get_logger
 
 router = APIRouter(prefix="/api/rmt-data", tags=["rmt-data"])
+logger = get_logger("rmt_data")
 
 def user_can_save_rmt_data(user: Dict[str, Any]) -> bool:
     """Check if user has permission to save RMT data"""
@@ -33,7 +35,8 @@ async def get_disease_status(user=Depends(get_current_user_optional)):
             )
             ORDER BY country_id
             """
-            result = await db_helper.execute_main_query(query)
+            # Identical for every anonymous visitor - concurrent requests share one execution
+            result = await db_helper.execute_main_query(query, coalesce=True)
             if result["error"]:
                 raise HTTPException(status_code=500, detail=result["error"])
             return result["data"]
@@ -104,21 +107,23 @@ async def save_disease_status(
                 date = VALUES(date)
         """
         
-        rows_processed = 0
-        for item in data:
-            params = (
+        # All rows are written in one transaction with multi-row INSERTs
+        params_list = [
+            (
                 item.country_id, item.FMD, item.PPR, item.LSD, 
                 item.RVF, item.SPGP, item.date, current_user['id']
             )
-            
-            result = await db_helper.execute_main_query(insert_query, params)
-            if result["error"]:
-                print(f"Error inserting/updating disease status data: {result['error']}, params: {params}")
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Error saving data: {result['error']}"
-                )
-            rows_processed += 1
+            for item in data
+        ]
+        
+        result = await db_helper.execute_main_many(insert_query, params_list)
+        if result["error"]:
+            logger.error("Error inserting/updating disease status data: %s, rows: %s", result['error'], len(params_list))
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error saving data: {result['error']}"
+            )
+        rows_processed = len(params_list)
         
         return ResponseModel(
             message=f"Successfully saved {rows_processed} disease status records",
@@ -129,7 +134,7 @@ async def save_disease_status(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Unexpected error in save_disease_status: {str(e)}")
+        logger.error("Unexpected error in save_disease_status: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error saving disease status: {str(e)}"
@@ -154,7 +159,8 @@ async def get_mitigation_measures(user=Depends(get_current_user_optional)):
             )
             ORDER BY country_id
             """
-            result = await db_helper.execute_main_query(query)
+            # Identical for every anonymous visitor - concurrent requests share one execution
+            result = await db_helper.execute_main_query(query, coalesce=True)
             if result["error"]:
                 raise HTTPException(status_code=500, detail=result["error"])
             return result["data"]
@@ -225,21 +231,23 @@ async def save_mitigation_measures(
                 date = VALUES(date)
         """
         
-        rows_processed = 0
-        for item in data:
-            params = (
+        # All rows are written in one transaction with multi-row INSERTs
+        params_list = [
+            (
                 item.country_id, item.FMD, item.PPR, item.LSD, 
                 item.RVF, item.SPGP, item.date, current_user['id']
             )
-            
-            result = await db_helper.execute_main_query(insert_query, params)
-            if result["error"]:
-                print(f"Error inserting/updating mitigation measures data: {result['error']}, params: {params}")
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Error saving data: {result['error']}"
-                )
-            rows_processed += 1
+            for item in data
+        ]
+        
+        result = await db_helper.execute_main_many(insert_query, params_list)
+        if result["error"]:
+            logger.error("Error inserting/updating mitigation measures data: %s, rows: %s", result['error'], len(params_list))
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error saving data: {result['error']}"
+            )
+        rows_processed = len(params_list)
         
         return ResponseModel(
             message=f"Successfully saved {rows_processed} mitigation measures records",
@@ -250,7 +258,7 @@ async def save_mitigation_measures(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Unexpected error in save_mitigation_measures: {str(e)}")
+        logger.error("Unexpected error in save_mitigation_measures: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error saving mitigation measures: {str(e)}"
@@ -303,22 +311,24 @@ async def save_connections(
                 livestockDensity = VALUES(livestockDensity)
         """
         
-        rows_processed = 0
-        for item in data:
-            params = (
+        # All rows are written in one transaction with multi-row INSERTs
+        params_list = [
+            (
                 item.country_id, item.liveAnimalContact, item.legalImport, 
                 item.proximity, item.illegalImport, item.connection, 
                 item.livestockDensity, current_user['id']
             )
-            
-            result = await db_helper.execute_main_query(insert_query, params)
-            if result["error"]:
-                print(f"Error inserting/updating connections data: {result['error']}, params: {params}")
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Error saving data: {result['error']}"
-                )
-            rows_processed += 1
+            for item in data
+        ]
+        
+        result = await db_helper.execute_main_many(insert_query, params_list)
+        if result["error"]:
+            logger.error("Error inserting/updating connections data: %s, rows: %s", result['error'], len(params_list))
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error saving data: {result['error']}"
+            )
+        rows_processed = len(params_list)
         
         return ResponseModel(
             message=f"Successfully saved {rows_processed} connections records",
@@ -329,7 +339,7 @@ async def save_connections(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Unexpected error in save_connections: {str(e)}")
+        logger.error("Unexpected error in save_connections: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error saving connections: {str(e)}"
@@ -3,6 +3,7 @@ from typing import List, Optional
 from models import ResponseModel
 from auth import get_current_user
 from database import db_helper
+from config import settings
 
 router = APIRouter(prefix="/api/stock", tags=["stock"])
 
@@ -11,7 +12,7 @@ async def get_stocks(current_user: dict = Depends(get_current_user)):
     """Get all stock entries"""
     try:
         query = "SELECT * FROM stock_entry"
-        result = await db_helper.execute_main_query(query)
+        result = await db_helper.execute_main_query(query, cache_ttl=settings.reference_data_cache_ttl)
         if result["error"]:
             raise HTTPException(status_code=500, detail=result["error"])
         return result["data"]
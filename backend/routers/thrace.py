@@ -1,38 +1,50 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from typing import List, Dict, Any
-from database import DatabaseHelper, thrace_engine
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional
+from database import DatabaseHelper, ExecutorSaturated, DatabaseSession, get_db_session, get_engine, get_read_engine
+from query_cancel import QueryCancelScope, QueryCancelled, QueryTimeout, cancel_on_disconnect
+from config import settings
+import asyncio
+import time
 from auth import get_current_user
 from datetime import datetime
-import openpyxl
-from io import BytesIO
 import json
 from .thrace_calculator import ThraceCalculator
+from .thrace_workbook import MAX_DATA_ROWS, UploadWorkbook, spool_upload
+from .thrace_validation import NATURAL_KEY_FIELDS, RowValidator, natural_key_digest
+from app_logging import get_logger, log_sampled
+from upload_jobs import JobQueueFull, UploadJob, upload_jobs
+import logging
 
 router = APIRouter(prefix="/api/thrace", tags=["thrace"])
+logger = get_logger("thrace")
 
 # Global cache for epiunits mapping - loaded once at startup
 _epiunits_cache: Dict[str, int] = {}
 _cache_loaded = False
 
 async def load_epiunits_cache():
-    """Load epiunits mapping cache at startup (called once)"""
+    """Load epiunits mapping cache - by the startup warm-up, or the first upload if that failed"""
     global _epiunits_cache, _cache_loaded
     if _cache_loaded:
         return
     
-    print("Loading epiunits cache at startup...")
+    logger.debug("Loading epiunits cache...")
     epiunits_query = "SELECT epiunitID, epiunitcountrycode FROM thrace.epiunits"
     epiunits_result = await DatabaseHelper.execute_thrace_query(epiunits_query)
     
-    if epiunits_result.get("data"):
-        for row in epiunits_result["data"]:
-            code = row.get("epiunitcountrycode")
-            uid = row.get("epiunitID")
-            if code and uid:
-                _epiunits_cache[code] = uid
+    if epiunits_result.get("error"):
+        # Leave the cache unloaded so the next upload (or warm-up retry) tries again
+        raise RuntimeError(f"Could not load epiunits: {epiunits_result['error']}")
+    
+    for row in epiunits_result["data"]:
+        code = row.get("epiunitcountrycode")
+        uid = row.get("epiunitID")
+        if code and uid:
+            _epiunits_cache[code] = uid
     
     _cache_loaded = True
-    print(f"Epiunits cache loaded with {len(_epiunits_cache)} mappings")
+    logger.info("Epiunits cache loaded with %s mappings", len(_epiunits_cache))
 
 @router.get("/inspectors")
 async def get_inspectors(current_user: dict = Depends(get_current_user)):
@@ -72,6 +84,158 @@ async def get_inspectors(current_user: dict = Depends(get_current_user)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching inspectors: {str(e)}")
 
+# Each upload replaces the user's previous one - cleared in the same transaction as the new rows are inserted
+CLEAR_STAGING_QUERY = "DELETE FROM thrace.factivities_tmp WHERE userID = %s"
+
+# Staging rows for the upload (the 51 factivities_tmp columns, 6 of them the newer "tested" counts)
+INSERT_STAGING_QUERY = """
+    INSERT INTO factivities_tmp (
+        epiunitID, inspectorID, dt_insp, cattle, sheep, goat, pig, buffalo,
+        cattleexam, cattlecliposFMD, cattlecliposLSD,
+        sheepexam, sheepposFMD, sheepposSGP, sheepposPPR,
+        goatsexam, goatsposFMD, goatsposSGP, goatsposPPR,
+        buffaloesexam, buffaloesposFMD, buffaloesposLSD,
+        cattlesample, cattleseroposFMD, cattleseroposLSD,
+        sheepsample, sheepseroposFMD, sheepseroposSGP, sheepseroposPPR,
+        goatsample, goatsseroposFMD, goatsseroposSGP, goatsseroposPPR,
+        pigssample, pigsserosposFMD,
+        buffaloessample, buffaloesseroposFMD, buffaloesseroposLSD,
+        wildsample, wildserosposFMD,
+        cattletested, sheeptested, goattested, buffalotested, pigtested, wildtested,
+        errore, dt_inival, userID, epiunitcountrycode, villagename
+    ) VALUES (
+        %s, %s, %s, %s, %s, %s, %s, %s,
+        %s, %s, %s,
+        %s, %s, %s, %s,
+        %s, %s, %s, %s,
+        %s, %s, %s,
+        %s, %s, %s,
+        %s, %s, %s, %s,
+        %s, %s, %s, %s,
+        %s, %s,
+        %s, %s, %s,
+        %s, %s,
+        %s, %s, %s, %s, %s, %s,
+        %s, %s, %s, %s, %s
+    )
+"""
+
+async def ingest_upload(spool, user_id: int, max_rows: Optional[int], job: UploadJob = None) -> dict:
+    """
+    Validate the rows of a spooled THRACE workbook and stage them in factivities_tmp in place
+    of the user's previous upload. Shared by the upload endpoint (400 rows at most) and upload
+    jobs; progress is reported on `job` when given. Closes `spool`; failures raise HTTPException.
+    """
+    # Reading and validating rows is blocking work - it runs on the upload job threads, or on
+    # the interactive upload threads for a request, so queued jobs never hold up the request path
+    try:
+        workbook = await upload_jobs.run_blocking(job, UploadWorkbook, spool)
+    except Exception:
+        spool.close()
+        raise
+    
+    logger.debug("Mapped %s columns from Excel header", len(workbook.column_map))
+    logger.debug("Using cached epiunits mapping with %s entries", len(_epiunits_cache))
+    validator = RowValidator(workbook.column_map, _epiunits_cache, user_id)
+    rows = workbook.rows(max_rows)
+    
+    clean_rows = 0
+    error_rows = 0
+    total_rows = 0
+    inserted_count = 0
+    error_messages = []
+    started = time.perf_counter()
+    
+    def read_block():
+        """Read the next db_bulk_chunk_size data rows and validate them - an empty list at the end"""
+        nonlocal total_rows
+        block = []
+        for row_idx, row in rows:
+            # Check if row is completely empty
+            if all(value is None for value in row):
+                continue
+            
+            # PHP code checks if year is empty to stop processing
+            if not validator.is_data_row(row):
+                if row_idx <= 10:
+                    log_sampled(logger, logging.DEBUG, "Row %s skipped: Year is empty or None", row_idx)
+                continue
+            
+            total_rows += 1
+            if row_idx <= 6:
+                log_sampled(logger, logging.DEBUG, "Row %s ACCEPTED: total_rows=%s", row_idx, total_rows)
+            
+            block.append((row_idx, row))
+            if len(block) >= settings.db_bulk_chunk_size:
+                break
+        return validator.validate_block(block)
+    
+    try:
+        # One transaction: the DELETE, then a multi-row INSERT per block of rows as it is validated.
+        # Any failure rolls the lot back, leaving the previous upload in place.
+        async with DatabaseHelper.transaction("thrace") as tx:
+            await tx.execute(CLEAR_STAGING_QUERY, (user_id,))
+            
+            while True:
+                results = await upload_jobs.run_blocking(job, read_block)
+                if not results:
+                    break
+                
+                staged = []
+                for result in results:
+                    # Rows with validation errors are staged too (errore holds the messages);
+                    # only rows that could not be parsed at all are left out
+                    if result.params is not None:
+                        staged.append(result.params)
+                    if result.error:
+                        error_rows += 1
+                        error_messages.append(f"Row {result.number}: {result.error}")
+                    else:
+                        clean_rows += 1
+                
+                if staged:
+                    await tx.execute_many(INSERT_STAGING_QUERY, staged)
+                    inserted_count += len(staged)
+                
+                if job is not None:
+                    job.update(rows_parsed=total_rows, rows_validated=clean_rows + error_rows,
+                               rows_inserted=inserted_count)
+    except Exception as insert_error:
+        logger.error("Staging insert error: %s", insert_error)
+        raise HTTPException(status_code=500, detail=f"Database insert error: {str(insert_error)}")
+    finally:
+        workbook.close()
+        spool.close()
+    
+    elapsed = time.perf_counter() - started
+    rows_per_second = round(inserted_count / elapsed, 1) if elapsed > 0 else None
+    
+    if not inserted_count:
+        return {
+            "success": False,
+            "message": "No valid data rows found in file",
+            "total_rows": total_rows,
+            "clean_rows": clean_rows,
+            "error_rows": error_rows,
+            "inserted_count": 0
+        }
+    
+    logger.info("Inserted %s rows into factivities_tmp in %.0f ms (%s rows/s)",
+                inserted_count, elapsed * 1000, rows_per_second,
+                extra={"user_id": user_id, "rows": inserted_count, "rows_per_second": rows_per_second})
+    
+    return {
+        "success": True,
+        "message": f"Uploaded {total_rows} rows ({clean_rows} clean, {error_rows} with errors)",
+        "total_rows": total_rows,
+        "clean_rows": clean_rows,
+        "error_rows": error_rows,
+        "inserted_count": inserted_count,
+        "rows_per_second": rows_per_second,
+        "errors": error_messages if error_messages else None,
+        "status": "pending_approval"
+    }
+
 @router.post("/upload-data")
 async def upload_thrace_data(
     file: UploadFile = File(...),
@@ -81,9 +245,10 @@ async def upload_thrace_data(
     Upload Excel file with THRACE surveillance data (45-column format matching old PHP app)
     Validates data and saves to factivities_tmp table with error tracking
     Allows rows with errors to be saved (errore field contains error description)
+    Reads 400 data rows at most - larger workbooks go through POST /upload-jobs
     """
     try:
-        print(f"Upload endpoint called - file: {file.filename}, user_id: {current_user.get('user_id')}")
+        logger.debug("Upload endpoint called - file: %s, user_id: %s", file.filename, current_user.get('user_id'))
         
         # Ensure epiunits cache is loaded
         await load_epiunits_cache()
@@ -96,432 +261,97 @@ async def upload_thrace_data(
         if not file.filename.endswith('.xlsx'):
             raise HTTPException(status_code=400, detail="Only .xlsx files are allowed")
         
-        print(f"File validation passed: {file.filename}")
-        
-        # Read Excel file with calculated values (data_only=True reads formula results, not formulas)
-        contents = await file.read()
-        workbook = openpyxl.load_workbook(BytesIO(contents), data_only=True)
-        worksheet = workbook.active
-        
-        # Read header row (row 1) to map Excel columns to database fields
-        header_row = worksheet[1]
-        column_map = {}
-        
-        # Map Excel column headers to database field names
-        header_to_field = {
-            'InspectorID': 'inspectorID',
-            'Village/Epiunit code': 'epiunitcountrycode',
-            'Year': 'year',
-            'Month': 'month',
-            'Day': 'day',
-            'Cattle': 'cattle',
-            'Sheep': 'sheep',
-            'Goats': 'goat',
-            'Pigs': 'pig',
-            'W Buffalo': 'buffalo',
-            'Cattle clin exam': 'cattleexam',
-            'Cattle tested': 'cattletested',
-            'Cattle clin pos FMD': 'cattlecliposFMD',
-            'Cattle clin pos LSD': 'cattlecliposLSD',
-            'Sheep clin exam': 'sheepexam',
-            'Sheep clin pos FMD': 'sheepposFMD',
-            'Sheep clin pos SGP': 'sheepposSGP',
-            'Sheep clin pos PPR': 'sheepposPPR',
-            'Goats clin exam': 'goatsexam',
-            'Goats clin pos FMD': 'goatsposFMD',
-            'Goats clin pos SGP': 'goatsposSGP',
-            'Goats clin pos PPR': 'goatsposPPR',
-            'Buffalo clin exam': 'buffaloesexam',
-            'Buffalo clin pos FMD': 'buffaloesposFMD',
-            'Buffalo clin pos LSD': 'buffaloesposLSD',
-            'Cattle smpl': 'cattlesample',
-            'Cattle sero pos FMD': 'cattleseroposFMD',
-            'Cattle pos LSD': 'cattleseroposLSD',
-            'Sheep tested': 'sheeptested',
-            'Sheep smpl': 'sheepsample',
-            'Sheep sero pos FMD': 'sheepseroposFMD',
-            'Sheep test pos SGP': 'sheepseroposSGP',
-            'Sheep sero pos PPR': 'sheepseroposPPR',
-            'Goats tested': 'goattested',
-            'Goats smpl': 'goatsample',
-            'Goats sero pos FMD': 'goatsseroposFMD',
-            'Goats test pos SGP': 'goatsseroposSGP',
-            'Goat sero pos PPR': 'goatsseroposPPR',
-            'Pigs tested': 'pigtested',
-            'Pigs smpl': 'pigssample',
-            'Pigs sero pos FMD': 'pigsserosposFMD',
-            'Buffalo tested': 'buffalotested',
-            'Buffalo smpl': 'buffaloessample',
-            'Buffalo sero pos FMD': 'buffaloesseroposFMD',
-            'Buffalo test pos LSD': 'buffaloesseroposLSD',
-            'Wild tested': 'wildtested',
-            'Wild smpl': 'wildsample',
-            'Wild sero pos FMD': 'wildserosposFMD'
-        }
-        
-        # Build column index map
-        for col_idx, cell in enumerate(header_row):
-            header_value = str(cell.value).strip() if cell.value else None
-            if header_value and header_value in header_to_field:
-                column_map[header_to_field[header_value]] = col_idx
-        
-        print(f"Mapped {len(column_map)} columns from Excel header")
-        
-        user_id = current_user.get('user_id')
-        
-        # Clear previous upload for this user - each upload is fresh
-        print(f"Clearing previous staging data for user {user_id}...")
-        clear_query = "DELETE FROM thrace.factivities_tmp WHERE userID = %s"
-        await DatabaseHelper.execute_thrace_query(clear_query, (user_id,))
-        print(f"Staging table cleared for user {user_id}")
-        
-        # Use cached epiunits mapping
-        epiunits_map = _epiunits_cache
-        print(f"Using cached epiunits mapping with {len(epiunits_map)} entries")
-        
-        clean_rows = 0
-        error_rows = 0
-        total_rows = 0
-        inserted_data = []
-        error_messages = []
-        
-        # Process rows 2 to 401 (400 data rows max, row 1 is header)
-        for row_idx in range(2, min(402, worksheet.max_row + 1)):
-            row = worksheet[row_idx]
-            
-            # Helper function to get cell value by field name
-            def get_value(field_name):
-                if field_name in column_map:
-                    return row[column_map[field_name]].value
-                return None
-            
-            # Check if row is completely empty
-            if all(cell.value is None for cell in row):
-                continue
-            
-            # PHP code checks if year is empty to stop processing
-            year_value = get_value('year')
-            if year_value is None or str(year_value).strip() == '':
-                if row_idx <= 10:
-                    print(f"Row {row_idx} skipped: Year is empty or None")
-                continue
-            
-            total_rows += 1
-            if row_idx <= 6:
-                print(f"Row {row_idx} ACCEPTED: total_rows={total_rows}")
-            
-            # Extract core data using column mapping
-            try:
-                villagename = str(row[1].value).strip() if row[1].value else ""  # Column 1 is always Name/villagename
-                inspectorID = int(float(get_value('inspectorID'))) if is_numeric(get_value('inspectorID')) else 0
-                epiunitcountrycode_from_excel = str(get_value('epiunitcountrycode')).strip().upper() if get_value('epiunitcountrycode') else ""
-                
-                # Look up epiunitID from the epiunitcountrycode
-                epiunitID = epiunits_map.get(epiunitcountrycode_from_excel)
-                if not epiunitID:
-                    epiunitID = 0
-                
-                # Build date from year/month/day columns
-                year = int(float(get_value('year'))) if is_numeric(get_value('year')) else None
-                month = int(float(get_value('month'))) if is_numeric(get_value('month')) else None
-                day = int(float(get_value('day'))) if is_numeric(get_value('day')) else None
-                
-                dt_insp = None
-                if year and month and day:
-                    try:
-                        dt_insp = f"{year:04d}-{month:02d}-{day:02d}"
-                    except:
-                        pass
-                
-                # Validate required fields and build error message
-                error_msg = None
-                
-                # Foreign key validation - check if epiunitcountrycode exists in epiunits
-                if epiunitcountrycode_from_excel and epiunitcountrycode_from_excel not in epiunits_map:
-                    error_msg = f"Invalid Village/Epiunit code ({epiunitcountrycode_from_excel}) - not found in epiunits table; "
-                
-                # Required field validation
-                if not epiunitID or epiunitID == 0:
-                    error_msg = (error_msg or "") + "Missing or invalid Village/Epiunit code; "
-                if not villagename:
-                    error_msg = (error_msg or "") + "Missing Name/villagename; "
-                if not inspectorID or inspectorID == 0:
-                    error_msg = (error_msg or "") + "Missing InspectorID; "
-                if not dt_insp:
-                    error_msg = (error_msg or "") + "The format of the date is not correct; "
-                
-                # Helper to convert to int or 0
-                def to_int(val):
-                    if val is None:
-                        return 0
-                    if is_numeric(val):
-                        num = int(float(val))
-                        return num if num >= 1 else 0
-                    return 0
-                
-                # Species-specific validation using column mapping
-                # Cattle clinical and serology
-                cattle = to_int(get_value('cattle'))
-                cattleexam = to_int(get_value('cattleexam'))
-                cattletested = to_int(get_value('cattletested'))
-                cattlecliposFMD = to_int(get_value('cattlecliposFMD'))
-                cattlecliposLSD = to_int(get_value('cattlecliposLSD'))
-                if cattlecliposFMD > cattleexam:
-                    error_msg = (error_msg or "") + f"Cattle clin. FMD ({cattlecliposFMD}) > exams ({cattleexam}); "
-                if cattlecliposLSD > cattleexam:
-                    error_msg = (error_msg or "") + f"Cattle clin. LSD ({cattlecliposLSD}) > exams ({cattleexam}); "
-                
-                # Sheep clinical and serology
-                sheep = to_int(get_value('sheep'))
-                sheepexam = to_int(get_value('sheepexam'))
-                sheeptested = to_int(get_value('sheeptested'))
-                sheepposFMD = to_int(get_value('sheepposFMD'))
-                sheepposSGP = to_int(get_value('sheepposSGP'))
-                sheepposPPR = to_int(get_value('sheepposPPR'))
-                if sheepposFMD > sheepexam:
-                    error_msg = (error_msg or "") + f"Sheep clin. FMD ({sheepposFMD}) > exams ({sheepexam}); "
-                if sheepposSGP > sheepexam:
-                    error_msg = (error_msg or "") + f"Sheep clin. SGP ({sheepposSGP}) > exams ({sheepexam}); "
-                if sheepposPPR > sheepexam:
-                    error_msg = (error_msg or "") + f"Sheep clin. PPR ({sheepposPPR}) > exams ({sheepexam}); "
-                
-                # Goat clinical and serology
-                goat = to_int(get_value('goat'))
-                goatsexam = to_int(get_value('goatsexam'))
-                goattested = to_int(get_value('goattested'))
-                goatsposFMD = to_int(get_value('goatsposFMD'))
-                goatsposSGP = to_int(get_value('goatsposSGP'))
-                goatsposPPR = to_int(get_value('goatsposPPR'))
-                if goatsposFMD > goatsexam:
-                    error_msg = (error_msg or "") + f"Goat clin. FMD ({goatsposFMD}) > exams ({goatsexam}); "
-                if goatsposSGP > goatsexam:
-                    error_msg = (error_msg or "") + f"Goat clin. SGP ({goatsposSGP}) > exams ({goatsexam}); "
-                if goatsposPPR > goatsexam:
-                    error_msg = (error_msg or "") + f"Goat clin. PPR ({goatsposPPR}) > exams ({goatsexam}); "
-                
-                # Buffalo clinical and serology
-                buffalo = to_int(get_value('buffalo'))
-                buffaloesexam = to_int(get_value('buffaloesexam'))
-                buffalotested = to_int(get_value('buffalotested'))
-                buffaloesposFMD = to_int(get_value('buffaloesposFMD'))
-                buffaloesposLSD = to_int(get_value('buffaloesposLSD'))
-                if buffaloesposFMD > buffaloesexam:
-                    error_msg = (error_msg or "") + f"Buffalo clin. FMD ({buffaloesposFMD}) > exams ({buffaloesexam}); "
-                if buffaloesposLSD > buffaloesexam:
-                    error_msg = (error_msg or "") + f"Buffalo clin. LSD ({buffaloesposLSD}) > exams ({buffaloesexam}); "
-                
-                # Cattle serology
-                cattlesample = to_int(get_value('cattlesample'))
-                cattleseroposFMD = to_int(get_value('cattleseroposFMD'))
-                cattleseroposLSD = to_int(get_value('cattleseroposLSD'))
-                if cattleseroposFMD > cattlesample:
-                    error_msg = (error_msg or "") + f"Cattle sero. FMD ({cattleseroposFMD}) > samples ({cattlesample}); "
-                if cattleseroposLSD > cattlesample:
-                    error_msg = (error_msg or "") + f"Cattle sero. LSD ({cattleseroposLSD}) > samples ({cattlesample}); "
-                
-                # Sheep serology
-                sheepsample = to_int(get_value('sheepsample'))
-                sheepseroposFMD = to_int(get_value('sheepseroposFMD'))
-                sheepseroposSGP = to_int(get_value('sheepseroposSGP'))
-                sheepseroposPPR = to_int(get_value('sheepseroposPPR'))
-                if sheepseroposFMD > sheepsample:
-                    error_msg = (error_msg or "") + f"Sheep sero. FMD ({sheepseroposFMD}) > samples ({sheepsample}); "
-                if sheepseroposSGP > sheepsample:
-                    error_msg = (error_msg or "") + f"Sheep sero. SGP ({sheepseroposSGP}) > samples ({sheepsample}); "
-                if sheepseroposPPR > sheepsample:
-                    error_msg = (error_msg or "") + f"Sheep sero. PPR ({sheepseroposPPR}) > samples ({sheepsample}); "
-                
-                # Goat serology
-                goatsample = to_int(get_value('goatsample'))
-                goatsseroposFMD = to_int(get_value('goatsseroposFMD'))
-                goatsseroposSGP = to_int(get_value('goatsseroposSGP'))
-                goatsseroposPPR = to_int(get_value('goatsseroposPPR'))
-                if goatsseroposFMD > goatsample:
-                    error_msg = (error_msg or "") + f"Goat sero. FMD ({goatsseroposFMD}) > samples ({goatsample}); "
-                if goatsseroposSGP > goatsample:
-                    error_msg = (error_msg or "") + f"Goat sero. SGP ({goatsseroposSGP}) > samples ({goatsample}); "
-                if goatsseroposPPR > goatsample:
-                    error_msg = (error_msg or "") + f"Goat sero. PPR ({goatsseroposPPR}) > samples ({goatsample}); "
-                
-                # Pig
-                pig = to_int(get_value('pig'))
-                pigtested = to_int(get_value('pigtested'))
-                pigssample = to_int(get_value('pigssample'))
-                pigsserosposFMD = to_int(get_value('pigsserosposFMD'))
-                if pigsserosposFMD > pigssample:
-                    error_msg = (error_msg or "") + f"Pig sero. FMD ({pigsserosposFMD}) > samples ({pigssample}); "
-                
-                # Buffalo serology
-                buffaloessample = to_int(get_value('buffaloessample'))
-                buffaloesseroposFMD = to_int(get_value('buffaloesseroposFMD'))
-                buffaloesseroposLSD = to_int(get_value('buffaloesseroposLSD'))
-                if buffaloesseroposFMD > buffaloessample:
-                    error_msg = (error_msg or "") + f"Buffalo sero. FMD ({buffaloesseroposFMD}) > samples ({buffaloessample}); "
-                if buffaloesseroposLSD > buffaloessample:
-                    error_msg = (error_msg or "") + f"Buffalo sero. LSD ({buffaloesseroposLSD}) > samples ({buffaloessample}); "
-                
-                # Wild
-                wildtested = to_int(get_value('wildtested'))
-                wildsample = to_int(get_value('wildsample'))
-                wildserosposFMD = to_int(get_value('wildserosposFMD'))
-                if wildserosposFMD > wildsample:
-                    error_msg = (error_msg or "") + f"Wild sero. FMD ({wildserosposFMD}) > samples ({wildsample}); "
-                
-                # Skip duplicate check during upload - will be checked during approval
-                # This avoids 400+ separate database queries which cause timeout
-                
-                # Prepare row data for insertion matching SQL table structure (now with 6 new 'tested' fields)
-                row_data = (
-                    epiunitID,              # int
-                    inspectorID,            # int
-                    dt_insp,                # date
-                    cattle or None,         # int DEFAULT NULL
-                    sheep or None,          # int DEFAULT NULL
-                    goat or None,           # int DEFAULT NULL
-                    pig or None,            # int DEFAULT NULL
-                    buffalo or None,        # int DEFAULT NULL
-                    cattleexam or None,     # int DEFAULT NULL
-                    cattlecliposFMD or None,  # int DEFAULT NULL
-                    cattlecliposLSD or None,  # int DEFAULT NULL
-                    sheepexam or None,      # int DEFAULT NULL
-                    sheepposFMD or None,    # int DEFAULT NULL
-                    sheepposSGP or None,    # int DEFAULT NULL
-                    sheepposPPR or None,    # int DEFAULT NULL
-                    goatsexam or None,      # int DEFAULT NULL
-                    goatsposFMD or None,    # int DEFAULT NULL
-                    goatsposSGP or None,    # int DEFAULT NULL
-                    goatsposPPR or None,    # int DEFAULT NULL
-                    buffaloesexam or None,  # int DEFAULT NULL
-                    buffaloesposFMD or None,# int DEFAULT NULL
-                    buffaloesposLSD or None,# int DEFAULT NULL
-                    cattlesample or None,   # int DEFAULT NULL
-                    cattleseroposFMD or None,# int DEFAULT NULL
-                    cattleseroposLSD or None,# int DEFAULT NULL
-                    sheepsample or None,    # int DEFAULT NULL
-                    sheepseroposFMD or None,# int DEFAULT NULL
-                    sheepseroposSGP or None,# int DEFAULT NULL
-                    sheepseroposPPR or None,# int DEFAULT NULL
-                    goatsample or None,     # int DEFAULT NULL
-                    goatsseroposFMD or None,# int DEFAULT NULL
-                    goatsseroposSGP or None,# int DEFAULT NULL
-                    goatsseroposPPR or None,# int DEFAULT NULL
-                    pigssample or None,     # int DEFAULT NULL
-                    pigsserosposFMD or None,# int DEFAULT NULL
-                    buffaloessample or None,# int DEFAULT NULL
-                    buffaloesseroposFMD or None,# int DEFAULT NULL
-                    buffaloesseroposLSD or None,# int DEFAULT NULL
-                    wildsample or None,     # int DEFAULT NULL
-                    wildserosposFMD or None,# int DEFAULT NULL
-                    cattletested or None,   # int DEFAULT NULL - NEW
-                    sheeptested or None,    # int DEFAULT NULL - NEW
-                    goattested or None,     # int DEFAULT NULL - NEW
-                    buffalotested or None,  # int DEFAULT NULL - NEW
-                    pigtested or None,      # int DEFAULT NULL - NEW
-                    wildtested or None,     # int DEFAULT NULL - NEW
-                    error_msg,              # varchar(255) DEFAULT NULL
-                    datetime.now().date(),  # dt_inival date NOT NULL
-                    user_id,                # userID int NOT NULL
-                    epiunitcountrycode_from_excel,     # varchar(20) NOT NULL
-                    villagename             # varchar(50) NOT NULL
-                )
-                
-                inserted_data.append(row_data)
-                
-                if error_msg:
-                    error_rows += 1
-                    error_messages.append(f"Row {row_idx}: {error_msg}")
-                else:
-                    clean_rows += 1
-                
-            except Exception as e:
-                error_rows += 1
-                error_messages.append(f"Row {row_idx}: Error parsing - {str(e)}")
+        logger.debug("File validation passed: %s", file.filename)
         
-        # Bulk insert all rows (clean + error rows) to factivities_tmp
-        if inserted_data:
-            try:
-                print(f"Starting bulk insert of {len(inserted_data)} rows...")
-                
-                # Insert all rows using parameterized query (now includes 6 new 'tested' columns)
-                insert_query = """
-                    INSERT INTO factivities_tmp (
-                        epiunitID, inspectorID, dt_insp, cattle, sheep, goat, pig, buffalo,
-                        cattleexam, cattlecliposFMD, cattlecliposLSD,
-                        sheepexam, sheepposFMD, sheepposSGP, sheepposPPR,
-                        goatsexam, goatsposFMD, goatsposSGP, goatsposPPR,
-                        buffaloesexam, buffaloesposFMD, buffaloesposLSD,
-                        cattlesample, cattleseroposFMD, cattleseroposLSD,
-                        sheepsample, sheepseroposFMD, sheepseroposSGP, sheepseroposPPR,
-                        goatsample, goatsseroposFMD, goatsseroposSGP, goatsseroposPPR,
-                        pigssample, pigsserosposFMD,
-                        buffaloessample, buffaloesseroposFMD, buffaloesseroposLSD,
-                        wildsample, wildserosposFMD,
-                        cattletested, sheeptested, goattested, buffalotested, pigtested, wildtested,
-                        errore, dt_inival, userID, epiunitcountrycode, villagename
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, %s,
-                        %s, %s, %s,
-                        %s, %s, %s, %s,
-                        %s, %s, %s, %s,
-                        %s, %s, %s,
-                        %s, %s, %s,
-                        %s, %s, %s, %s,
-                        %s, %s, %s, %s,
-                        %s, %s,
-                        %s, %s, %s,
-                        %s, %s,
-                        %s, %s, %s, %s, %s, %s,
-                        %s, %s, %s, %s, %s
-                    )
-                """
-                
-                successful_inserts = 0
-                print("Starting individual row inserts...")
-                for idx, row_data in enumerate(inserted_data):
-                    if idx % 5 == 0:  # Log progress every 5 rows
-                        print(f"Inserting row {idx+1}/{len(inserted_data)}...")
-                    
-                    insert_result = await DatabaseHelper.execute_thrace_query(insert_query, row_data)
-                    
-                    if insert_result.get("error"):
-                        print(f"Insert error for row {idx}: {insert_result['error']}")
-                        print(f"Row data: {row_data}")
-                        raise HTTPException(status_code=500, detail=f"Insert error on row {idx}: {insert_result['error']}")
-                    
-                    successful_inserts += 1
-                
-                print(f"Successfully inserted {successful_inserts} rows into factivities_tmp")
-                
-                return {
-                    "success": True,
-                    "message": f"Uploaded {total_rows} rows ({clean_rows} clean, {error_rows} with errors)",
-                    "total_rows": total_rows,
-                    "clean_rows": clean_rows,
-                    "error_rows": error_rows,
-                    "inserted_count": successful_inserts,
-                    "errors": error_messages if error_messages else None,
-                    "status": "pending_approval"
-                }
-            
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"Database insert error: {str(e)}")
-        else:
-            return {
-                "success": False,
-                "message": "No valid data rows found in file",
-                "total_rows": total_rows,
-                "clean_rows": clean_rows,
-                "error_rows": error_rows,
-                "inserted_count": 0
-            }
+        # Spool the upload to disk and stream its rows - the workbook is never held in memory whole
+        spool = await spool_upload(file)
+        return await ingest_upload(spool, current_user.get('user_id'), MAX_DATA_ROWS)
     
     except HTTPException as e:
         raise e
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
+
+@router.post("/upload-jobs", status_code=202)
+async def create_upload_job(
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Accept a THRACE workbook as a background job and return its id at once.
+    Same validation and staging as /upload-data, without the 400-row cap (up to
+    settings.upload_job_max_rows). Follow it with GET /upload-jobs/{job_id} or its /events stream.
+    """
+    user_id = current_user.get('user_id')
+    if not file.filename.endswith('.xlsx'):
+        raise HTTPException(status_code=400, detail="Only .xlsx files are allowed")
+    if upload_jobs.active_job(user_id, "thrace") is not None:
+        raise HTTPException(status_code=409, detail="An upload is already being processed for this user")
+    
+    try:
+        await load_epiunits_cache()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
+    
+    spool = await spool_upload(file)
+    max_rows = settings.upload_job_max_rows or None
+    try:
+        job = upload_jobs.submit(
+            "thrace", user_id, file.filename, lambda job: ingest_upload(spool, user_id, max_rows, job)
+        )
+    except JobQueueFull as e:
+        spool.close()
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    
+    logger.info("Upload job %s queued for %s", job.id, file.filename, extra={"user_id": user_id})
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/thrace/upload-jobs/{job.id}",
+        "events_url": f"/api/thrace/upload-jobs/{job.id}/events",
+    }
+
+@router.get("/upload-jobs/{job_id}")
+async def get_upload_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """
+    Status of one of the current user's upload jobs: queued/running/done/failed, rows parsed,
+    validated and inserted so far, and once done the same result /upload-data returns
+    """
+    job = upload_jobs.get(job_id, current_user.get('user_id'))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    return job.to_dict()
+
+@router.get("/upload-jobs/{job_id}/events")
+async def stream_upload_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Server-sent events: the job status on every change, until the job has finished"""
+    job = upload_jobs.get(job_id, current_user.get('user_id'))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    
+    async def events():
+        while True:
+            # Snapshot, version and finished flag are taken together, so the last event sent is
+            # always the finished state - a change during the yield is caught by the version
+            version, finished, snapshot = job.version, job.finished, job.to_dict()
+            yield f"data: {json.dumps(snapshot, default=str)}\n\n"
+            if finished:
+                return
+            # Comment lines keep idle proxies from closing the stream while a block is processed
+            while not await job.wait_for_change(version, timeout=15.0):
+                yield ": keep-alive\n\n"
+    
+    # X-Accel-Buffering: nginx passes each event on instead of buffering the response
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @router.get("/staging-summary")
-async def get_staging_summary(current_user: dict = Depends(get_current_user)):
+async def get_staging_summary(
+    current_user: dict = Depends(get_current_user),
+    session: DatabaseSession = Depends(get_db_session("thrace", read_only=True))
+):
     """
     Get summary of staging data for current user:
     - Total rows uploaded
@@ -531,19 +361,17 @@ async def get_staging_summary(current_user: dict = Depends(get_current_user)):
     user_id = current_user.get("user_id")
     
     try:
-        # Total rows
-        total_query = "SELECT COUNT(*) as count FROM thrace.factivities_tmp WHERE userID = %s"
-        total_result = await DatabaseHelper.execute_thrace_query(total_query, (user_id,))
+        # The three counts share one request-scoped connection
+        total_result, clean_result, error_result = await asyncio.gather(
+            # Total rows
+            session.execute("SELECT COUNT(*) as count FROM thrace.factivities_tmp WHERE userID = %s", (user_id,)),
+            # Clean rows
+            session.execute("SELECT COUNT(*) as count FROM thrace.factivities_tmp WHERE userID = %s AND errore IS NULL", (user_id,)),
+            # Error rows
+            session.execute("SELECT COUNT(*) as count FROM thrace.factivities_tmp WHERE userID = %s AND errore IS NOT NULL", (user_id,))
+        )
         total_rows = total_result["data"][0]["count"] if total_result["data"] else 0
-        
-        # Clean rows
-        clean_query = "SELECT COUNT(*) as count FROM thrace.factivities_tmp WHERE userID = %s AND errore IS NULL"
-        clean_result = await DatabaseHelper.execute_thrace_query(clean_query, (user_id,))
         clean_rows = clean_result["data"][0]["count"] if clean_result["data"] else 0
-        
-        # Error rows
-        error_query = "SELECT COUNT(*) as count FROM thrace.factivities_tmp WHERE userID = %s AND errore IS NOT NULL"
-        error_result = await DatabaseHelper.execute_thrace_query(error_query, (user_id,))
         error_rows = error_result["data"][0]["count"] if error_result["data"] else 0
         
         return {
@@ -556,10 +384,93 @@ async def get_staging_summary(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=f"Error fetching staging summary: {str(e)}")
 
 
+# Duplicate detection at approval - the staged rows' natural keys are matched against the
+# factivities records of the same epiunits and dates (one join), and against each other
+STAGED_KEYS_QUERY = f"""
+    SELECT factivity_tmpID, errore, {", ".join(NATURAL_KEY_FIELDS)}
+    FROM thrace.factivities_tmp
+    WHERE userID = %s
+    ORDER BY factivity_tmpID
+"""
+EXISTING_KEYS_QUERY = f"""
+    SELECT {", ".join("f." + field for field in NATURAL_KEY_FIELDS)}
+    FROM thrace.factivities f
+    JOIN (SELECT DISTINCT epiunitID, dt_insp FROM thrace.factivities_tmp WHERE userID = %s) staged
+        ON f.epiunitID = staged.epiunitID AND f.dt_insp = staged.dt_insp
+"""
+DUPLICATE_OF_EXISTING = "Duplicate of a record already imported; "
+DUPLICATE_IN_UPLOAD = "Duplicate of another row in this upload; "
+
+async def flag_duplicate_staging_rows(tx, user_id: int) -> int:
+    """
+    Set errore on the user's clean staging rows that repeat an imported record, or an earlier
+    row of the same upload. Two reads, then one UPDATE per chunk of flagged rows - returns the count.
+    The staging rows stay locked until `tx` ends, so a concurrent upload cannot replace them.
+    """
+    staged = (await tx.execute(STAGED_KEYS_QUERY, (user_id,), lock_rows=True))["data"]
+    # Rows that already have errors are reported (and re-uploaded) anyway
+    clean = [row for row in staged if row["errore"] is None]
+    if not clean:
+        return 0
+    
+    existing = {natural_key_digest(row) for row in (await tx.execute(EXISTING_KEYS_QUERY, (user_id,)))["data"]}
+    seen = set()
+    flagged = {DUPLICATE_OF_EXISTING: [], DUPLICATE_IN_UPLOAD: []}
+    for row in clean:
+        digest = natural_key_digest(row)
+        if digest in existing:
+            flagged[DUPLICATE_OF_EXISTING].append(row["factivity_tmpID"])
+        elif digest in seen:
+            flagged[DUPLICATE_IN_UPLOAD].append(row["factivity_tmpID"])
+        else:
+            seen.add(digest)
+    
+    chunk_size = settings.db_bulk_chunk_size
+    for message, row_ids in flagged.items():
+        for offset in range(0, len(row_ids), chunk_size):
+            chunk = row_ids[offset:offset + chunk_size]
+            await tx.execute(
+                f"UPDATE thrace.factivities_tmp SET errore = %s "
+                f"WHERE userID = %s AND factivity_tmpID IN ({', '.join(['%s'] * len(chunk))})",
+                (message, user_id, *chunk)
+            )
+    return sum(len(row_ids) for row_ids in flagged.values())
+
+APPROVAL_ERRORS_QUERY = """
+    SELECT factivity_tmpID, villagename, epiunitcountrycode, dt_insp, errore 
+    FROM thrace.factivities_tmp 
+    WHERE userID = %s AND errore IS NOT NULL
+    ORDER BY factivity_tmpID
+"""
+APPROVAL_INSERT_QUERY = """
+    INSERT INTO thrace.factivities(
+        inspectorID, epiunitID, dt_insp, cattle, sheep, goat, pig, buffalo,
+        cattleexam, cattlecliposFMD, cattlecliposLSD, sheepexam, sheepposFMD, sheepposSGP, sheepposPPR,
+        goatsexam, goatsposFMD, goatsposSGP, goatsposPPR, buffaloesexam, buffaloesposFMD, buffaloesposLSD,
+        cattlesample, cattleseroposFMD, cattleseroposLSD, sheepsample, sheepseroposFMD, sheepseroposSGP, sheepseroposPPR,
+        goatsample, goatsseroposFMD, goatsseroposSGP, goatsseroposPPR, pigssample, pigsserosposFMD,
+        buffaloessample, buffaloesseroposFMD, buffaloesseroposLSD, wildsample, wildserosposFMD,
+        cattletested, sheeptested, goattested, buffalotested, pigtested, wildtested,
+        dt_inival, userID
+    )
+    SELECT 
+        inspectorID, epiunitID, dt_insp, cattle, sheep, goat, pig, buffalo,
+        cattleexam, cattlecliposFMD, cattlecliposLSD, sheepexam, sheepposFMD, sheepposSGP, sheepposPPR,
+        goatsexam, goatsposFMD, goatsposSGP, goatsposPPR, buffaloesexam, buffaloesposFMD, buffaloesposLSD,
+        cattlesample, cattleseroposFMD, cattleseroposLSD, sheepsample, sheepseroposFMD, sheepseroposSGP, sheepseroposPPR,
+        goatsample, goatsseroposFMD, goatsseroposSGP, goatsseroposPPR, pigssample, pigsserosposFMD,
+        buffaloessample, buffaloesseroposFMD, buffaloesseroposLSD, wildsample, wildserosposFMD,
+        cattletested, sheeptested, goattested, buffalotested, pigtested, wildtested,
+        dt_inival, userID
+    FROM thrace.factivities_tmp
+    WHERE userID = %s AND errore IS NULL
+"""
+
 @router.post("/approve-data")
 async def approve_staging_data(current_user: dict = Depends(get_current_user)):
     """
     Approve and move clean data from factivities_tmp to factivities.
+    Rows repeating an already imported record (or another row of the upload) are flagged first.
     If there are errors, return them instead of approving.
     
     Returns:
@@ -569,75 +480,43 @@ async def approve_staging_data(current_user: dict = Depends(get_current_user)):
     user_id = current_user.get("user_id")
     
     try:
-        print(f"Approval endpoint called for user {user_id}")
-        
-        # Check for error rows
-        error_query = """
-            SELECT factivity_tmpID, villagename, epiunitcountrycode, dt_insp, errore 
-            FROM thrace.factivities_tmp 
-            WHERE userID = %s AND errore IS NOT NULL
-            ORDER BY factivity_tmpID
-        """
-        error_result = await DatabaseHelper.execute_thrace_query(error_query, (user_id,))
-        print(f"Error check result: {error_result}")
-        
-        error_rows = error_result.get("data", []) if error_result else []
-        print(f"Found {len(error_rows)} error rows")
-        
-        # If there are errors, return them without approving
-        if error_rows:
-            print(f"Returning {len(error_rows)} error rows to user")
-            return {
-                "has_errors": True,
-                "error_count": len(error_rows),
-                "error_rows": [
-                    {
-                        "rowId": row.get("factivity_tmpID"),
-                        "village": row.get("villagename"),
-                        "country": row.get("epiunitcountrycode"),
-                        "date": row.get("dt_insp"),
-                        "error": row.get("errore")
-                    }
-                    for row in error_rows
-                ]
-            }
-        
-        # No errors - move clean data to factivities
-        print(f"No errors found. Moving clean data to production for user {user_id}")
-        
-        insert_query = """
-            INSERT INTO thrace.factivities(
-                inspectorID, epiunitID, dt_insp, cattle, sheep, goat, pig, buffalo,
-                cattleexam, cattlecliposFMD, cattlecliposLSD, sheepexam, sheepposFMD, sheepposSGP, sheepposPPR,
-                goatsexam, goatsposFMD, goatsposSGP, goatsposPPR, buffaloesexam, buffaloesposFMD, buffaloesposLSD,
-                cattlesample, cattleseroposFMD, cattleseroposLSD, sheepsample, sheepseroposFMD, sheepseroposSGP, sheepseroposPPR,
-                goatsample, goatsseroposFMD, goatsseroposSGP, goatsseroposPPR, pigssample, pigsserosposFMD,
-                buffaloessample, buffaloesseroposFMD, buffaloesseroposLSD, wildsample, wildserosposFMD,
-                cattletested, sheeptested, goattested, buffalotested, pigtested, wildtested,
-                dt_inival, userID
-            )
-            SELECT 
-                inspectorID, epiunitID, dt_insp, cattle, sheep, goat, pig, buffalo,
-                cattleexam, cattlecliposFMD, cattlecliposLSD, sheepexam, sheepposFMD, sheepposSGP, sheepposPPR,
-                goatsexam, goatsposFMD, goatsposSGP, goatsposPPR, buffaloesexam, buffaloesposFMD, buffaloesposLSD,
-                cattlesample, cattleseroposFMD, cattleseroposLSD, sheepsample, sheepseroposFMD, sheepseroposSGP, sheepseroposPPR,
-                goatsample, goatsseroposFMD, goatsseroposSGP, goatsseroposPPR, pigssample, pigsserosposFMD,
-                buffaloessample, buffaloesseroposFMD, buffaloesseroposLSD, wildsample, wildserosposFMD,
-                cattletested, sheeptested, goattested, buffalotested, pigtested, wildtested,
-                dt_inival, userID
-            FROM thrace.factivities_tmp
-            WHERE userID = %s AND errore IS NULL
-        """
-        
-        insert_result = await DatabaseHelper.execute_thrace_query(insert_query, (user_id,))
-        print(f"Insert result: {insert_result}")
-        
-        if insert_result.get("error"):
-            print(f"Insert error: {insert_result['error']}")
-            raise HTTPException(status_code=500, detail=f"Error importing data: {insert_result['error']}")
+        logger.debug("Approval endpoint called for user %s", user_id)
+        
+        # Flag duplicates, check for errors and move the clean rows in one transaction, with the
+        # staging rows locked throughout - a re-upload cannot slip in between the check and the move
+        async with DatabaseHelper.transaction("thrace") as tx:
+            # Flag duplicates first, so they are returned with the other error rows
+            duplicate_count = await flag_duplicate_staging_rows(tx, user_id)
+            if duplicate_count:
+                logger.info("Flagged %s duplicate staging rows for user %s", duplicate_count, user_id)
+            
+            # Check for error rows
+            error_rows = (await tx.execute(APPROVAL_ERRORS_QUERY, (user_id,)))["data"]
+            logger.debug("Found %s error rows", len(error_rows))
+            
+            # If there are errors, return them without approving
+            if error_rows:
+                logger.info("Returning %s error rows to user", len(error_rows))
+                return {
+                    "has_errors": True,
+                    "error_count": len(error_rows),
+                    "error_rows": [
+                        {
+                            "rowId": row.get("factivity_tmpID"),
+                            "village": row.get("villagename"),
+                            "country": row.get("epiunitcountrycode"),
+                            "date": row.get("dt_insp"),
+                            "error": row.get("errore")
+                        }
+                        for row in error_rows
+                    ]
+                }
+            
+            # No errors - move clean data to factivities
+            logger.info("No errors found. Moving clean data to production for user %s", user_id)
+            inserted_count = (await tx.execute(APPROVAL_INSERT_QUERY, (user_id,)))["data"]
         
-        inserted_count = insert_result.get("data", 0)
-        print(f"Successfully inserted {inserted_count} rows")
+        logger.info("Successfully inserted %s rows", inserted_count)
         
         return {
             "success": True,
@@ -649,28 +528,17 @@ async def approve_staging_data(current_user: dict = Depends(get_current_user)):
     except HTTPException as e:
         raise e
     except Exception as e:
-        print(f"Approval endpoint error: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Approval endpoint error: %s", e)
         raise HTTPException(status_code=500, detail=f"Error approving data: {str(e)}")
 
-def is_numeric(value):
-    """Check if value can be converted to a number"""
-    if value is None:
-        return False
-    try:
-        float(value)
-        return True
-    except (ValueError, TypeError):
-        return False
-
-
 @router.get("/cycle-report")
 async def generate_cycle_report(
     country_id: int,
     year: int,
     quarter: int,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    session: DatabaseSession = Depends(get_db_session("thrace", max_connections=3, read_only=True)),
+    _disconnect=Depends(cancel_on_disconnect)
 ):
     """
     Generate cycle report for given country, year, and quarter.
@@ -694,7 +562,7 @@ async def generate_cycle_report(
             group_field = "districtID"  # Join on ID column
             display_field = "district_name"  # Display name in results
         
-        print(f"Generating cycle report for country {country_id}, year {year}, quarter {quarter}")
+        logger.debug("Generating cycle report for country %s, year %s, quarter %s", country_id, year, quarter)
         
         # Section 1: Animal Population
         population_query = f"""
@@ -805,10 +673,12 @@ async def generate_cycle_report(
         
         params = (quarter, country_id, year)
         
-        # Execute queries
-        population_result = await DatabaseHelper.execute_thrace_query(population_query, params)
-        clinical_result = await DatabaseHelper.execute_thrace_query(clinical_query, params)
-        serology_result = await DatabaseHelper.execute_thrace_query(serology_query, params)
+        # Execute the three aggregates concurrently on the request's session connections
+        population_result, clinical_result, serology_result = await asyncio.gather(
+            session.execute(population_query, params, timeout=settings.db_report_timeout),
+            session.execute(clinical_query, params, timeout=settings.db_report_timeout),
+            session.execute(serology_query, params, timeout=settings.db_report_timeout)
+        )
         
         if population_result.get("error"):
             raise HTTPException(status_code=500, detail=f"Population query error: {population_result['error']}")
@@ -831,10 +701,10 @@ async def generate_cycle_report(
     
     except HTTPException as e:
         raise e
+    except QueryCancelled as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
-        print(f"Cycle report error: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Cycle report error: %s", e)
         raise HTTPException(status_code=500, detail=f"Error generating cycle report: {str(e)}")
 
 @router.get("/freedom-data")
@@ -843,7 +713,8 @@ async def get_freedom_analysis(
     disease: str = "FMD",
     region: str = "ALL",
     year: int = None,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    _disconnect=Depends(cancel_on_disconnect)
 ):
     """
     Calculate freedom-from-disease analysis using Python ThraceCalculator.
@@ -867,18 +738,20 @@ async def get_freedom_analysis(
         if year is None:
             year = datetime.now().year
         
-        # Initialize calculator with thrace database engine
-        calculator = ThraceCalculator(thrace_engine)
+        # Initialize calculator - writes go to the THRACE primary, its reads to the replica when configured
+        # The calculation gets a deadline; its statements are killed if it runs over or the client leaves
+        scope = QueryCancelScope("thrace", settings.db_report_timeout)
+        calculator = ThraceCalculator(get_engine("thrace"), get_read_engine("thrace"), scope=scope)
         
         # Calculate system sensitivity and probability of freedom
-        print(f"Calculating freedom analysis: species={species}, disease={disease}, region={region}, year={year}")
+        logger.debug("Calculating freedom analysis: species=%s, disease=%s, region=%s, year=%s", species, disease, region, year)
         
-        results = calculator.calculate_system_sensitivity(
+        results = await DatabaseHelper.run_sync("thrace", lambda: calculator.calculate_system_sensitivity(
             species_filter=species,
             disease=disease,
             region_filter=region,
             year=year
-        )
+        ), scope=scope)
         
         return {
             "success": True,
@@ -894,10 +767,10 @@ async def get_freedom_analysis(
         }
     except HTTPException:
         raise
+    except QueryTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
-        import traceback
-        print(f"Error in freedom analysis: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Error in freedom analysis: %s", e)
         raise HTTPException(status_code=500, detail=f"Error calculating freedom data: {str(e)}")
 
 
@@ -933,36 +806,38 @@ async def calculate_and_save_freedom(
         if year is None:
             year = datetime.now().year
         
-        # Initialize calculator with thrace database engine
-        calculator = ThraceCalculator(thrace_engine)
+        # Initialize calculator - writes go to the THRACE primary, its reads to the replica when configured
+        # The calculation gets a deadline; its statements are killed if it runs over or the client leaves
+        scope = QueryCancelScope("thrace", settings.db_report_timeout)
+        calculator = ThraceCalculator(get_engine("thrace"), get_read_engine("thrace"), scope=scope)
         
         # Calculate system sensitivity and probability of freedom
-        print(f"Calculating freedom analysis: species={species}, disease={disease}, region={region}, year={year}")
+        logger.debug("Calculating freedom analysis: species=%s, disease=%s, region=%s, year=%s", species, disease, region, year)
         
-        results = calculator.calculate_system_sensitivity(
+        results = await DatabaseHelper.run_sync("thrace", lambda: calculator.calculate_system_sensitivity(
             species_filter=species,
             disease=disease,
             region_filter=region,
             year=year
-        )
+        ), scope=scope)
         
         # R24: Save to permanent table for audit trail
         saved = False
         saved_count = 0
         if save_results:
             try:
-                calculator.save_calculation_results(
+                await DatabaseHelper.run_sync("thrace", lambda: calculator.save_calculation_results(
                     results=results,
                     species_filter=species,
                     disease=disease,
                     region_filter=region,
                     user_id=current_user.get('id')
-                )
+                ))
                 saved = True
                 saved_count = len(results.get('labels', []))
-                print(f"Saved {saved_count} monthly results to thrace_calculation_results table")
+                logger.info("Saved %s monthly results to thrace_calculation_results table", saved_count)
             except Exception as save_error:
-                print(f"Warning: Failed to save results: {str(save_error)}")
+                logger.warning("Failed to save results: %s", save_error)
                 # Continue even if save fails - calculation is still valid
         
         return {
@@ -982,8 +857,8 @@ async def calculate_and_save_freedom(
         }
     except HTTPException:
         raise
+    except QueryTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
-        import traceback
-        print(f"Error in freedom analysis: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Error in freedom analysis: %s", e)
         raise HTTPException(status_code=500, detail=f"Error calculating freedom data: {str(e)}")
@@ -7,10 +7,52 @@ Corrections Implemented: R1, R2, R4, R7, R11-R15
 
 import math
 import json
+import time
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 from sqlalchemy import text
 from sqlalchemy.engine import Engine
+from database import execute_many_statement
+from query_cancel import QueryCancelScope
+from config import settings
+
+
+# thrace.params and thrace.monthly_pintro are small and rarely edited, but the calculation
+# used to query them once per disease/region and once per month. They are now read as a
+# whole - by the startup warm-up, then again whenever the snapshot is older than
+# settings.reference_data_cache_ttl - and answered from memory.
+class ReferenceData:
+    def __init__(self, params: Dict[Tuple[str, str], Dict[str, float]], pintro: Dict[Tuple, object]):
+        self.params = params
+        self.pintro = pintro
+        self.loaded_at = time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() - self.loaded_at > settings.reference_data_cache_ttl
+
+
+_reference_data: Optional[ReferenceData] = None
+
+
+def load_reference_data(conn) -> ReferenceData:
+    """Read thrace.params and thrace.monthly_pintro into a new snapshot and make it current"""
+    global _reference_data
+    params = {}
+    for row in conn.execute(text("SELECT disease, region, param, value FROM thrace.params")):
+        params.setdefault((row.disease, row.region), {})[row.param] = float(row.value)
+    pintro = {}
+    for row in conn.execute(text("SELECT year, month, pintro FROM thrace.monthly_pintro")):
+        # First row wins, like the fetchone() lookups this replaces
+        pintro.setdefault((row.year, row.month), row.pintro)
+    _reference_data = ReferenceData(params, pintro)
+    return _reference_data
+
+
+def warm_reference_data(engine: Engine) -> ReferenceData:
+    with engine.connect() as conn:
+        return load_reference_data(conn)
 
 
 class ThraceCalculator:
@@ -25,8 +67,31 @@ class ThraceCalculator:
     - R14: Greece RR=1 (risk-based not applicable)
     """
     
-    def __init__(self, db_engine: Engine):
+    def __init__(self, db_engine: Engine, read_engine: Optional[Engine] = None,
+                 scope: Optional[QueryCancelScope] = None):
         self.db = db_engine
+        # Heavy analytics reads go to the read replica when one is passed in; writes stay on db_engine
+        self.read_db = read_engine or db_engine
+        # Deadline/cancellation for the endpoint's run - every query's connection is registered with it
+        self.scope = scope
+    
+    @contextmanager
+    def _read_connection(self):
+        """Connection for analytics reads, registered with the cancel scope (if any)"""
+        with self.read_db.connect() as conn:
+            if self.scope is None:
+                yield conn
+            else:
+                with self.scope.track(conn):
+                    yield conn
+    
+    def _reference_data(self) -> ReferenceData:
+        """Current params/pintro snapshot, re-read once it has expired"""
+        data = _reference_data
+        if data is None or data.expired:
+            with self._read_connection() as conn:
+                data = load_reference_data(conn)
+        return data
     
     # =========================================================================
     # PARAMETER HANDLING
@@ -38,25 +103,7 @@ class ThraceCalculator:
         Replaces: thrace.get_param() SQL function
         Correction R7: Returns DOUBLE (Python float is double precision)
         """
-        with self.db.connect() as conn:
-            result = conn.execute(text("""
-                SELECT param, value 
-                FROM thrace.params 
-                WHERE disease = :disease AND region = :region
-            """), {"disease": disease, "region": region})
-            
-            params = {row.param: float(row.value) for row in result}
-            
-            # Fallback to region-wide params if country-specific not found
-            if not params and ',' in region:
-                result = conn.execute(text("""
-                    SELECT param, value 
-                    FROM thrace.params 
-                    WHERE disease = :disease AND region = :region
-                """), {"disease": disease, "region": region})
-                params = {row.param: float(row.value) for row in result}
-        
-        return params
+        return dict(self._reference_data().params.get((disease, region), {}))
     
     def calculate_adjusted_risk(self, params: Dict[str, float]) -> Dict[str, float]:
         """
@@ -246,7 +293,7 @@ class ThraceCalculator:
         Uses TCC schema for geographic hierarchy.
         Processes ALL years to match SQL function behavior.
         """
-        with self.db.connect() as conn:
+        with self._read_connection() as conn:
             # Build species filter for SQL
             species_filter = ','.join(f"'{s}'" for s in species_list)
             countries_filter = ','.join(f"'{c}'" for c in countries)
@@ -272,7 +319,8 @@ class ThraceCalculator:
                 AND fa.dt_insp IS NOT NULL
             """)
             
-            result = conn.execute(query, {
+            # Server-side cursor: rows are fetched in chunks instead of buffering the whole scan
+            result = conn.execution_options(stream_results=True, max_row_buffer=1000).execute(query, {
                 "countries": tuple(countries)
             })
             
@@ -318,25 +366,16 @@ class ThraceCalculator:
         R11-R12: Get monthly probability of introduction.
         First tries year-specific, then falls back to generic monthly values.
         """
-        with self.db.connect() as conn:
-            # Try year-specific first
-            result = conn.execute(text("""
-                SELECT pintro 
-                FROM thrace.monthly_pintro 
-                WHERE year = :year AND month = :month
-            """), {"year": year, "month": month}).fetchone()
-            
-            if result and result.pintro:
-                return float(result.pintro)
-            
-            # Fall back to generic monthly (year IS NULL)
-            result = conn.execute(text("""
-                SELECT pintro 
-                FROM thrace.monthly_pintro 
-                WHERE year IS NULL AND month = :month
-            """), {"month": month}).fetchone()
-            
-            return float(result.pintro) if result and result.pintro else 0.0167  # 1/12 default
+        pintro = self._reference_data().pintro
+        
+        # Try year-specific first
+        value = pintro.get((year, month))
+        if value:
+            return float(value)
+        
+        # Fall back to generic monthly (year IS NULL)
+        value = pintro.get((None, month))
+        return float(value) if value else 0.0167  # 1/12 default
     
     # =========================================================================
     # MAIN CALCULATION
@@ -408,6 +447,8 @@ class ThraceCalculator:
         p_free = 0.5  # Initial prior probability of freedom
         
         for (year, month) in sorted(monthly_data.keys()):
+            if self.scope is not None:
+                self.scope.check()
             acts = monthly_data[(year, month)]
             
             # Calculate herd-level sensitivity for each activity
@@ -546,40 +587,44 @@ class ThraceCalculator:
             sero = results.get('sero', [])
             clin = results.get('clin', [])
             
-            # Insert each month's results
+            # Build one params tuple per month's results
+            rows = []
             for i in range(len(labels)):
                 # Parse year and month from label (format: YYYY-MM-01)
                 label_parts = labels[i].split('-')
                 result_year = int(label_parts[0])
                 result_month = int(label_parts[1])
                 
-                conn.execute(text("""
-                    INSERT INTO thrace.thrace_calculation_results (
-                        species_filter, disease, region_filter,
-                        result_year, result_month, sse, pintro, pfreedom,
-                        animals, herds, sero_samples, clin_examined,
-                        calculated_by, calculation_version, calculated_at
-                    ) VALUES (
-                        :species_filter, :disease, :region_filter,
-                        :result_year, :result_month, :sse, :pintro, :pfreedom,
-                        :animals, :herds, :sero, :clin, :user_id, :version, NOW()
-                    )
-                """), {
-                    "species_filter": species_filter,
-                    "disease": disease,
-                    "region_filter": region_filter,
-                    "result_year": result_year,
-                    "result_month": result_month,
-                    "sse": float(sens[i]) if sens[i] else 0.0,
-                    "pintro": float(pintro[i]) if pintro[i] else 0.0,
-                    "pfreedom": float(pfree[i]) if pfree[i] else 0.0,
-                    "animals": animals[i] if i < len(animals) else 0,
-                    "herds": herds[i] if i < len(herds) else 0,
-                    "sero": sero[i] if i < len(sero) else 0,
-                    "clin": clin[i] if i < len(clin) else 0,
-                    "user_id": user_id,
-                    "version": "v2.0_python"
-                })
+                rows.append((
+                    species_filter,
+                    disease,
+                    region_filter,
+                    result_year,
+                    result_month,
+                    float(sens[i]) if sens[i] else 0.0,
+                    float(pintro[i]) if pintro[i] else 0.0,
+                    float(pfree[i]) if pfree[i] else 0.0,
+                    animals[i] if i < len(animals) else 0,
+                    herds[i] if i < len(herds) else 0,
+                    sero[i] if i < len(sero) else 0,
+                    clin[i] if i < len(clin) else 0,
+                    user_id,
+                    "v2.0_python"
+                ))
+            
+            # Insert all months with multi-row INSERTs in this one transaction
+            execute_many_statement(conn, """
+                INSERT INTO thrace.thrace_calculation_results (
+                    species_filter, disease, region_filter,
+                    result_year, result_month, sse, pintro, pfreedom,
+                    animals, herds, sero_samples, clin_examined,
+                    calculated_by, calculation_version, calculated_at
+                ) VALUES (
+                    %s, %s, %s,
+                    %s, %s, %s, %s, %s,
+                    %s, %s, %s, %s, %s, %s, NOW()
+                )
+            """, rows)
     
     def validate_calculation(
         self, 
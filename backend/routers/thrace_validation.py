@@ -0,0 +1,201 @@
+"""
+Row validation for THRACE uploads.
+
+The "positives cannot exceed exams/samples" checks are a table of rules, compiled once
+at import into (positive, denominator) positions in the count block, so no rule looks a
+column up by name per row. Rows are validated a block at a time, but the checks are
+still plain Python comparisons, one per cell. The errore strings and their order within
+a row are the same as the hand-written checks this replaces.
+
+natural_key_digest() identifies an inspection record for the duplicate check at approval.
+"""
+
+import hashlib
+from datetime import date
+from itertools import compress
+from operator import gt
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+# The count columns of factivities_tmp, in INSERT_STAGING_QUERY order
+COUNT_FIELDS = (
+    'cattle', 'sheep', 'goat', 'pig', 'buffalo',
+    'cattleexam', 'cattlecliposFMD', 'cattlecliposLSD',
+    'sheepexam', 'sheepposFMD', 'sheepposSGP', 'sheepposPPR',
+    'goatsexam', 'goatsposFMD', 'goatsposSGP', 'goatsposPPR',
+    'buffaloesexam', 'buffaloesposFMD', 'buffaloesposLSD',
+    'cattlesample', 'cattleseroposFMD', 'cattleseroposLSD',
+    'sheepsample', 'sheepseroposFMD', 'sheepseroposSGP', 'sheepseroposPPR',
+    'goatsample', 'goatsseroposFMD', 'goatsseroposSGP', 'goatsseroposPPR',
+    'pigssample', 'pigsserosposFMD',
+    'buffaloessample', 'buffaloesseroposFMD', 'buffaloesseroposLSD',
+    'wildsample', 'wildserosposFMD',
+    'cattletested', 'sheeptested', 'goattested', 'buffalotested', 'pigtested', 'wildtested',
+)
+
+# What makes two inspection records the same: where, when, by whom and every count
+NATURAL_KEY_FIELDS = ('epiunitID', 'dt_insp', 'inspectorID') + COUNT_FIELDS
+
+# (positive column, denominator column, message) - checked in this order
+POSITIVE_RULES = (
+    # Clinical
+    ('cattlecliposFMD', 'cattleexam', "Cattle clin. FMD ({}) > exams ({}); "),
+    ('cattlecliposLSD', 'cattleexam', "Cattle clin. LSD ({}) > exams ({}); "),
+    ('sheepposFMD', 'sheepexam', "Sheep clin. FMD ({}) > exams ({}); "),
+    ('sheepposSGP', 'sheepexam', "Sheep clin. SGP ({}) > exams ({}); "),
+    ('sheepposPPR', 'sheepexam', "Sheep clin. PPR ({}) > exams ({}); "),
+    ('goatsposFMD', 'goatsexam', "Goat clin. FMD ({}) > exams ({}); "),
+    ('goatsposSGP', 'goatsexam', "Goat clin. SGP ({}) > exams ({}); "),
+    ('goatsposPPR', 'goatsexam', "Goat clin. PPR ({}) > exams ({}); "),
+    ('buffaloesposFMD', 'buffaloesexam', "Buffalo clin. FMD ({}) > exams ({}); "),
+    ('buffaloesposLSD', 'buffaloesexam', "Buffalo clin. LSD ({}) > exams ({}); "),
+    # Serology
+    ('cattleseroposFMD', 'cattlesample', "Cattle sero. FMD ({}) > samples ({}); "),
+    ('cattleseroposLSD', 'cattlesample', "Cattle sero. LSD ({}) > samples ({}); "),
+    ('sheepseroposFMD', 'sheepsample', "Sheep sero. FMD ({}) > samples ({}); "),
+    ('sheepseroposSGP', 'sheepsample', "Sheep sero. SGP ({}) > samples ({}); "),
+    ('sheepseroposPPR', 'sheepsample', "Sheep sero. PPR ({}) > samples ({}); "),
+    ('goatsseroposFMD', 'goatsample', "Goat sero. FMD ({}) > samples ({}); "),
+    ('goatsseroposSGP', 'goatsample', "Goat sero. SGP ({}) > samples ({}); "),
+    ('goatsseroposPPR', 'goatsample', "Goat sero. PPR ({}) > samples ({}); "),
+    ('pigsserosposFMD', 'pigssample', "Pig sero. FMD ({}) > samples ({}); "),
+    ('buffaloesseroposFMD', 'buffaloessample', "Buffalo sero. FMD ({}) > samples ({}); "),
+    ('buffaloesseroposLSD', 'buffaloessample', "Buffalo sero. LSD ({}) > samples ({}); "),
+    ('wildserosposFMD', 'wildsample', "Wild sero. FMD ({}) > samples ({}); "),
+)
+
+
+class CompiledRule(NamedTuple):
+    positive: int     # position in COUNT_FIELDS
+    denominator: int
+    message: str
+
+
+def compile_rules(rules) -> tuple:
+    positions = {field: index for index, field in enumerate(COUNT_FIELDS)}
+    return tuple(CompiledRule(positions[positive], positions[denominator], message)
+                 for positive, denominator, message in rules)
+
+
+COMPILED_RULES = compile_rules(POSITIVE_RULES)
+
+
+def natural_key_digest(row: dict) -> bytes:
+    """
+    Digest of a factivities / factivities_tmp row's natural key. Blank counts equal 0 (staging
+    stores 0 as NULL) and dates compare as YYYY-MM-DD whether the driver returns date or str.
+    """
+    key = (row['epiunitID'], str(row['dt_insp']), row['inspectorID'], *[row[field] or 0 for field in COUNT_FIELDS])
+    return hashlib.blake2b(repr(key).encode(), digest_size=16).digest()
+
+
+def is_numeric(value):
+    """Check if value can be converted to a number"""
+    if value is None:
+        return False
+    try:
+        float(value)
+        return True
+    except (ValueError, TypeError):
+        return False
+
+
+def to_count(value) -> int:
+    """A count cell as an int - blanks, text and anything below 1 count as 0"""
+    if is_numeric(value):
+        number = int(float(value))
+        return number if number >= 1 else 0
+    return 0
+
+
+class ValidatedRow(NamedTuple):
+    number: int                    # worksheet row number
+    params: Optional[tuple]        # INSERT_STAGING_QUERY parameters, None if the row could not be parsed
+    error: Optional[str]           # errore value, or the parse error when params is None
+
+
+class RowValidator:
+    """Validates the data rows of one upload against its header's column map"""
+
+    def __init__(self, column_map: Dict[str, int], epiunits: Dict[str, int], user_id: int):
+        self.column_map = column_map
+        self.epiunits = epiunits
+        self.user_id = user_id
+        self.uploaded_on = date.today()
+        # Sheet positions of the count columns; None where the sheet lacks the column
+        self.count_positions = tuple(column_map.get(field) for field in COUNT_FIELDS)
+
+    def value(self, row: tuple, field: str):
+        position = self.column_map.get(field)
+        return row[position] if position is not None else None
+
+    def is_data_row(self, row: tuple) -> bool:
+        """Rows with no Year are skipped, as the PHP app stopped at them"""
+        year = self.value(row, 'year')
+        return year is not None and str(year).strip() != ''
+
+    def _parse(self, row: tuple):
+        """(core fields, errore prefix, counts) for one row - conversion errors are raised"""
+        villagename = str(row[1]).strip() if row[1] else ""  # Column 1 is always Name/villagename
+        inspector = self.value(row, 'inspectorID')
+        inspectorID = int(float(inspector)) if is_numeric(inspector) else 0
+        code = self.value(row, 'epiunitcountrycode')
+        epiunitcountrycode = str(code).strip().upper() if code else ""
+        epiunitID = self.epiunits.get(epiunitcountrycode) or 0
+
+        # Build date from year/month/day columns
+        year, month, day = (self.value(row, field) for field in ('year', 'month', 'day'))
+        year = int(float(year)) if is_numeric(year) else None
+        month = int(float(month)) if is_numeric(month) else None
+        day = int(float(day)) if is_numeric(day) else None
+        dt_insp = f"{year:04d}-{month:02d}-{day:02d}" if year and month and day else None
+
+        errors = []
+        # Foreign key validation - check if epiunitcountrycode exists in epiunits
+        if epiunitcountrycode and epiunitcountrycode not in self.epiunits:
+            errors.append(f"Invalid Village/Epiunit code ({epiunitcountrycode}) - not found in epiunits table; ")
+        # Required field validation
+        if not epiunitID:
+            errors.append("Missing or invalid Village/Epiunit code; ")
+        if not villagename:
+            errors.append("Missing Name/villagename; ")
+        if not inspectorID:
+            errors.append("Missing InspectorID; ")
+        if not dt_insp:
+            errors.append("The format of the date is not correct; ")
+
+        counts = tuple(to_count(row[position]) if position is not None else 0 for position in self.count_positions)
+        core = (epiunitID, inspectorID, dt_insp, epiunitcountrycode, villagename)
+        return core, errors, counts
+
+    def validate_block(self, rows: Iterable) -> List[ValidatedRow]:
+        """Validate a block of (row number, values) data rows - results come back in row order"""
+        results = []
+        parsed = []  # (row number, core fields, error list, counts) - results holds None in their place
+        for number, row in rows:
+            try:
+                core, errors, counts = self._parse(row)
+            except Exception as e:
+                results.append(ValidatedRow(number, None, f"Error parsing - {str(e)}"))
+                continue
+            parsed.append((number, core, errors, counts))
+            results.append(None)
+        if not parsed:
+            return results
+
+        # One list per count column, then each rule walks its two columns row by row
+        columns = list(zip(*(counts for *_, counts in parsed)))
+        for rule in COMPILED_RULES:
+            positives, denominators = columns[rule.positive], columns[rule.denominator]
+            for index in compress(range(len(parsed)), map(gt, positives, denominators)):
+                parsed[index][2].append(rule.message.format(positives[index], denominators[index]))
+
+        validated = iter(parsed)
+        for position, result in enumerate(results):
+            if result is not None:
+                continue
+            number, (epiunitID, inspectorID, dt_insp, code, villagename), errors, counts = next(validated)
+            error = "".join(errors) or None
+            params = (epiunitID, inspectorID, dt_insp, *[count or None for count in counts],
+                      error, self.uploaded_on, self.user_id, code, villagename)
+            results[position] = ValidatedRow(number, params, error)
+        return results
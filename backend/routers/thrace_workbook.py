@@ -0,0 +1,129 @@
+"""
+Streaming reader for THRACE upload workbooks.
+
+The upload is copied to a temporary file in chunks instead of being read into memory
+as a whole, then opened with openpyxl in read-only mode: the sheet XML is parsed as the
+rows are iterated, rather than building a cell object for every cell up front. Rows are
+handed to validation one at a time as plain value tuples (formula results, not formulas).
+"""
+
+import tempfile
+from typing import IO, Dict, Iterator, NamedTuple, Optional
+
+from fastapi import UploadFile
+
+# Excel column headers -> factivities_tmp field names (45-column format of the old PHP app)
+HEADER_TO_FIELD = {
+    'InspectorID': 'inspectorID',
+    'Village/Epiunit code': 'epiunitcountrycode',
+    'Year': 'year',
+    'Month': 'month',
+    'Day': 'day',
+    'Cattle': 'cattle',
+    'Sheep': 'sheep',
+    'Goats': 'goat',
+    'Pigs': 'pig',
+    'W Buffalo': 'buffalo',
+    'Cattle clin exam': 'cattleexam',
+    'Cattle tested': 'cattletested',
+    'Cattle clin pos FMD': 'cattlecliposFMD',
+    'Cattle clin pos LSD': 'cattlecliposLSD',
+    'Sheep clin exam': 'sheepexam',
+    'Sheep clin pos FMD': 'sheepposFMD',
+    'Sheep clin pos SGP': 'sheepposSGP',
+    'Sheep clin pos PPR': 'sheepposPPR',
+    'Goats clin exam': 'goatsexam',
+    'Goats clin pos FMD': 'goatsposFMD',
+    'Goats clin pos SGP': 'goatsposSGP',
+    'Goats clin pos PPR': 'goatsposPPR',
+    'Buffalo clin exam': 'buffaloesexam',
+    'Buffalo clin pos FMD': 'buffaloesposFMD',
+    'Buffalo clin pos LSD': 'buffaloesposLSD',
+    'Cattle smpl': 'cattlesample',
+    'Cattle sero pos FMD': 'cattleseroposFMD',
+    'Cattle pos LSD': 'cattleseroposLSD',
+    'Sheep tested': 'sheeptested',
+    'Sheep smpl': 'sheepsample',
+    'Sheep sero pos FMD': 'sheepseroposFMD',
+    'Sheep test pos SGP': 'sheepseroposSGP',
+    'Sheep sero pos PPR': 'sheepseroposPPR',
+    'Goats tested': 'goattested',
+    'Goats smpl': 'goatsample',
+    'Goats sero pos FMD': 'goatsseroposFMD',
+    'Goats test pos SGP': 'goatsseroposSGP',
+    'Goat sero pos PPR': 'goatsseroposPPR',
+    'Pigs tested': 'pigtested',
+    'Pigs smpl': 'pigssample',
+    'Pigs sero pos FMD': 'pigsserosposFMD',
+    'Buffalo tested': 'buffalotested',
+    'Buffalo smpl': 'buffaloessample',
+    'Buffalo sero pos FMD': 'buffaloesseroposFMD',
+    'Buffalo test pos LSD': 'buffaloesseroposLSD',
+    'Wild tested': 'wildtested',
+    'Wild smpl': 'wildsample',
+    'Wild sero pos FMD': 'wildserosposFMD'
+}
+
+# Rows 2 to 401 - the interactive upload accepts 400 data rows at most
+MAX_DATA_ROWS = 400
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+
+class SheetRow(NamedTuple):
+    number: int    # worksheet row number as shown in Excel (the header is row 1)
+    values: tuple  # cell values, padded with None to the header width
+
+
+async def spool_upload(file: UploadFile) -> IO[bytes]:
+    """Copy the upload to an anonymous temporary file, chunk by chunk - the caller closes it"""
+    spool = tempfile.TemporaryFile(suffix=".xlsx")
+    try:
+        while True:
+            chunk = await file.read(SPOOL_CHUNK_SIZE)
+            if not chunk:
+                break
+            spool.write(chunk)
+        spool.seek(0)
+    except BaseException:
+        spool.close()
+        raise
+    return spool
+
+
+class UploadWorkbook:
+    """
+    The active sheet of an uploaded workbook, opened read-only.
+    Use as a context manager so the underlying zip file is released.
+    """
+
+    def __init__(self, source: IO[bytes]):
+        # openpyxl is imported here rather than at module level - it is only needed by uploads
+        import openpyxl
+        self._workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        self._sheet = self._workbook.active
+        # Some writers store a wrong <dimension>; read the real extent from the rows instead
+        self._sheet.reset_dimensions()
+        header = next(self._sheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        # Column 1 (Name/villagename) is read by position, so rows are always at least two wide
+        self.width = max(len(header), 2)
+        self.column_map: Dict[str, int] = {}
+        for col_idx, value in enumerate(header):
+            header_value = str(value).strip() if value else None
+            if header_value and header_value in HEADER_TO_FIELD:
+                self.column_map[HEADER_TO_FIELD[header_value]] = col_idx
+
+    def rows(self, max_rows: Optional[int] = MAX_DATA_ROWS) -> Iterator[SheetRow]:
+        """Data rows from row 2 on, lazily - gaps in the sheet come out as all-None rows"""
+        max_row = 1 + max_rows if max_rows is not None else None
+        values = self._sheet.iter_rows(min_row=2, max_row=max_row, max_col=self.width, values_only=True)
+        for number, row in enumerate(values, start=2):
+            yield SheetRow(number, row)
+
+    def close(self):
+        self._workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,9 +1,7 @@
 from fastapi import APIRouter, HTTPException
-from database import training_engine
+from database import DatabaseHelper
+from config import settings
 from typing import Optional
-from sqlalchemy import text
-from concurrent.futures import ThreadPoolExecutor
-import asyncio
 
 router = APIRouter(prefix="/api/training-calendar", tags=["training-calendar"])
 
@@ -41,16 +39,11 @@ async def get_calendar_events(month: Optional[int] = None, year: Optional[int] =
         
         query += " ORDER BY start_date ASC"
         
-        # Execute query on training database
-        loop = asyncio.get_event_loop()
-        executor = ThreadPoolExecutor(max_workers=5)
-        
-        def _execute():
-            with training_engine.connect() as connection:
-                result = connection.execute(text(query), params)
-                return [dict(row._mapping) for row in result]
-        
-        data = await loop.run_in_executor(executor, _execute)
+        # Execute query on training database - the calendar changes rarely, so results are cached briefly
+        result = await DatabaseHelper.execute_training_query(query, params, cache_ttl=settings.reference_data_cache_ttl)
+        if result["error"]:
+            raise HTTPException(status_code=500, detail=result["error"])
+        data = result["data"]
         
         # Format for frontend compatibility
         events = []
@@ -68,5 +61,7 @@ async def get_calendar_events(month: Optional[int] = None, year: Optional[int] =
         
         return events
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,12 +1,29 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
-from database import training_engine
+from database import get_engine, DatabaseHelper
+from query_cancel import QueryCancelScope, QueryTimeout, cancel_on_disconnect
+from config import settings
 from auth import get_current_user
 from sqlalchemy import text
-from concurrent.futures import ThreadPoolExecutor
-import asyncio
 from typing import List, Dict, Any, Optional
+from app_logging import get_logger
 
 router = APIRouter(prefix="/api/training-credits", tags=["training-credits"])
+logger = get_logger("training_credits")
+
+COUNTRY_CODES_QUERY = "SELECT name_un, code_moodle FROM countries"
+
+async def get_country_codes() -> Dict[str, Any]:
+    """name_un -> Moodle country code, from the result cache (primed by the startup warm-up)"""
+    result = await DatabaseHelper.execute_main_query(
+        COUNTRY_CODES_QUERY, coalesce=True, cache_ttl=settings.reference_data_cache_ttl
+    )
+    if result["error"]:
+        raise RuntimeError(result["error"])
+    codes = {}
+    for row in result["data"]:
+        # First row wins for a duplicated name, as the per-request "LIMIT 1" lookup did
+        codes.setdefault(row["name_un"], row["code_moodle"])
+    return codes
 
 @router.get("/past")
 async def get_past_training_credits(current_user: dict = Depends(get_current_user)):
@@ -33,15 +50,12 @@ async def get_past_training_credits(current_user: dict = Depends(get_current_use
         """
         
         # Execute query on training database
-        loop = asyncio.get_event_loop()
-        executor = ThreadPoolExecutor(max_workers=5)
-        
         def _execute():
-            with training_engine.connect() as connection:
+            with get_engine("training").connect() as connection:
                 result = connection.execute(text(query), {"country": country})
                 return [dict(row._mapping) for row in result]
         
-        data = await loop.run_in_executor(executor, _execute)
+        data = await DatabaseHelper.run_sync("training", _execute)
         
         return data
         
@@ -66,31 +80,16 @@ async def get_training_summary(
         if not country:
             raise HTTPException(status_code=400, detail="User country not found")
         
-        print(f"Summary request - Country: {country}, Years: {year}, Categories: {category}")
+        logger.debug("Summary request - Country: %s, Years: %s, Categories: %s", country, year, category)
         
-        loop = asyncio.get_event_loop()
-        executor = ThreadPoolExecutor(max_workers=5)
+        # First, get the country code from db_manager
+        country_code = (await get_country_codes()).get(country)
         
         def _execute():
-            from database import main_engine
-            
-            # First, get the country code from db_manager
-            country_code = None
-            with main_engine.connect() as main_conn:
-                country_query = text("""
-                    SELECT code_moodle 
-                    FROM countries 
-                    WHERE name_un = :country
-                    LIMIT 1
-                """)
-                result = main_conn.execute(country_query, {"country": country})
-                row = result.fetchone()
-                if row:
-                    country_code = row[0]
             
-            print(f"Country: {country}, Country Code: {country_code}")
+            logger.debug("Country: %s, Country Code: %s", country, country_code)
             
-            with training_engine.connect() as connection:
+            with get_engine("training").connect() as connection:
                 moodle_courses = []
                 non_moodle_courses = []
                 
@@ -113,14 +112,14 @@ async def get_training_summary(
                                 )
                                 moodle_params[f"year{i}"] = year[i]
                             moodle_filters.append(f"({' OR '.join(year_conditions)})")
-                            print(f"Year filter added: {year}")
+                            logger.debug("Year filter added: %s", year)
                         
                         if category and len(category) > 0:
                             category_conditions = [f"mc.main_topic = :category{i}" for i in range(len(category))]
                             moodle_filters.append(f"({' OR '.join(category_conditions)})")
                             for i, c in enumerate(category):
                                 moodle_params[f"category{i}"] = c
-                            print(f"Category filter added: {category}")
+                            logger.debug("Category filter added: %s", category)
                         
                         moodle_query = text(f"""
                             SELECT 
@@ -136,18 +135,16 @@ async def get_training_summary(
                             GROUP BY mc.id, mc.fullname, mc.shortname
                         """)
                         
-                        print(f"Moodle SQL: {moodle_query}")
-                        print(f"Moodle params: {moodle_params}")
+                        logger.debug("Moodle SQL: %s", moodle_query)
+                        logger.debug("Moodle params: %s", moodle_params)
                         
                         moodle_result = connection.execute(moodle_query, moodle_params)
                         moodle_courses = [dict(row._mapping) for row in moodle_result]
-                        print(f"Moodle query successful: {len(moodle_courses)} courses found")
+                        logger.debug("Moodle query successful: %s courses found", len(moodle_courses))
                     except Exception as e:
-                        print(f"Moodle query error: {str(e)}")
-                        import traceback
-                        traceback.print_exc()
+                        logger.exception("Moodle query error: %s", e)
                 else:
-                    print(f"Country code not found for country: {country}")
+                    logger.debug("Country code not found for country: %s", country)
                 
                 # Query Non-Moodle enrollments
                 try:
@@ -186,23 +183,21 @@ async def get_training_summary(
                         GROUP BY nmc.shortname, nmc.fullname
                     """)
                     
-                    print(f"Non-Moodle SQL: {non_moodle_query}")
-                    print(f"Non-Moodle params: {non_moodle_params}")
+                    logger.debug("Non-Moodle SQL: %s", non_moodle_query)
+                    logger.debug("Non-Moodle params: %s", non_moodle_params)
                     
                     non_moodle_result = connection.execute(non_moodle_query, non_moodle_params)
                     non_moodle_courses = [dict(row._mapping) for row in non_moodle_result]
-                    print(f"Non-Moodle query successful: {len(non_moodle_courses)} courses found")
+                    logger.debug("Non-Moodle query successful: %s courses found", len(non_moodle_courses))
                 except Exception as e:
-                    print(f"Non-Moodle query error: {str(e)}")
-                    import traceback
-                    traceback.print_exc()
+                    logger.exception("Non-Moodle query error: %s", e)
                 
                 return {
                     "moodle": moodle_courses,
                     "non_moodle": non_moodle_courses
                 }
         
-        data = await loop.run_in_executor(executor, _execute)
+        data = await DatabaseHelper.run_sync("training", _execute)
         
         # Combine and aggregate results
         all_courses = []
@@ -275,7 +270,8 @@ async def get_training_summary(
 
 @router.get("/competency-framework")
 async def get_competency_framework(
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    _disconnect=Depends(cancel_on_disconnect)
 ):
     """
     Get competency level distribution for all users in the authenticated user's country.
@@ -286,22 +282,15 @@ async def get_competency_framework(
         if not country:
             raise HTTPException(status_code=400, detail="User country not found")
         
-        print(f"Competency framework request for country: {country}")
+        logger.debug("Competency framework request for country: %s", country)
+        
+        # 26 sequential queries - give them one deadline and kill them if the client leaves
+        scope = QueryCancelScope("training", settings.db_report_timeout)
         
-        loop = asyncio.get_event_loop()
-        executor = ThreadPoolExecutor(max_workers=5)
+        # Get country code for Moodle filtering
+        country_code = (await get_country_codes()).get(country)
         
         def _execute():
-            from database import main_engine
-            
-            # Get country code for Moodle filtering
-            country_code = None
-            with main_engine.connect() as main_conn:
-                country_query = text("SELECT code_moodle FROM countries WHERE name_un = :country LIMIT 1")
-                result = main_conn.execute(country_query, {"country": country})
-                row = result.fetchone()
-                if row:
-                    country_code = row[0]
             
             # 13 competencies to track
             competencies = [
@@ -329,10 +318,12 @@ async def get_competency_framework(
                 "Expert": 5
             }
             
-            with training_engine.connect() as connection:
+            with get_engine("training").connect() as connection, scope.track(connection):
                 result_data = {}
                 
                 for competency in competencies:
+                    # The per-query handlers below swallow errors, so stop here once cancelled
+                    scope.check()
                     # Initialize level counts
                     level_distribution = {f"level_{i}": 0 for i in range(1, 6)}
                     user_competency_levels = {}  # user_id -> max_level
@@ -376,7 +367,7 @@ async def get_competency_framework(
                                     user_competency_levels[user_id] = level_value
                         
                         except Exception as e:
-                            print(f"Moodle query error for {competency}: {str(e)}")
+                            logger.error("Moodle query error for %s: %s", competency, e)
                     
                     # Query Non-Moodle enrollments
                     try:
@@ -413,7 +404,7 @@ async def get_competency_framework(
                                 user_competency_levels[user_id] = level_value
                     
                     except Exception as e:
-                        print(f"Non-Moodle query error for {competency}: {str(e)}")
+                        logger.error("Non-Moodle query error for %s: %s", competency, e)
                     
                     # Count users at each level
                     for user_id, max_level in user_competency_levels.items():
@@ -426,19 +417,19 @@ async def get_competency_framework(
                         "levels": level_distribution
                     }
                     
-                    print(f"{competency}: {len(user_competency_levels)} users, distribution: {level_distribution}")
+                    logger.debug("%s: %s users, distribution: %s", competency, len(user_competency_levels), level_distribution)
                 
                 return result_data
         
-        data = await loop.run_in_executor(executor, _execute)
+        data = await DatabaseHelper.run_sync("training", _execute, scope=scope)
         
         return {
             "country": country,
             "competencies": data
         }
         
+    except QueryTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
-        print(f"Competency framework error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Competency framework error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,57 @@
+"""
+Test script for the queue-based JSON logging in app_logging.py
+"""
+
+import io
+import json
+import logging
+
+import conftest  # Dummy settings, so the script also runs without pytest
+
+import app_logging
+from app_logging import JsonFormatter, configure_logging, shutdown_logging, get_logger, log_sampled
+from config import settings
+
+
+def test_json_lines_through_the_queue():
+    stream = io.StringIO()
+    level, sample_every = settings.log_level, settings.log_sample_every
+    settings.log_level, settings.log_sample_every = "DEBUG", 10
+    configure_logging()
+    # Swap the listener's stderr handler for one we can read back
+    app_logging._listener.handlers[0].stream = stream
+    try:
+        logger = get_logger("test")
+        logger.info("Uploaded %s rows", 3, extra={"user_id": 7})
+        for row in range(25):
+            log_sampled(logger, logging.DEBUG, "Row %s accepted", row)
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("Upload failed")
+        get_logger("quiet").setLevel(logging.WARNING)
+        get_logger("quiet").info("dropped before it reaches the queue")
+    finally:
+        shutdown_logging()
+        settings.log_level, settings.log_sample_every = level, sample_every
+
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert entries[0]["message"] == "Uploaded 3 rows" and entries[0]["user_id"] == 7, entries[0]
+    assert entries[0]["level"] == "INFO" and entries[0]["logger"] == "nexus.test"
+    # One in ten per-row messages: rows 0, 10 and 20
+    sampled = [entry["message"] for entry in entries if entry["message"].startswith("Row")]
+    assert sampled == ["Row 0 accepted", "Row 10 accepted", "Row 20 accepted"], sampled
+    assert "ValueError: boom" in entries[-1]["exception"], entries[-1]
+    assert not any("dropped" in entry["message"] for entry in entries)
+
+
+def test_json_formatter_escapes_messages():
+    record = logging.LogRecord("nexus.test", logging.WARNING, __file__, 1, 'quote " and\nnewline', None, None)
+    line = JsonFormatter().format(record)
+    assert "\n" not in line and json.loads(line)["message"] == 'quote " and\nnewline'
+
+
+if __name__ == "__main__":
+    test_json_lines_through_the_queue()
+    test_json_formatter_escapes_messages()
+    print("✅ Logging checks passed")
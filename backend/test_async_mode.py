@@ -0,0 +1,72 @@
+"""
+Test script for DatabaseHelper's native asyncio mode (settings.db_async_mode)
+Runs the helpers against a local aiosqlite stand-in instead of MySQL - aiosqlite comes from requirements-dev.txt
+"""
+
+import os
+import asyncio
+import tempfile
+
+import conftest  # Dummy settings, so the script also runs without pytest
+
+from sqlalchemy.ext.asyncio import create_async_engine
+import database
+from database import DatabaseHelper
+from config import settings
+
+
+async def run_async_mode_checks(db_path: str):
+    settings.db_async_mode = True
+    database.set_async_engine("main", create_async_engine(f"sqlite+aiosqlite:///{db_path}"))
+    database.set_async_engine("thrace", create_async_engine(f"sqlite+aiosqlite:///{db_path}"))
+    try:
+        result = await DatabaseHelper.execute_main_query(
+            "CREATE TABLE countries (id INTEGER PRIMARY KEY, iso3 TEXT, name_un TEXT)"
+        )
+        assert result["error"] is None, result
+
+        result = await DatabaseHelper.execute_main_query(
+            "INSERT INTO countries (id, iso3, name_un) VALUES (%s, %s, %s)", (1, "GRC", "Greece")
+        )
+        assert result == {"data": 1, "error": None}, result
+
+        result = await DatabaseHelper.execute_thrace_query(
+            "INSERT INTO countries (id, iso3, name_un) VALUES (%s, %s, %s)", (2, "BGR", "Bulgaria")
+        )
+        assert result == {"data": 1, "error": None}, result
+
+        result = await DatabaseHelper.execute_main_query("SELECT iso3 FROM countries WHERE id = %s", (2,))
+        assert result == {"data": [{"iso3": "BGR"}], "error": None}, result
+
+        # Concurrent callers share the async engine without any executor threads
+        completed_before = {name: stats["completed"] for name, stats in database.get_executor_stats().items()}
+        results = await asyncio.gather(*[
+            DatabaseHelper.execute_main_query("SELECT name_un FROM countries ORDER BY id") for _ in range(20)
+        ])
+        assert all(r["data"] == [{"name_un": "Greece"}, {"name_un": "Bulgaria"}] for r in results)
+        completed_after = {name: stats["completed"] for name, stats in database.get_executor_stats().items()}
+        assert completed_after == completed_before, "async mode should not use the executors"
+
+        # Transactions commit through the AsyncConnection
+        async with DatabaseHelper.transaction("main") as tx:
+            await tx.execute("UPDATE countries SET name_un = %s WHERE id = %s", ("Hellas", 1))
+            await tx.execute_many("INSERT INTO countries (id, iso3, name_un) VALUES (%s, %s, %s)", [(3, "TUR", "Türkiye")])
+        result = await DatabaseHelper.execute_main_query("SELECT name_un FROM countries WHERE id IN (1, 3) ORDER BY id")
+        assert result["data"] == [{"name_un": "Hellas"}, {"name_un": "Türkiye"}], result
+
+        # Errors keep the {"data", "error"} contract
+        result = await DatabaseHelper.execute_main_query("SELECT * FROM missing_table")
+        assert result["data"] == [] and "missing_table" in result["error"], result
+    finally:
+        settings.db_async_mode = False
+        await database.dispose_async_engines()
+
+
+def test_async_mode():
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run_async_mode_checks(os.path.join(tmp, "nexus.db")))
+
+
+if __name__ == "__main__":
+    test_async_mode()
+    print("✅ Async mode checks passed")
@@ -0,0 +1,82 @@
+"""
+Test script for the user and token caches in auth.py
+"""
+
+import asyncio
+import time
+from datetime import timedelta
+
+from jose import JWTError
+from sqlalchemy import event
+
+from conftest import use_sqlite_engines
+import auth
+from database import DatabaseHelper
+
+
+def test_user_cache_follows_user_writes():
+    engine = use_sqlite_engines()
+    auth.user_cache.clear()
+
+    async def run():
+        await DatabaseHelper.execute_main_query("DROP TABLE IF EXISTS users")
+        await DatabaseHelper.execute_main_query(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT, role TEXT, country TEXT, last_logout TEXT)"
+        )
+        await DatabaseHelper.execute_main_query(
+            "INSERT INTO users (id, name, email, role, country) VALUES (%s, %s, %s, %s, %s)",
+            (7, "Ana", "ana@example.org", "user", "Greece")
+        )
+        lookups = []
+
+        def on_execute(conn, cursor, statement, *args):
+            if "FROM users" in statement:
+                lookups.append(statement)
+
+        event.listen(engine, "before_cursor_execute", on_execute)
+        try:
+            first = await auth.load_user(7)
+            first["role"] = "tampered"
+            second = await auth.load_user(7)
+            assert second["role"] == "user" and second["user_id"] == 7 and len(lookups) == 1, (second, lookups)
+
+            # A write to users (logout, role change) drops the cached rows
+            await DatabaseHelper.execute_main_query("UPDATE users SET role = %s WHERE id = %s", ("admin", 7))
+            assert (await auth.load_user(7))["user_role"] == "admin" and len(lookups) == 2
+            assert await auth.load_user(8) is None
+        finally:
+            event.remove(engine, "before_cursor_execute", on_execute)
+        stats = auth.user_cache.stats()
+        assert stats["hits"] == 1 and stats["misses"] == 3, stats
+
+    asyncio.run(run())
+
+
+def test_token_cache_skips_repeated_verification():
+    auth.token_cache.clear()
+    token = auth.create_access_token({"user_id": 7}, expires_delta=timedelta(seconds=1))
+    before = auth.token_cache.stats()
+    first = auth.decode_token(token)
+    first["user_id"] = 8  # callers get copies
+    assert auth.decode_token(token)["user_id"] == 7
+    after = auth.token_cache.stats()
+    assert after["hits"] - before["hits"] == 1 and after["misses"] - before["misses"] == 1, after
+
+    # A tampered token is never served from the cache, and entries die with the token
+    try:
+        auth.decode_token(token[:-2] + ("AA" if not token.endswith("AA") else "BB"))
+        raise AssertionError("expected a bad signature to be rejected")
+    except JWTError:
+        pass
+    time.sleep(2.1)  # jose compares exp at whole-second resolution
+    try:
+        auth.decode_token(token)
+        raise AssertionError("expected the expired token to be rejected")
+    except JWTError:
+        pass
+
+
+if __name__ == "__main__":
+    test_user_cache_follows_user_writes()
+    test_token_cache_skips_repeated_verification()
+    print("✅ Auth cache checks passed")
@@ -0,0 +1,312 @@
+"""
+Test script for DatabaseHelper internals that don't need MySQL
+Swaps the engines for in-memory SQLite stand-ins and exercises the thread-mode helpers
+"""
+
+import asyncio
+import threading
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
+
+from conftest import use_sqlite_engines, seed_countries
+import database
+from database import (
+    DatabaseHelper, DatabaseSession, DatabaseExecutor, ExecutorSaturated, translate_placeholders,
+    compile_statement, compile_multirow_statement, get_statement_cache_stats
+)
+from query_cache import query_cache
+
+
+def test_translate_placeholders():
+    sql, names = translate_placeholders("SELECT * FROM t WHERE a = %s AND b = %s")
+    assert sql == "SELECT * FROM t WHERE a = :param0 AND b = :param1"
+    assert names == ("param0", "param1")
+
+    # %s inside quoted literals is part of the SQL, not a placeholder
+    sql, names = translate_placeholders(
+        "SELECT DATE_FORMAT(date, '%Y-%m-%d %H:%i:%s') AS d, \"%s\" AS q FROM t WHERE id = %s"
+    )
+    assert sql == "SELECT DATE_FORMAT(date, '%Y-%m-%d %H:%i:%s') AS d, \"%s\" AS q FROM t WHERE id = :param0"
+    assert names == ("param0",)
+
+
+def test_statement_cache_hits():
+    compile_statement.cache_clear()
+    query = "SELECT name_un FROM countries WHERE iso3 = %s"
+    first = compile_statement(query)
+    for _ in range(9):
+        assert compile_statement(query) is first
+    stats = get_statement_cache_stats()
+    assert stats["misses"] == 1 and stats["hits"] == 9, stats
+
+
+def test_helpers_share_placeholder_convention():
+    use_sqlite_engines()
+
+    async def run():
+        await seed_countries()
+        for helper in (DatabaseHelper.execute_main_query, DatabaseHelper.execute_pcp_query,
+                       DatabaseHelper.execute_thrace_query):
+            result = await helper("SELECT iso3 FROM countries WHERE id = %s OR id = %s ORDER BY id", (1, 3))
+            assert result == {"data": [{"iso3": "GRC"}, {"iso3": "TUR"}], "error": None}, result
+
+        # Lists and dicts are accepted as well as tuples
+        result = await DatabaseHelper.execute_main_query("SELECT iso3 FROM countries WHERE id = %s", [2])
+        assert result["data"] == [{"iso3": "BGR"}], result
+        result = await DatabaseHelper.execute_main_query("SELECT iso3 FROM countries WHERE id = :id", {"id": 2})
+        assert result["data"] == [{"iso3": "BGR"}], result
+
+    asyncio.run(run())
+
+
+def test_columnar_and_streaming_results():
+    use_sqlite_engines()
+
+    async def run():
+        await seed_countries()
+        result = await DatabaseHelper.execute_main_query(
+            "SELECT id, iso3 FROM countries ORDER BY id", result_format="columns"
+        )
+        assert result == {"data": {"id": [1, 2, 3], "iso3": ["GRC", "BGR", "TUR"]}, "error": None}, result
+
+        result = await DatabaseHelper.execute_main_query(
+            "SELECT id FROM countries WHERE id > %s", (10,), result_format="columns"
+        )
+        assert result == {"data": {"id": []}, "error": None}, result
+
+        chunks = [chunk async for chunk in DatabaseHelper.stream_main_query(
+            "SELECT iso3 FROM countries WHERE id >= %s ORDER BY id", (1,), chunk_size=2
+        )]
+        assert chunks == [[{"iso3": "GRC"}, {"iso3": "BGR"}], [{"iso3": "TUR"}]], chunks
+
+    asyncio.run(run())
+
+
+def test_multirow_statement_expansion():
+    query = """
+        INSERT INTO disease_status (country_id, FMD, date, user_id)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE FMD = VALUES(FMD), date = VALUES(date)
+    """
+    statement = compile_multirow_statement(query, 3)
+    sql = str(statement.clause)
+    assert sql.count("(:param") == 3 and len(statement.param_names) == 12, sql
+    assert "ON DUPLICATE KEY UPDATE FMD = VALUES(FMD)" in sql
+    # Only INSERT ... VALUES statements are expanded
+    assert compile_multirow_statement("UPDATE countries SET iso3 = %s WHERE id = %s", 3) is None
+
+
+def test_execute_many():
+    use_sqlite_engines()
+
+    async def run():
+        await seed_countries()
+        rows = [(10 + i, f"X{i:02d}", f"Country {i}", None) for i in range(25)]
+        result = await DatabaseHelper.execute_main_many(
+            "INSERT INTO countries (id, iso3, name_un, subregion) VALUES (%s, %s, %s, COALESCE(%s, 'n/a'))",
+            rows, chunk_size=10
+        )
+        assert result == {"data": 25, "error": None}, result
+
+        result = await DatabaseHelper.execute_main_query("SELECT COUNT(*) AS n FROM countries WHERE subregion = 'n/a'")
+        assert result["data"] == [{"n": 25}], result
+
+        # Non-INSERT statements fall back to executemany
+        result = await DatabaseHelper.execute_main_many(
+            "UPDATE countries SET subregion = %s WHERE id = %s", [("Europe", 1), ("Europe", 2)]
+        )
+        assert result == {"data": 2, "error": None}, result
+
+        # A failing row rolls the whole batch back
+        result = await DatabaseHelper.execute_main_many(
+            "INSERT INTO countries (id, iso3, name_un, subregion) VALUES (%s, %s, %s, %s)",
+            [(100, "NEW", "New", None), (1, "DUP", "Duplicate id", None)]
+        )
+        assert result["error"], result
+        result = await DatabaseHelper.execute_main_query("SELECT id FROM countries WHERE id = %s", (100,))
+        assert result["data"] == [], result
+
+    asyncio.run(run())
+
+
+def test_session_reuses_connection():
+    engine = use_sqlite_engines()
+
+    async def run():
+        await seed_countries()
+        checkouts = []
+
+        def on_checkout(*args):
+            checkouts.append(1)
+
+        event.listen(engine, "checkout", on_checkout)
+        session = DatabaseSession("main")
+        try:
+            results = await asyncio.gather(*[
+                session.execute("SELECT iso3 FROM countries WHERE id = %s", (country_id,)) for country_id in (1, 2, 3)
+            ])
+            assert [r["data"] for r in results] == [[{"iso3": "GRC"}], [{"iso3": "BGR"}], [{"iso3": "TUR"}]], results
+            # A failing statement keeps the contract and leaves the connection usable
+            result = await session.execute("SELECT * FROM missing_table")
+            assert result["data"] == [] and result["error"], result
+            result = await session.execute("SELECT COUNT(*) AS n FROM countries", result_format="columns")
+            assert result == {"data": {"n": [3]}, "error": None}, result
+        finally:
+            await session.close()
+            event.remove(engine, "checkout", on_checkout)
+        assert len(checkouts) == 1, checkouts
+
+    asyncio.run(run())
+
+
+def test_replica_routing_with_read_your_writes():
+    primary = use_sqlite_engines()
+    replica = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with replica.begin() as connection:
+        connection.exec_driver_sql("CREATE TABLE countries (id INTEGER PRIMARY KEY, iso3 TEXT, name_un TEXT, subregion TEXT)")
+    database.DATABASE_URLS["main_replica"] = "sqlite://"
+    database.ENGINES["main_replica"] = replica
+
+    async def run():
+        await seed_countries()
+        # Anonymous reads go to the (empty) replica
+        result = await DatabaseHelper.execute_main_query("SELECT COUNT(*) AS n FROM countries")
+        assert result["data"] == [{"n": 0}], result
+
+        async def as_user(user_id, fn):
+            database.set_request_user(user_id)
+            return await fn()
+
+        # A user who just wrote reads from the primary; other users still use the replica
+        await as_user(7, lambda: DatabaseHelper.execute_main_query(
+            "UPDATE countries SET subregion = %s WHERE id = %s", ("Europe", 1)
+        ))
+        writer = await as_user(7, lambda: DatabaseHelper.execute_main_query("SELECT COUNT(*) AS n FROM countries"))
+        other = await as_user(8, lambda: DatabaseHelper.execute_main_query("SELECT COUNT(*) AS n FROM countries"))
+        assert writer["data"] == [{"n": 3}] and other["data"] == [{"n": 0}], (writer, other)
+        assert database.get_read_engine("main") is replica
+
+    try:
+        asyncio.run(run())
+    finally:
+        del database.ENGINES["main_replica"]
+        del database.DATABASE_URLS["main_replica"]
+        database._recent_writes.clear()
+
+
+def test_coalesced_queries_share_one_execution():
+    engine = use_sqlite_engines()
+
+    async def run():
+        await seed_countries()
+        executions = []
+
+        def on_execute(conn, cursor, statement, *args):
+            if "FROM countries" in statement:
+                executions.append(statement)
+
+        event.listen(engine, "before_cursor_execute", on_execute)
+        before = database.get_coalescing_stats()
+        try:
+            results = await asyncio.gather(*[
+                DatabaseHelper.execute_main_query("SELECT iso3 FROM countries ORDER BY id", coalesce=True)
+                for _ in range(10)
+            ])
+        finally:
+            event.remove(engine, "before_cursor_execute", on_execute)
+        assert all(r == {"data": [{"iso3": "GRC"}, {"iso3": "BGR"}, {"iso3": "TUR"}], "error": None} for r in results)
+        assert len(executions) == 1, executions
+        after = database.get_coalescing_stats()
+        assert after["coalesced"] - before["coalesced"] == 9 and after["in_flight"] == 0, after
+        # Every caller gets its own rows
+        results[0]["data"][0]["iso3"] = "XXX"
+        assert results[1]["data"][0]["iso3"] == "GRC"
+
+    asyncio.run(run())
+
+
+def test_executor_slot_held_until_worker_finishes():
+    async def run():
+        executor = DatabaseExecutor("slots", max_workers=1, max_queue=0, queue_timeout=0.05)
+        release = threading.Event()
+        task = asyncio.ensure_future(executor.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # The caller gave up, but the worker is still busy - no second call may start
+        try:
+            await executor.run(lambda: None)
+            raise AssertionError("expected ExecutorSaturated")
+        except ExecutorSaturated:
+            pass
+        release.set()
+        await asyncio.sleep(0.05)
+        assert await executor.run(lambda: "ran") == "ran"
+        assert executor.stats()["queue_depth"] == 0
+        executor.shutdown()
+
+    asyncio.run(run())
+
+
+def test_transaction_commits_once_or_not_at_all():
+    use_sqlite_engines()
+    query_cache.clear()
+
+    async def run():
+        await seed_countries()
+        query = "SELECT COUNT(*) AS n FROM countries"
+        assert (await DatabaseHelper.execute_main_query(query, cache_ttl=60))["data"] == [{"n": 3}]
+
+        async with DatabaseHelper.transaction("main") as tx:
+            await tx.execute("INSERT INTO countries (id, iso3, name_un, subregion) VALUES (%s, %s, %s, %s)",
+                             (4, "CYP", "Cyprus", None))
+            assert await tx.execute_many("UPDATE countries SET subregion = %s WHERE id = %s",
+                                         [("Europe", 1), ("Europe", 4)]) == 2
+            # Statements inside the transaction see its uncommitted writes
+            assert (await tx.execute(query))["data"] == [{"n": 4}]
+        # Committed, and the cached count was invalidated
+        assert (await DatabaseHelper.execute_main_query(query, cache_ttl=60))["data"] == [{"n": 4}]
+
+        try:
+            async with DatabaseHelper.transaction("main") as tx:
+                await tx.execute("DELETE FROM countries WHERE id = %s", (4,))
+                await tx.execute("UPDATE no_such_table SET x = 1")
+            raise AssertionError("expected the failing statement to raise")
+        except AssertionError:
+            raise
+        except Exception:
+            pass
+        # The DELETE was rolled back with the failing UPDATE
+        assert (await DatabaseHelper.execute_main_query(query))["data"] == [{"n": 4}]
+
+        # Catching the failure inside the block does not let the earlier DELETE commit
+        try:
+            async with DatabaseHelper.transaction("main") as tx:
+                await tx.execute("DELETE FROM countries WHERE id = %s", (4,))
+                try:
+                    await tx.execute("UPDATE no_such_table SET x = 1")
+                except Exception:
+                    pass
+                assert tx.failed
+            raise AssertionError("expected commit to refuse a failed transaction")
+        except RuntimeError:
+            pass
+        assert (await DatabaseHelper.execute_main_query(query))["data"] == [{"n": 4}]
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_translate_placeholders()
+    test_statement_cache_hits()
+    test_helpers_share_placeholder_convention()
+    test_columnar_and_streaming_results()
+    test_multirow_statement_expansion()
+    test_execute_many()
+    test_session_reuses_connection()
+    test_replica_routing_with_read_your_writes()
+    test_coalesced_queries_share_one_execution()
+    test_executor_slot_held_until_worker_finishes()
+    test_transaction_commits_once_or_not_at_all()
+    print("✅ DatabaseHelper checks passed")
@@ -0,0 +1,42 @@
+"""
+Test script for the streamed FAST report body in routers/fast_report.py
+"""
+
+import asyncio
+import json
+
+import conftest  # Dummy settings, so the script also runs without pytest
+from routers.fast_report import stream_json_array
+
+
+async def _chunks(*chunks, fail=False):
+    for chunk in chunks:
+        yield chunk
+    if fail:
+        raise RuntimeError("Lost connection to MySQL server during query")
+
+
+def test_stream_json_array():
+    async def body(first_chunk, chunks):
+        return b"".join([part async for part in stream_json_array(first_chunk, chunks)])
+
+    async def run():
+        complete = await body([{"Year": 2024}], _chunks([], [{"Year": 2023}, {"Year": 2022}]))
+        assert json.loads(complete) == [{"Year": 2024}, {"Year": 2023}, {"Year": 2022}], complete
+        assert json.loads(await body([], _chunks())) == []
+
+        # A failure after the response started must not look like a complete (shorter) list
+        truncated = await body([{"Year": 2024}], _chunks([{"Year": 2023}], fail=True))
+        assert truncated == b'[{"Year": 2024},{"Year": 2023}', truncated
+        try:
+            json.loads(truncated)
+            raise AssertionError("a failed stream must not be valid JSON")
+        except json.JSONDecodeError:
+            pass
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_stream_json_array()
+    print("✅ FAST report stream checks passed")
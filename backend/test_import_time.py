@@ -0,0 +1,58 @@
+"""
+Import-time budget check for the API
+Imports `main` in a fresh interpreter (like a uvicorn worker restart) and fails if it is slow,
+prints anything, builds database engines, or pulls in upload/dashboard-only dependencies.
+Override the budget with NEXUS_IMPORT_BUDGET_SECONDS on slow machines.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from conftest import DUMMY_SETTINGS
+
+IMPORT_BUDGET_SECONDS = float(os.environ.get("NEXUS_IMPORT_BUDGET_SECONDS", "3.0"))
+DEFERRED_MODULES = ("openpyxl", "httpx")
+
+PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+import database
+sys.__stdout__.write(json.dumps({{
+    "elapsed": elapsed,
+    "engines": sorted(database.ENGINES),
+    "deferred_loaded": [name for name in {DEFERRED_MODULES!r} if name in sys.modules],
+}}))
+"""
+
+
+def measure_import():
+    env = dict(os.environ)
+    # Dummy settings so config.Settings() loads without a .env file
+    for key in DUMMY_SETTINGS:
+        env.setdefault(key, "test")
+    completed = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True, timeout=60
+    )
+    assert completed.returncode == 0, completed.stderr
+    return json.loads(completed.stdout)
+
+
+def test_import_budget():
+    result = measure_import()
+    assert result["engines"] == [], f"engines built at import time: {result['engines']}"
+    assert result["deferred_loaded"] == [], f"imported eagerly: {result['deferred_loaded']}"
+    assert result["elapsed"] < IMPORT_BUDGET_SECONDS, (
+        f"import main took {result['elapsed']:.2f}s (budget {IMPORT_BUDGET_SECONDS:.2f}s)"
+    )
+
+
+if __name__ == "__main__":
+    result = measure_import()
+    print(f"import main: {result['elapsed']:.3f}s (budget {IMPORT_BUDGET_SECONDS:.2f}s)")
+    test_import_budget()
+    print("✅ Import budget check passed")
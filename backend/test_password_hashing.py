@@ -0,0 +1,33 @@
+"""
+Test script for the login throttle and bcrypt thread pool in password_hashing.py
+"""
+
+import asyncio
+
+import conftest  # Dummy settings, so the script also runs without pytest
+import auth
+from password_hashing import LoginThrottle, get_password_stats
+
+
+def test_login_throttle_and_hash_pool():
+    throttle = LoginThrottle(per_minute=60, burst=2)
+    assert throttle.acquire("10.0.0.1") is None and throttle.acquire("10.0.0.1") is None
+    retry_after = throttle.acquire("10.0.0.1")
+    assert retry_after is not None and 0 < retry_after <= 1.0, retry_after
+    assert throttle.acquire("10.0.0.2") is None  # buckets are per client
+    assert throttle.stats()["throttled"] == 1
+
+    async def run():
+        hashed = await auth.get_password_hash_async("s3cret")
+        assert await auth.verify_password_async("s3cret", hashed)
+        assert not await auth.verify_password_async("wrong", hashed)
+
+    asyncio.run(run())
+    stats = get_password_stats()
+    assert stats["timings"]["verify"]["count"] >= 2 and stats["timings"]["hash"]["count"] >= 1, stats
+    assert stats["executor"]["completed"] >= 3, stats
+
+
+if __name__ == "__main__":
+    test_login_throttle_and_hash_pool()
+    print("✅ Password hashing checks passed")
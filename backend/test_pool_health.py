@@ -0,0 +1,36 @@
+"""
+Test script for the idle-connection health check in pool_health.py
+"""
+
+import os
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+import conftest  # Dummy settings, so the script also runs without pytest
+from pool_health import watch_pool, check_idle_connections, get_pool_stats
+
+
+def test_pool_health_check_evicts_dead_connections():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'pool.db')}", poolclass=QueuePool, pool_size=3)
+        watch_pool(engine, "health-test")
+        connections = [engine.connect() for _ in range(3)]
+        for connection in connections:
+            connection.close()
+        # Simulate the server dropping one idle connection
+        next(iter(engine.pool._pool.queue)).dbapi_connection.close()
+
+        assert check_idle_connections(engine, "health-test") == 1
+        stats = get_pool_stats({"health-test": engine})["health-test"]
+        assert stats["invalidations"] == 1 and stats["dead_connections"] == 1, stats
+        assert stats["connections_checked"] == 3 and stats["checkedout"] == 0, stats
+        # The next check finds nothing left to evict
+        assert check_idle_connections(engine, "health-test") == 0
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    test_pool_health_check_evicts_dead_connections()
+    print("✅ Pool health checks passed")
@@ -0,0 +1,67 @@
+"""
+Test script for the SELECT result cache in query_cache.py and its invalidation by DatabaseHelper writes
+"""
+
+import asyncio
+
+from sqlalchemy import event
+
+from conftest import use_sqlite_engines, seed_countries
+from database import DatabaseHelper
+from query_cache import query_cache, referenced_tables
+
+
+def test_referenced_tables():
+    assert referenced_tables("SELECT * FROM PCP.PCP_DB") == {"pcp_db"}
+    assert referenced_tables(
+        "SELECT e.x FROM thrace.epiunits_view AS e INNER JOIN `factivities` f ON e.id = f.id "
+        "WHERE f.id IN (SELECT id FROM users) AND e.name = 'from nowhere'"
+    ) == {"epiunits_view", "factivities", "users"}
+    assert referenced_tables("DELETE FROM thrace.factivities_tmp WHERE userID = %s") == {"factivities_tmp"}
+    assert "stock_entry" in referenced_tables("UPDATE stock_entry SET quantity = %s WHERE id = %s")
+
+
+def test_result_cache_invalidated_by_writes():
+    engine = use_sqlite_engines()
+    query_cache.clear()
+
+    async def run():
+        await seed_countries()
+        executions = []
+
+        def on_execute(conn, cursor, statement, *args):
+            if statement.startswith("SELECT"):
+                executions.append(statement)
+
+        event.listen(engine, "before_cursor_execute", on_execute)
+        try:
+            query = "SELECT iso3 FROM countries ORDER BY id"
+            first = await DatabaseHelper.execute_main_query(query, cache_ttl=60)
+            second = await DatabaseHelper.execute_main_query(query, cache_ttl=60)
+            assert first == second and len(executions) == 1, executions
+            # Callers get copies - mutating one result does not touch the cache
+            second["data"].clear()
+            assert (await DatabaseHelper.execute_main_query(query, cache_ttl=60)) == first
+
+            await DatabaseHelper.execute_main_query("UPDATE countries SET iso3 = %s WHERE id = %s", ("HEL", 1))
+            updated = await DatabaseHelper.execute_main_query(query, cache_ttl=60)
+            assert updated["data"][0] == {"iso3": "HEL"} and len(executions) == 2, updated
+
+            # Bulk writes invalidate too, and entries expire after their TTL
+            await DatabaseHelper.execute_main_many(
+                "INSERT INTO countries (id, iso3, name_un, subregion) VALUES (%s, %s, %s, %s)", [(9, "CYP", "Cyprus", None)]
+            )
+            assert len((await DatabaseHelper.execute_main_query(query, cache_ttl=0.01))["data"]) == 4
+            await asyncio.sleep(0.02)
+            await DatabaseHelper.execute_main_query(query, cache_ttl=0.01)
+            assert len(executions) == 4, executions
+        finally:
+            event.remove(engine, "before_cursor_execute", on_execute)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_referenced_tables()
+    test_result_cache_invalidated_by_writes()
+    print("✅ Result cache checks passed")
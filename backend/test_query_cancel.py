@@ -0,0 +1,90 @@
+"""
+Test script for query deadlines and cancellation in query_cancel.py
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+from conftest import use_sqlite_engines
+from database import DatabaseHelper, DatabaseSession
+from query_metrics import get_query_stats, reset_query_stats
+import query_cancel
+from query_cancel import QueryCancelScope, QueryCancelled, QueryTimeout
+
+
+def test_deadline_cancels_work():
+    use_sqlite_engines()
+    reset_query_stats()
+
+    async def run():
+        scope = QueryCancelScope("thrace", timeout=0.05)
+        try:
+            await DatabaseHelper.run_sync("thrace", lambda: time.sleep(0.3), scope=scope)
+            raise AssertionError("expected QueryTimeout")
+        except QueryTimeout:
+            pass
+        # Work still running under the scope stops at its next statement
+        await asyncio.sleep(0.05)
+        try:
+            scope.check()
+            raise AssertionError("expected QueryTimeout")
+        except QueryTimeout:
+            pass
+
+        # A session statement past its deadline is not handed back to the session until it unwinds
+        session = DatabaseSession("thrace")
+        try:
+            await session.run(lambda connection: time.sleep(0.2), timeout=0.05)
+            raise AssertionError("expected QueryTimeout")
+        except QueryTimeout:
+            pass
+        assert session._idle == [] and len(session._unwinding) == 1
+        await session.close()
+        assert session._unwinding == [] and session._connections == []
+
+        # execute() hands a timeout to the endpoint instead of folding it into {"error": ...}
+        session = DatabaseSession("thrace")
+        try:
+            await session.execute("SELECT 1", timeout=1e-9)
+            raise AssertionError("expected QueryTimeout")
+        except QueryTimeout:
+            pass
+        finally:
+            await session.close()
+
+    asyncio.run(run())
+    cancellations = get_query_stats()["cancellations"]
+    assert {(c["database"], c["reason"]) for c in cancellations} == {("thrace", "timeout")}, cancellations
+    assert sum(c["count"] for c in cancellations) == 3, cancellations
+
+
+def test_kill_only_hits_tracked_statements():
+    killed = []
+    original = query_cancel._mysql_thread_id, query_cancel._kill_query
+    query_cancel._mysql_thread_id = lambda connection: connection.thread_id
+    query_cancel._kill_query = lambda url, thread_id: killed.append(thread_id)
+    try:
+        scope = QueryCancelScope("thrace")
+        finished = SimpleNamespace(thread_id=1, engine=SimpleNamespace(url="mysql://"))
+        running = SimpleNamespace(thread_id=2, engine=SimpleNamespace(url="mysql://"))
+        with scope.track(finished):
+            pass
+        with scope.track(running):
+            assert scope.kill("disconnect") == 1
+            assert scope.kill("disconnect") == 0
+        # A finished statement's connection may already serve another request - never KILL it
+        assert killed == [2], killed
+        try:
+            with scope.track(finished):
+                raise AssertionError("a cancelled scope must not start new statements")
+        except QueryCancelled:
+            pass
+    finally:
+        query_cancel._mysql_thread_id, query_cancel._kill_query = original
+
+
+if __name__ == "__main__":
+    test_deadline_cancels_work()
+    test_kill_only_hits_tracked_statements()
+    print("✅ Query cancellation checks passed")
@@ -0,0 +1,41 @@
+"""
+Test script for the statement fingerprints and latency histograms in query_metrics.py
+"""
+
+import asyncio
+
+from conftest import use_sqlite_engines, seed_countries
+from database import DatabaseHelper
+from query_metrics import fingerprint, instrument_engine, get_query_stats, reset_query_stats
+
+
+def test_query_fingerprint():
+    assert fingerprint("SELECT * FROM t WHERE a = 5 AND b = 'x'") == "SELECT * FROM t WHERE a = ? AND b = ?"
+    assert fingerprint("SELECT * FROM t WHERE id IN (%s, %s,\n %s)") == "SELECT * FROM t WHERE id IN (...)"
+    assert fingerprint("INSERT INTO t VALUES (:p0, :p1), (:p2, :p3)") == "INSERT INTO t VALUES (...)"
+    # Identifiers containing digits are left alone
+    assert fingerprint("SELECT col1 FROM `table2`") == "SELECT col1 FROM `table2`"
+
+
+def test_query_metrics_recorded():
+    instrument_engine(use_sqlite_engines(), "main")
+    reset_query_stats()
+
+    async def run():
+        await seed_countries()
+        for country_id in (1, 2, 3):
+            await DatabaseHelper.execute_main_query("SELECT iso3 FROM countries WHERE id = %s", (country_id,))
+        await DatabaseHelper.execute_main_query("SELECT * FROM missing_table")
+
+    asyncio.run(run())
+    statements = {entry["fingerprint"]: entry for entry in get_query_stats(limit=100)["statements"]}
+    select = statements["SELECT iso3 FROM countries WHERE id = ?"]
+    assert select["calls"] == 3 and select["execution"]["count"] == 3, select
+    assert select["wait"]["count"] == 3
+    assert statements["SELECT * FROM missing_table"]["errors"] == 1
+
+
+if __name__ == "__main__":
+    test_query_fingerprint()
+    test_query_metrics_recorded()
+    print("✅ Query metrics checks passed")
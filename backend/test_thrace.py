@@ -0,0 +1,60 @@
+"""
+Test script for the THRACE upload approval in routers/thrace.py
+"""
+
+import asyncio
+
+from conftest import use_thrace_staging_tables, thrace_workbook, upload_file
+from database import DatabaseHelper
+from routers import thrace
+
+
+def test_approval_flags_duplicate_rows():
+    with use_thrace_staging_tables() as engine:
+        with engine.begin() as connection:
+            # Imported earlier - 0 and NULL counts are the same record
+            connection.exec_driver_sql(
+                "INSERT INTO thrace.factivities (epiunitID, inspectorID, dt_insp, cattleexam, cattlecliposFMD, sheep, userID) "
+                "VALUES (5, 3, '2024-03-09', 4, 1, 0, 7)"
+            )
+        contents = thrace_workbook([
+            {"Name": "Imported", "Cattle clin pos FMD": 1},
+            {"Name": "New", "Cattle clin pos FMD": 2},
+            {"Name": "New again", "Cattle clin pos FMD": 2},
+            {"Name": "Other day", "Day": 10, "Cattle clin pos FMD": 1},
+            {"Name": "Invalid", "Cattle clin pos FMD": 9},
+        ])
+
+        async def run():
+            user = {"user_id": 7}
+            result = await thrace.upload_thrace_data(upload_file(contents), user)
+            assert result["clean_rows"] == 4 and result["error_rows"] == 1, result
+
+            first = await thrace.approve_staging_data(user)
+            assert first["has_errors"] and first["error_count"] == 3, first
+            assert [(row["village"], row["error"]) for row in first["error_rows"]] == [
+                ("Imported", thrace.DUPLICATE_OF_EXISTING),
+                ("New again", thrace.DUPLICATE_IN_UPLOAD),
+                ("Invalid", "Cattle clin. FMD (9) > exams (4); "),
+            ], first["error_rows"]
+            # Approving again reports the same rows, without stacking the messages
+            again = await thrace.approve_staging_data(user)
+            assert again["error_rows"] == first["error_rows"]
+            imported = await DatabaseHelper.execute_thrace_query("SELECT COUNT(*) AS n FROM thrace.factivities")
+            assert imported["data"][0]["n"] == 1
+
+            # Once the error rows are gone, the clean rows move in the same transaction as the checks
+            await DatabaseHelper.execute_thrace_query(
+                "DELETE FROM thrace.factivities_tmp WHERE userID = %s AND errore IS NOT NULL", (7,)
+            )
+            approved = await thrace.approve_staging_data(user)
+            assert approved["success"] and approved["inserted_count"] == 2, approved
+            imported = await DatabaseHelper.execute_thrace_query("SELECT COUNT(*) AS n FROM thrace.factivities")
+            assert imported["data"][0]["n"] == 3
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_approval_flags_duplicate_rows()
+    print("✅ THRACE approval checks passed")
@@ -0,0 +1,61 @@
+"""
+Test script for the THRACE upload rule table in routers/thrace_validation.py
+"""
+
+import conftest  # Dummy settings, so the script also runs without pytest
+
+from routers.thrace_validation import COUNT_FIELDS, RowValidator
+
+FIELDS = ("inspectorID", "villagename", "epiunitcountrycode", "year", "month", "day") + COUNT_FIELDS
+COLUMN_MAP = {field: index for index, field in enumerate(FIELDS) if field != "villagename"}
+
+
+def make_row(**values):
+    defaults = {"inspectorID": 3, "villagename": "Village", "epiunitcountrycode": "gr001",
+                "year": 2024, "month": 3, "day": 9}
+    defaults.update(values)
+    return tuple(defaults.get(field) for field in FIELDS)
+
+
+def test_rules_report_in_table_order():
+    validator = RowValidator(COLUMN_MAP, {"GR001": 5}, user_id=7)
+    results = validator.validate_block([
+        (2, make_row(cattleexam=4, cattlecliposFMD=2)),
+        (3, make_row(sheepsample=1, sheepseroposPPR=3, cattleexam=2, cattlecliposLSD="5", wildserosposFMD=1)),
+        (4, make_row(epiunitcountrycode="XX9", day=None, pigssample=float("inf"))),
+        (5, make_row(inspectorID=None, goatsexam=-2, goatsposSGP=1)),
+    ])
+    assert [result.number for result in results] == [2, 3, 4, 5]
+
+    clean = results[0]
+    assert clean.error is None
+    assert clean.params[:3] == (5, 3, "2024-03-09") and clean.params[-3:] == (7, "GR001", "Village")
+    assert clean.params[3 + COUNT_FIELDS.index("cattleexam")] == 4
+    assert clean.params[3 + COUNT_FIELDS.index("cattle")] is None
+
+    assert results[1].error == (
+        "Cattle clin. LSD (5) > exams (2); Sheep sero. PPR (3) > samples (1); Wild sero. FMD (1) > samples (0); "
+    ), results[1].error
+    assert results[1].params[3 + len(COUNT_FIELDS)] == results[1].error
+
+    # A cell that cannot be converted leaves the row out, with the conversion error
+    assert results[2].params is None
+    assert results[2].error == "Error parsing - cannot convert float infinity to integer"
+
+    assert results[3].error == "Missing InspectorID; Goat clin. SGP (1) > exams (0); ", results[3].error
+
+
+def test_required_fields():
+    validator = RowValidator(COLUMN_MAP, {"GR001": 5}, user_id=7)
+    [result] = validator.validate_block([(2, make_row(epiunitcountrycode="XX9", villagename=None, month="x"))])
+    assert result.error == (
+        "Invalid Village/Epiunit code (XX9) - not found in epiunits table; Missing or invalid Village/Epiunit code; "
+        "Missing Name/villagename; The format of the date is not correct; "
+    ), result.error
+    assert not validator.is_data_row(make_row(year="  "))
+
+
+if __name__ == "__main__":
+    test_rules_report_in_table_order()
+    test_required_fields()
+    print("✅ Validation rule checks passed")
@@ -0,0 +1,60 @@
+"""
+Test script for the streaming THRACE upload reader in routers/thrace_workbook.py
+"""
+
+import asyncio
+from io import BytesIO
+
+import conftest  # Dummy settings, so the script also runs without pytest
+
+import openpyxl
+from fastapi import UploadFile
+
+from routers.thrace_workbook import UploadWorkbook, spool_upload
+
+
+def build_workbook(data_rows: int) -> bytes:
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["InspectorID", "Name", "Village/Epiunit code", "Year", "Month", "Day", "Cattle", "Unknown column"])
+    for n in range(data_rows):
+        sheet.append([n + 1, f"Village {n}", "GR001", 2024, 3, 15, 10])
+    # A gap, then a short row: reads back as an all-None row, then a row padded to the header width
+    sheet.cell(row=data_rows + 3, column=1, value=99)
+    buffer = BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def read_upload(contents: bytes, max_rows=400):
+    async def _read():
+        upload = UploadFile(file=BytesIO(contents), filename="thrace.xlsx")
+        spool = await spool_upload(upload)
+        try:
+            with UploadWorkbook(spool) as workbook:
+                return workbook.column_map, list(workbook.rows(max_rows))
+        finally:
+            spool.close()
+    return asyncio.run(_read())
+
+
+def test_rows_stream_as_padded_value_tuples():
+    column_map, rows = read_upload(build_workbook(3))
+    assert column_map == {"inspectorID": 0, "epiunitcountrycode": 2, "year": 3, "month": 4, "day": 5, "cattle": 6}, column_map
+    assert [row.number for row in rows] == [2, 3, 4, 5, 6]
+    assert rows[0].values == (1, "Village 0", "GR001", 2024, 3, 15, 10, None), rows[0]
+    assert rows[3].values == (None,) * 8
+    assert rows[4].values == (99,) + (None,) * 7
+
+
+def test_row_cap():
+    _, rows = read_upload(build_workbook(50), max_rows=20)
+    assert len(rows) == 20 and rows[-1].number == 21
+    _, rows = read_upload(build_workbook(50), max_rows=None)
+    assert rows[-1].number == 53
+
+
+if __name__ == "__main__":
+    test_rows_stream_as_padded_value_tuples()
+    test_row_cap()
+    print("✅ Workbook reader checks passed")
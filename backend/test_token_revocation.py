@@ -0,0 +1,71 @@
+"""
+Test script for stateless token checks against the revocation snapshot in token_revocation.py
+"""
+
+import math
+
+from jose import JWTError, jwt
+
+import conftest  # Dummy settings, so the script also runs without pytest
+import auth
+from config import settings
+from token_revocation import revocations
+
+
+def test_stateless_tokens_honour_revocations():
+    token = auth.create_access_token({"user_id": 7, "user_role": "user", "country": "Greece",
+                                      "name": "Ana", "email": "ana@example.org"})
+    claims = jwt.decode(token, settings.super_secret, algorithms=[settings.algorithm])
+    settings.auth_stateless_tokens = True
+    try:
+        revocations.loaded_at = None
+        assert auth.user_from_claims(claims) is None  # no snapshot yet - look the user up
+
+        revocations.replace([{"id": 7, "role": "user", "country": "Greece", "logout_at": claims["iat"] - 60}])
+        user = auth.user_from_claims(claims)
+        assert user["user_id"] == 7 and user["email"] == "ana@example.org" and user["role"] == "user", user
+        # Tokens from before stateless mode carry no name/email and are looked up as before
+        assert auth.user_from_claims({"user_id": 7, "user_role": "user", "country": "Greece"}) is None
+
+        for rows in ([{"id": 7, "role": "admin", "country": "Greece", "logout_at": None}], []):
+            revocations.replace(rows)
+            try:
+                auth.user_from_claims(claims)
+                raise AssertionError("expected the token to be rejected")
+            except JWTError:
+                pass
+
+        def assert_revoked():
+            try:
+                auth.user_from_claims(claims)
+                raise AssertionError("expected the token to be revoked by logout")
+            except JWTError:
+                pass
+
+        # iat and logouts keep sub-second precision: a token from just before a logout is revoked,
+        # one from just after it (logging straight back in) stays valid
+        assert isinstance(claims["iat"], float)
+        claims["iat"] = math.floor(claims["iat"]) + 0.5  # mid-second, so +-0.001 stays in the same second
+        user_row = {"id": 7, "role": "user", "country": "Greece", "logout_at": None}
+        revocations.replace([user_row])
+        revocations.record_logout(7, logged_out_at=claims["iat"] + 0.001)
+        assert_revoked()
+        revocations.record_logout(7, logged_out_at=claims["iat"] - 0.001)
+        assert auth.user_from_claims(claims)["user_id"] == 7
+
+        # The whole-second last_logout of the next refresh keeps the exact time recorded here...
+        logout_second = math.floor(claims["iat"] - 0.001)
+        revocations.replace([{**user_row, "logout_at": logout_second}])
+        assert auth.user_from_claims(claims)["user_id"] == 7
+        # ...but without it, tokens from anywhere in the logout's second are revoked
+        revocations.replace([user_row])
+        revocations.replace([{**user_row, "logout_at": logout_second}])
+        assert_revoked()
+    finally:
+        settings.auth_stateless_tokens = False
+        revocations.loaded_at = None
+
+
+if __name__ == "__main__":
+    test_stateless_tokens_honour_revocations()
+    print("✅ Token revocation checks passed")
@@ -0,0 +1,97 @@
+"""
+Test script for background THRACE upload jobs in upload_jobs.py
+"""
+
+import asyncio
+import json
+import threading
+
+from fastapi import HTTPException
+
+from conftest import use_thrace_staging_tables, thrace_workbook, upload_file
+from database import DatabaseHelper
+from routers import thrace
+from upload_jobs import upload_jobs
+
+
+def test_upload_job_stages_rows_without_row_cap():
+    with use_thrace_staging_tables() as engine:
+        with engine.begin() as connection:
+            connection.exec_driver_sql("INSERT INTO thrace.factivities_tmp (userID, villagename) VALUES (7, 'previous')")
+        contents = thrace_workbook(
+            {"Name": f"Village {n}", "Cattle clin pos FMD": n % 6} for n in range(450)
+        )
+
+        async def staged_rows():
+            result = await DatabaseHelper.execute_thrace_query(
+                "SELECT COUNT(*) AS n, SUM(errore IS NOT NULL) AS errors FROM factivities_tmp WHERE userID = %s", (7,)
+            )
+            return result["data"][0]
+
+        async def run():
+            user = {"user_id": 7}
+            # The request path stops at 400 data rows
+            result = await thrace.upload_thrace_data(upload_file(contents), user)
+            assert result["total_rows"] == 400 and result["inserted_count"] == 400, result
+
+            accepted = await thrace.create_upload_job(upload_file(contents), user)
+            try:
+                await thrace.create_upload_job(upload_file(contents), user)
+                raise AssertionError("expected a second concurrent upload to be refused")
+            except HTTPException as e:
+                assert e.status_code == 409
+            job = upload_jobs.get(accepted["job_id"], 7)
+            assert upload_jobs.get(accepted["job_id"], 8) is None  # other users cannot see it
+
+            progress = []
+            while not job.finished:
+                await job.wait_for_change(job.version, timeout=10)
+                progress.append(job.rows_inserted)
+            status = (await thrace.get_upload_job(job.id, user))
+            assert status["status"] == "done", status
+            assert status["rows_parsed"] == status["rows_validated"] == status["rows_inserted"] == 450, status
+            assert status["result"]["error_rows"] == 75
+            assert status["result"]["errors"][0] == "Row 7: Cattle clin. FMD (5) > exams (4); "
+            assert sorted(progress) == progress and len(set(progress)) > 2, progress  # reported block by block
+            assert await staged_rows() == {"n": 450, "errors": 75}
+
+            # Jobs and interactive uploads read workbooks on separate pools
+            thread_name = lambda: threading.current_thread().name
+            assert (await upload_jobs.run_blocking(job, thread_name)).startswith("db-upload-jobs")
+            assert (await upload_jobs.run_blocking(None, thread_name)).startswith("db-upload-requests")
+            assert upload_jobs.stats()["request_executor"]["completed"] > 0
+            await upload_jobs.shutdown()
+
+        asyncio.run(run())
+
+
+def test_job_stream_ends_with_the_finished_state():
+    async def run():
+        user = {"user_id": 9}
+        gate = asyncio.Event()
+
+        async def work(job):
+            await gate.wait()
+            return {"inserted_count": 3}
+
+        job = upload_jobs.submit("thrace", 9, "thrace.xlsx", work)
+        events = (await thrace.stream_upload_job(job.id, user)).body_iterator
+        first = json.loads((await events.__anext__())[len("data: "):])
+        assert first["status"] == "queued", first
+
+        # The job starts and finishes while the stream is suspended after its first event
+        gate.set()
+        while not job.finished:
+            await asyncio.sleep(0.01)
+        rest = [event async for event in events if event.startswith("data: ")]
+        last = json.loads(rest[-1][len("data: "):])
+        assert last["status"] == "done" and last["result"] == {"inserted_count": 3}, rest
+        await upload_jobs.shutdown()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_upload_job_stages_rows_without_row_cap()
+    test_job_stream_ends_with_the_finished_state()
+    print("✅ Upload job checks passed")
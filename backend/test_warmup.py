@@ -0,0 +1,64 @@
+"""
+Test script for the startup warm-up and readiness state in warmup.py
+"""
+
+import asyncio
+
+from conftest import use_sqlite_engines
+import warmup
+from config import settings
+from database import DatabaseHelper
+from query_cache import query_cache
+from routers import thrace
+from routers.training_credits import get_country_codes
+
+
+def test_warm_up_gates_readiness():
+    use_sqlite_engines()
+    query_cache.clear()
+    warmup.state = warmup.WarmupState()
+    retry_interval, settings.warmup_retry_interval = settings.warmup_retry_interval, 3600
+    # Start from an unloaded epiunits cache, whatever earlier tests left behind
+    saved_cache, saved_loaded = dict(thrace._epiunits_cache), thrace._cache_loaded
+    thrace._epiunits_cache.clear()
+    thrace._cache_loaded = False
+
+    async def run():
+        await DatabaseHelper.execute_main_query("DROP TABLE IF EXISTS countries")
+        await DatabaseHelper.execute_main_query(
+            "CREATE TABLE countries (id INTEGER PRIMARY KEY, iso3 TEXT, name_un TEXT, subregion TEXT, "
+            "eufmd_nc INTEGER, code_moodle TEXT)"
+        )
+        await DatabaseHelper.execute_main_query(
+            "INSERT INTO countries VALUES (%s, %s, %s, %s, %s, %s)", (1, "GRC", "Greece", "Southern Europe", 1, "GR")
+        )
+        # A duplicated name keeps its first code
+        await DatabaseHelper.execute_main_query(
+            "INSERT INTO countries VALUES (%s, %s, %s, %s, %s, %s)", (2, "GRC", "Greece", "Southern Europe", 1, "GX")
+        )
+        assert not warmup.state.ready
+        try:
+            await warmup.warm_up()
+            state = warmup.state.to_dict()
+            assert state["ready"] and state["steps"]["pool:main"]["ok"], state
+            assert state["steps"]["country_lists"]["ok"] and state["steps"]["country_codes"]["ok"], state
+            # SQLite has no thrace schema - the step is reported and retried, readiness is not held back
+            assert not state["steps"]["thrace_epiunits"]["ok"], state
+        finally:
+            await warmup.stop_warm_up()
+        hits = query_cache.stats()["hits"]
+        assert await get_country_codes() == {"Greece": "GR"}
+        assert query_cache.stats()["hits"] == hits + 1
+
+    try:
+        asyncio.run(run())
+    finally:
+        settings.warmup_retry_interval = retry_interval
+        thrace._epiunits_cache.clear()
+        thrace._epiunits_cache.update(saved_cache)
+        thrace._cache_loaded = saved_loaded
+
+
+if __name__ == "__main__":
+    test_warm_up_gates_readiness()
+    print("✅ Warm-up checks passed")
@@ -0,0 +1,149 @@
+"""
+Revocation snapshot for stateless token validation (settings.auth_stateless_tokens).
+
+In stateless mode get_current_user trusts the signed claims in the token instead of
+reading the users table. What could make those claims untrue is kept in memory and
+refreshed every settings.auth_revocation_refresh_seconds from the users table:
+- each user's last logout - tokens issued before it are revoked. iat and the logouts this
+  worker records carry sub-second precision, so a token from just before a logout is
+  revoked and a login straight after it survives, even within one second. last_logout in
+  the database only has whole seconds: unless this worker recorded the exact time, the
+  whole second of the logout counts as revoked
+- each user's current role and country - tokens carrying other values must be re-issued
+- the set of user ids - tokens of deleted users are denied
+Until the first refresh succeeds, or once the snapshot has gone stale because refreshes
+keep failing, callers fall back to looking the user up (see auth.load_user).
+"""
+
+import asyncio
+import threading
+import time
+from typing import Optional
+
+from config import settings
+from database import db_helper
+from app_logging import get_logger
+
+logger = get_logger("auth")
+
+REVOCATION_QUERY = "SELECT id, role, country, UNIX_TIMESTAMP(last_logout) AS logout_at FROM users"
+
+
+class RevocationList:
+    def __init__(self):
+        self._users = None  # user_id -> (logout_at, role, country)
+        self._lock = threading.Lock()
+        self.loaded_at = None
+        self.refreshes = 0
+        self.failures = 0
+        self.accepted = 0
+        self.rejected = 0
+
+    @property
+    def ready(self) -> bool:
+        """Loaded, and recent enough to trust (three missed refreshes make it stale)"""
+        if self.loaded_at is None:
+            return False
+        return time.monotonic() - self.loaded_at < 3 * settings.auth_revocation_refresh_seconds
+
+    def _logout_cutoff(self, user_id, logout_at):
+        """Tokens issued before the returned time are revoked"""
+        logout_at = float(logout_at)
+        if not logout_at.is_integer():
+            return logout_at
+        # A whole-second last_logout: the logout happened somewhere within that second
+        known = self._users.get(user_id, (None,))[0] if self._users is not None else None
+        return known if known is not None and int(known) == logout_at else logout_at + 1
+
+    def replace(self, rows):
+        with self._lock:
+            users = {
+                row["id"]: (
+                    self._logout_cutoff(row["id"], row["logout_at"]) if row.get("logout_at") is not None else None,
+                    row.get("role"), row.get("country")
+                )
+                for row in rows
+            }
+            self._users = users
+            self.loaded_at = time.monotonic()
+            self.refreshes += 1
+
+    def record_logout(self, user_id: int, logged_out_at: float = None):
+        """Revoke this worker's copy right away - other workers catch up on their next refresh"""
+        logged_out_at = time.time() if logged_out_at is None else logged_out_at
+        with self._lock:
+            if self._users is not None and user_id in self._users:
+                _, role, country = self._users[user_id]
+                self._users[user_id] = (logged_out_at, role, country)
+
+    def check(self, claims: dict) -> Optional[str]:
+        """Why the token's claims are no longer valid, or None if they still are"""
+        with self._lock:
+            entry = self._users.get(claims.get("user_id")) if self._users is not None else None
+        if entry is None:
+            reason = "unknown user"
+        else:
+            logout_at, role, country = entry
+            if logout_at is not None and claims.get("iat", 0) < logout_at:
+                reason = "token revoked by logout"
+            elif role != claims.get("user_role") or country != claims.get("country"):
+                reason = "user role or country changed"
+            else:
+                reason = None
+        with self._lock:
+            if reason:
+                self.rejected += 1
+            else:
+                self.accepted += 1
+        return reason
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": settings.auth_stateless_tokens,
+                "ready": self.ready,
+                "users": len(self._users) if self._users is not None else 0,
+                "age_seconds": round(time.monotonic() - self.loaded_at, 1) if self.loaded_at is not None else None,
+                "refreshes": self.refreshes,
+                "refresh_failures": self.failures,
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+            }
+
+
+revocations = RevocationList()
+_refresh_task = None
+
+
+async def refresh_revocations() -> bool:
+    result = await db_helper.execute_main_query(REVOCATION_QUERY)
+    if result["error"]:
+        revocations.failures += 1
+        logger.error("Token revocation refresh failed: %s", result["error"])
+        return False
+    revocations.replace(result["data"])
+    return True
+
+
+async def _refresh_loop(interval: float):
+    while True:
+        await refresh_revocations()
+        await asyncio.sleep(interval)
+
+
+def start_revocation_refresher():
+    """Start refreshing the snapshot in stateless mode - called from the app lifespan"""
+    global _refresh_task
+    if settings.auth_stateless_tokens and _refresh_task is None:
+        _refresh_task = asyncio.create_task(_refresh_loop(settings.auth_revocation_refresh_seconds))
+
+
+async def stop_revocation_refresher():
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        try:
+            await _refresh_task
+        except asyncio.CancelledError:
+            pass
+        _refresh_task = None
@@ -0,0 +1,222 @@
+"""
+Background upload jobs.
+
+An upload accepted as a job returns a job id at once; the work runs as an asyncio task,
+at most settings.upload_job_workers at a time, with up to settings.upload_job_max_queued
+more waiting (beyond that submit() raises JobQueueFull). The blocking parts of a job -
+reading workbook rows and validating them - run on the job pool's own threads via
+run_blocking(), so a large workbook never stalls the event loop. The same work for an
+interactive POST /upload-data runs on a separate request pool, so queued jobs never hold
+up a user waiting on the response.
+
+Jobs live in this process only (the API runs one uvicorn worker). Finished jobs are kept
+for settings.upload_job_retention_seconds so their outcome can still be read.
+"""
+
+import asyncio
+import time
+import uuid
+from typing import Dict, Optional
+
+from config import settings
+from database import DatabaseExecutor
+from app_logging import get_logger
+
+logger = get_logger("upload_jobs")
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobQueueFull(Exception):
+    """Raised by submit() when upload_job_max_queued jobs are already waiting"""
+
+
+class UploadJob:
+    def __init__(self, kind: str, user_id: int, filename: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.user_id = user_id
+        self.filename = filename
+        self.status = QUEUED
+        self.rows_parsed = 0
+        self.rows_validated = 0
+        self.rows_inserted = 0
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.version = 0  # Bumped on every change - watchers pass the version they last saw
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def update(self, **counters):
+        """Record progress (rows_parsed / rows_validated / rows_inserted) and wake watchers"""
+        for name, value in counters.items():
+            setattr(self, name, value)
+        self._notify()
+
+    def _notify(self):
+        self.version += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait_for_change(self, version: int, timeout: float) -> bool:
+        """
+        Wait until the job changes after `version` - False if `timeout` passed first.
+        Returns at once if it already has, so a change made while the watcher was busy is not missed.
+        """
+        if self.version != version:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "filename": self.filename,
+            "status": self.status,
+            "rows_parsed": self.rows_parsed,
+            "rows_validated": self.rows_validated,
+            "rows_inserted": self.rows_inserted,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class UploadJobRunner:
+    def __init__(self, workers: int, max_queued: int, retention_seconds: float):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+        self._jobs: Dict[str, UploadJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._slots = None
+        self._executor = None
+        self._request_executor = None
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def executor(self) -> DatabaseExecutor:
+        """Threads for the blocking parts of jobs - built on first use"""
+        if self._executor is None:
+            self._executor = DatabaseExecutor(
+                "upload-jobs", max_workers=self.workers, max_queue=self.max_queued,
+                queue_timeout=settings.db_executor_queue_timeout,
+            )
+        return self._executor
+
+    def request_executor(self) -> DatabaseExecutor:
+        """Threads for the blocking parts of interactive uploads - built on first use"""
+        if self._request_executor is None:
+            self._request_executor = DatabaseExecutor(
+                "upload-requests", max_workers=settings.upload_request_workers,
+                max_queue=settings.db_executor_max_queue, queue_timeout=settings.db_executor_queue_timeout,
+            )
+        return self._request_executor
+
+    def submit(self, kind: str, user_id: int, filename: str, work) -> UploadJob:
+        """
+        Queue `work(job)` (a coroutine function returning the job result) and return the job.
+        Raises JobQueueFull when too many jobs are waiting already.
+        """
+        self._prune()
+        if sum(1 for job in self._jobs.values() if job.status == QUEUED) >= self.max_queued:
+            self.rejected += 1
+            raise JobQueueFull(f"{self.max_queued} upload jobs are already waiting")
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        job = UploadJob(kind, user_id, filename)
+        self._jobs[job.id] = job
+        self._tasks[job.id] = asyncio.create_task(self._run(job, work))
+        return job
+
+    async def _run(self, job: UploadJob, work):
+        try:
+            async with self._slots:
+                job.status = RUNNING
+                job.started_at = time.time()
+                job._notify()
+                try:
+                    job.result = await work(job)
+                    job.status = DONE
+                    self.completed += 1
+                except Exception as e:
+                    job.error = getattr(e, "detail", None) or str(e)
+                    job.status = FAILED
+                    self.failed += 1
+                    logger.error("Upload job %s (%s) failed: %s", job.id, job.kind, job.error,
+                                 extra={"user_id": job.user_id})
+        except asyncio.CancelledError:
+            job.error = "Cancelled by server shutdown"
+            job.status = FAILED
+            raise
+        finally:
+            job.finished_at = time.time()
+            self._tasks.pop(job.id, None)
+            job._notify()
+
+    def get(self, job_id: str, user_id: int) -> Optional[UploadJob]:
+        """The job, if it exists and belongs to `user_id`"""
+        job = self._jobs.get(job_id)
+        return job if job is not None and job.user_id == user_id else None
+
+    def active_job(self, user_id: int, kind: str) -> Optional[UploadJob]:
+        """The user's queued or running job of this kind, if any"""
+        for job in self._jobs.values():
+            if job.user_id == user_id and job.kind == kind and not job.finished:
+                return job
+        return None
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    async def run_blocking(self, job: Optional[UploadJob], fn, *args):
+        """Run a blocking callable on the job pool's threads, or the request pool's when `job` is None"""
+        executor = self.executor() if job is not None else self.request_executor()
+        return await executor.run(fn, *args)
+
+    def stats(self) -> dict:
+        statuses = [job.status for job in self._jobs.values()]
+        return {
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "queued": statuses.count(QUEUED),
+            "running": statuses.count(RUNNING),
+            "retained": len(statuses),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "executor": self._executor.stats() if self._executor is not None else None,
+            "request_executor": self._request_executor.stats() if self._request_executor is not None else None,
+        }
+
+    async def shutdown(self):
+        """Cancel unfinished jobs (their transactions roll back) - called from the app lifespan"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._slots = None
+        for executor in (self._executor, self._request_executor):
+            if executor is not None:
+                executor.shutdown()
+        self._executor = self._request_executor = None
+
+
+upload_jobs = UploadJobRunner(
+    settings.upload_job_workers, settings.upload_job_max_queued, settings.upload_job_retention_seconds
+)
@@ -0,0 +1,115 @@
+"""
+Startup warm-up and readiness.
+
+The app lifespan runs warm_up() before the first request is served: it fills each
+engine's connection pool and loads the caches the first requests would otherwise pay
+for (THRACE epiunits, the country lists and Moodle country codes, THRACE params and
+monthly P(intro)). Steps run concurrently; lifespan waits at most
+settings.warmup_timeout for them, then lets the rest finish in the background.
+
+GET /ready answers 200 once the main pool is filled and every step has been attempted,
+503 before that. Failed steps are retried every settings.warmup_retry_interval seconds;
+they do not hold readiness back, as each cache also loads itself on first use.
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional
+
+from config import settings
+from database import DATABASE_URLS, DatabaseHelper, get_read_engine, prefill_pool
+from app_logging import get_logger
+from routers import rmt, thrace, training_credits
+from routers.thrace_calculator import warm_reference_data
+
+logger = get_logger("warmup")
+
+
+class WarmupState:
+    def __init__(self):
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.steps: Dict[str, dict] = {}
+
+    @property
+    def ready(self) -> bool:
+        main_pool = self.steps.get("pool:main")
+        return self.finished_at is not None and main_pool is not None and main_pool["ok"]
+
+    def to_dict(self) -> dict:
+        return {
+            "ready": self.ready,
+            "duration_ms": round((self.finished_at - self.started_at) * 1000, 1) if self.finished_at else None,
+            "steps": self.steps,
+        }
+
+
+state = WarmupState()
+_task = None
+_first_pass = None
+
+
+def _steps() -> dict:
+    steps = {f"pool:{name}": (lambda name=name: prefill_pool(name)) for name in DATABASE_URLS}
+    steps.update({
+        "thrace_epiunits": thrace.load_epiunits_cache,
+        "country_lists": rmt.warm_country_lists,
+        "country_codes": training_credits.get_country_codes,
+        "thrace_reference_data": lambda: DatabaseHelper.run_sync(
+            "thrace", lambda: warm_reference_data(get_read_engine("thrace"))
+        ),
+    })
+    return steps
+
+
+async def _run_step(name: str, step):
+    started = time.perf_counter()
+    try:
+        await step()
+        state.steps[name] = {"ok": True, "ms": round((time.perf_counter() - started) * 1000, 1)}
+    except Exception as e:
+        state.steps[name] = {"ok": False, "ms": round((time.perf_counter() - started) * 1000, 1), "error": str(e)}
+        logger.warning("Warm-up step %s failed: %s", name, e)
+
+
+async def _warm_up():
+    steps = _steps()
+    state.started_at = time.perf_counter()
+    await asyncio.gather(*[_run_step(name, step) for name, step in steps.items()])
+    state.finished_at = time.perf_counter()
+    _first_pass.set()
+    logger.info("Warm-up finished in %.0f ms", (state.finished_at - state.started_at) * 1000,
+                extra={"steps": state.steps})
+
+    # Retry what failed (e.g. a database that was still starting) until it has all worked
+    while True:
+        failed = [name for name, result in state.steps.items() if not result["ok"]]
+        if not failed:
+            return
+        await asyncio.sleep(settings.warmup_retry_interval)
+        await asyncio.gather(*[_run_step(name, steps[name]) for name in failed])
+
+
+async def warm_up():
+    """Start the warm-up and wait for it up to settings.warmup_timeout - called from the app lifespan"""
+    global _task, _first_pass
+    if _task is None:
+        _first_pass = asyncio.Event()
+        _task = asyncio.create_task(_warm_up())
+    try:
+        # Only the first pass is waited for - retries of failed steps carry on in the background
+        await asyncio.wait_for(_first_pass.wait(), timeout=settings.warmup_timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Warm-up still running after %ss - serving traffic, /ready stays 503 until done",
+                       settings.warmup_timeout)
+
+
+async def stop_warm_up():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None